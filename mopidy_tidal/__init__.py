@@ -31,6 +31,26 @@ class Extension(ext.Extension):
         schema["client_id"] = config.String(optional=True)
         schema["client_secret"] = config.String(optional=True)
         schema["playlist_cache_refresh_secs"] = config.Integer(optional=True)
+        schema["workers_pool_size"] = config.Integer(optional=True, minimum=1)
+        schema["api_rate_limit"] = config.Integer(optional=True, minimum=0)
+        schema["api_rate_burst"] = config.Integer(optional=True, minimum=1)
+        schema["async_engine"] = config.Boolean(optional=True)
+        schema["async_max_concurrency"] = config.Integer(optional=True, minimum=1)
+        schema["prewarm_connections"] = config.Integer(optional=True, minimum=0)
+        schema["http_cache"] = config.Boolean(optional=True)
+        schema["adaptive_concurrency"] = config.Boolean(optional=True)
+        schema["api_timeout"] = config.Integer(optional=True, minimum=1)
+        schema["browse_timeout"] = config.Integer(optional=True, minimum=0)
+        schema["lookup_timeout"] = config.Integer(optional=True, minimum=0)
+        schema["playback_timeout"] = config.Integer(optional=True, minimum=0)
+        schema["circuit_breaker_threshold"] = config.Integer(optional=True, minimum=0)
+        schema["circuit_breaker_recovery_secs"] = config.Integer(
+            optional=True, minimum=1
+        )
+        schema["favorites_refresh_secs"] = config.Integer(optional=True, minimum=0)
+        schema["local_search_only"] = config.Boolean(optional=True)
+        schema["browse_page_size"] = config.Integer(optional=True, minimum=0)
+        schema["artist_cache_max_age"] = config.Integer(optional=True, minimum=0)
         return schema
 
     def setup(self, registry):
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+default_max_concurrency = 50
+
+
+class AsyncEngine:
+    """
+    Fan-out engine driven by an asyncio event loop running on its own thread.
+
+    Coroutine functions run natively on the loop, so any number of them can be
+    in flight at once. Blocking functions (such as the tidalapi getters, which
+    are built on `requests`) are offloaded to a thread executor, and the loop
+    only schedules them. In both cases the number of concurrent calls is
+    bounded by `max_concurrency`.
+
+    Since all the tidalapi calls are blocking, this is not truly asynchronous:
+    the executor is a second thread pool next to the
+    :class:`~mopidy_tidal.workers.WorkerPool`, and it brings no throughput
+    gain over it. It is experimental and disabled by default.
+
+    The public methods are synchronous, so they can be called from the pykka
+    actors and from the worker pool alike.
+    """
+
+    def __init__(self, max_concurrency: int = default_max_concurrency):
+        """
+        :param max_concurrency: Max number of calls in flight at the same time
+            for a single :meth:`map` (default: 50)
+        """
+        assert max_concurrency > 0, f"Invalid concurrency: {max_concurrency}"
+        self._max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(
+            max_concurrency, thread_name_prefix="mopidy-tidal-async-"
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop, name="mopidy-tidal-asyncio", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def max_concurrency(self):
+        return self._max_concurrency
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _map(self, func: Callable, items: List) -> List:
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        is_coroutine = asyncio.iscoroutinefunction(func)
+
+        async def run(item):
+            async with semaphore:
+                if is_coroutine:
+                    return await func(item)
+                return await self._loop.run_in_executor(self._executor, func, item)
+
+        return list(await asyncio.gather(*(run(item) for item in items)))
+
+    def run(self, coro):
+        """
+        Run a coroutine on the engine loop and wait for its result.
+        """
+        assert not self.is_engine_thread(), "Blocking call from the engine"
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def map(self, func: Callable, items: Iterable) -> List:
+        """
+        Run `func` (a plain or coroutine function) over `items` and return the
+        results in order.
+        """
+        return self.run(self._map(func, list(items)))
+
+    def is_engine_thread(self) -> bool:
+        """
+        Whether the current thread belongs to the engine. Blocking on the
+        engine from one of its own threads could exhaust the executor, so
+        nested fan-outs should be run elsewhere.
+        """
+        current = threading.current_thread()
+        return current is self._thread or current.name.startswith("mopidy-tidal-async-")
+
+    def shutdown(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._executor.shutdown(wait=False)
+
+
+_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(max_concurrency: int = default_max_concurrency) -> AsyncEngine:
+    """
+    Get the process-wide async engine, starting it on first use.
+    """
+    global _engine
+
+    with _engine_lock:
+        if _engine is None:
+            _engine = AsyncEngine(max_concurrency)
+            logger.debug(
+                "Started TIDAL async engine (max %d concurrent calls)",
+                _engine.max_concurrency,
+            )
+        return _engine
+
+
+def shutdown_engine():
+    global _engine
+
+    with _engine_lock:
+        engine, _engine = _engine, None
+
+    if engine:
+        engine.shutdown()
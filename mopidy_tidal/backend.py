@@ -8,7 +8,16 @@ from mopidy import backend
 from pykka import ThreadingActor
 from tidalapi import Config, Quality, Session
 
-from mopidy_tidal import Extension, context, library, playback, playlists
+from mopidy_tidal import (
+    Extension,
+    async_engine,
+    context,
+    http_adapter,
+    library,
+    playback,
+    playlists,
+    workers,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +75,13 @@ class TidalBackend(ThreadingActor, backend.Backend):
             )
 
         self._session = Session(config)
+        self._session.request_session.mount(
+            "https://",
+            http_adapter.create_adapter(
+                self._config, probe_url=self._session.config.api_v1_location
+            ),
+        )
+        self._prewarm_connections()
         # Always store tidal-oauth cache in mopidy core config data_dir
         data_dir = Extension.get_data_dir(self._config)
         oauth_file = os.path.join(data_dir, "tidal-oauth.json")
@@ -87,6 +103,24 @@ class TidalBackend(ThreadingActor, backend.Backend):
         else:
             logger.info("TIDAL Login KO")
 
+    def _prewarm_connections(self):
+        connections = self._config["tidal"].get("prewarm_connections")
+        if connections is None:
+            connections = http_adapter.default_prewarm_connections
+        if not connections:
+            return
+
+        http_adapter.prewarm(
+            self._session.request_session,
+            self._session.config.api_v1_location,
+            connections,
+        )
+
+    def on_stop(self):
+        self.library.shutdown()
+        workers.shutdown_pool()
+        async_engine.shutdown_engine()
+
     def _load_oauth_session(self, **data):
         assert self._session, "No session loaded"
         args = {
@@ -0,0 +1,171 @@
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from requests import HTTPError
+from tidalapi.exceptions import ObjectNotFound
+
+from mopidy_tidal.request_context import Cancelled, DeadlineExceeded
+from mopidy_tidal.workers import parallel_map
+
+logger = logging.getLogger(__name__)
+
+# How long the first caller waits for other IDs to join its batch
+default_batch_window = 0.01
+default_max_batch_size = 50
+
+
+class _Batch:
+    def __init__(self):
+        self.ids: List[str] = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results: Dict[str, object] = {}
+        self.errors: Dict[str, BaseException] = {}
+
+
+class Batcher:
+    """
+    Group the IDs requested by concurrent callers within a short window into
+    a single multi-ID request, and hand each caller its own item.
+
+    The first caller of a batch waits up to `window` seconds for other IDs to
+    join it, then runs the request on behalf of everybody. IDs missing from
+    the multi-ID response, and batches of one, are fetched individually. If
+    the multi-ID endpoint turns out not to be supported, the batcher falls
+    back to individual requests for good.
+
+    If the operation of the first caller is cancelled or runs out of time,
+    the other callers of the batch fetch their items again under their own
+    context instead of sharing its error.
+    """
+
+    def __init__(
+        self,
+        fetch_one: Callable[[str], object],
+        fetch_many: Optional[Callable[[List[str]], Dict[str, object]]] = None,
+        window: float = default_batch_window,
+        max_batch_size: int = default_max_batch_size,
+    ):
+        """
+        :param fetch_one: Function that fetches a single item by ID
+        :param fetch_many: Function that fetches several items in one request
+            and returns them indexed by ID
+        :param window: Max number of seconds the first caller of a batch
+            waits for other IDs (default: 0.01)
+        :param max_batch_size: Max number of IDs in a batch (default: 50)
+        """
+        assert max_batch_size > 0, f"Invalid batch size: {max_batch_size}"
+        self._fetch_one = fetch_one
+        self._fetch_many = fetch_many
+        self._window = window
+        self._max_batch_size = max_batch_size
+        self._pending: Optional[_Batch] = None
+        self._lock = threading.Lock()
+
+    def get(self, item_id):
+        item_id = str(item_id)
+        while True:
+            leader, error, result = self._get(item_id)
+            if error is None:
+                return result
+            if leader or not isinstance(error, (Cancelled, DeadlineExceeded)):
+                raise error
+
+            logger.debug("Batch abandoned (%s): fetching %s again", error, item_id)
+
+    def _get(self, item_id: str):
+        """
+        Join (or start) a batch and wait for it.
+
+        :return: Whether this caller ran the batch, and the error or the item
+        """
+        with self._lock:
+            batch = self._pending
+            leader = batch is None
+            if leader:
+                batch = self._pending = _Batch()
+            if item_id not in batch.ids:
+                batch.ids.append(item_id)
+            if len(batch.ids) >= self._max_batch_size:
+                self._pending = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self._window)
+            with self._lock:
+                if self._pending is batch:
+                    self._pending = None
+            self._run(batch)
+
+        batch.done.wait()
+        return leader, batch.errors.get(item_id), batch.results.get(item_id)
+
+    def _run(self, batch: _Batch):
+        try:
+            if len(batch.ids) > 1 and self._fetch_many:
+                batch.results.update(self._get_many(batch.ids))
+
+            missing = [i for i in batch.ids if i not in batch.results]
+            for item_id, (result, error) in zip(
+                missing, parallel_map(self._get_one, missing)
+            ):
+                if error is None:
+                    batch.results[item_id] = result
+                else:
+                    batch.errors[item_id] = error
+        except BaseException as e:
+            for item_id in batch.ids:
+                batch.errors.setdefault(item_id, e)
+        finally:
+            batch.done.set()
+
+    def _get_many(self, ids: List[str]) -> Dict[str, object]:
+        logger.debug("Fetching %d items in one request", len(ids))
+        try:
+            return self._fetch_many(ids)
+        except HTTPError as e:
+            if e.response is None or e.response.status_code not in (400, 404):
+                raise
+            err = e
+        except (ObjectNotFound, KeyError, TypeError, ValueError) as e:
+            err = e
+
+        logger.info(
+            "Multi-ID requests are not supported (%s): fetching items one by one",
+            err,
+        )
+        self._fetch_many = None
+        return {}
+
+    def _get_one(self, item_id: str):
+        try:
+            return self._fetch_one(item_id), None
+        except Exception as e:
+            return None, e
+
+
+def _index_by_id(items) -> Dict[str, object]:
+    return {str(item.id): item for item in items}
+
+
+def fetch_albums(session, ids: List[str]) -> Dict[str, object]:
+    """
+    Fetch several albums in a single request.
+    """
+    return _index_by_id(
+        session.request.map_request(
+            "albums", params={"ids": ",".join(ids)}, parse=session.parse_album
+        )
+    )
+
+
+def fetch_tracks(session, ids: List[str]) -> Dict[str, object]:
+    """
+    Fetch several tracks in a single request.
+    """
+    return _index_by_id(
+        session.request.map_request(
+            "tracks", params={"ids": ",".join(ids)}, parse=session.parse_track
+        )
+    )
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Tuple
+
+from mopidy_tidal.single_flight import coalesce
+
+logger = logging.getLogger(__name__)
+
+# The moods and genres change rarely
+default_catalogue_ttl = 24 * 3600
+# The mixes are regenerated regularly, at times that TIDAL doesn't publish
+default_mixes_ttl = 4 * 3600
+
+
+class _TtlCache:
+    def __init__(self):
+        # key -> (time.monotonic() of expiry, value)
+        self._entries: Dict[Hashable, Tuple[float, object]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, fetch: Callable, ttl: float):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        # Concurrent misses share the same request
+        value = coalesce("catalogue", key, fetch)
+        if value:
+            # Empty results (unknown IDs, unparsable pages...) are not cached
+            with self._lock:
+                self._entries[key] = (time.monotonic() + ttl, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class Catalogue:
+    """
+    In-memory cache of the moods, genres and mixes catalogues, indexed by ID,
+    and of the items (playlists or tracks) of each entry.
+
+    Moods and genres expire after `ttl` seconds, and the mixes (and their
+    tracks) after `mixes_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        get_session: Callable,
+        ttl: float = default_catalogue_ttl,
+        mixes_ttl: float = default_mixes_ttl,
+    ):
+        """
+        :param get_session: Function that returns the current TIDAL session
+        :param ttl: Seconds the moods and genres (and their playlists) are
+            cached for (default: 1 day)
+        :param mixes_ttl: Seconds the mixes (and their tracks) are cached for
+            (default: 4 hours)
+        """
+        self._get_session = get_session
+        self._ttl = ttl
+        self._mixes_ttl = mixes_ttl
+        self._cache = _TtlCache()
+
+    def _get_ttl(self, name: str) -> float:
+        if name == "mixes":
+            return self._mixes_ttl
+        return self._ttl
+
+    def _get_index(self, name: str) -> Dict[str, object]:
+        session = self._get_session()
+        fetch, get_id = {
+            "moods": (
+                lambda: session.moods(),
+                lambda mood: mood.api_path.split("/")[-1],
+            ),
+            "genres": (lambda: session.genre.get_genres(), lambda genre: genre.path),
+            "mixes": (lambda: session.mixes(), lambda mix: mix.id),
+        }[name]
+
+        return self._cache.get(
+            name,
+            lambda: {get_id(item): item for item in fetch()},
+            self._get_ttl(name),
+        )
+
+    def _get_items(self, name: str, item_id: str, get_items: Callable) -> List:
+        def fetch():
+            item = self._get_index(name).get(item_id)
+            return list(get_items(item)) if item else []
+
+        return self._cache.get((name, item_id), fetch, self._get_ttl(name))
+
+    def get_moods(self) -> List:
+        return list(self._get_index("moods").values())
+
+    def get_genres(self) -> List:
+        return list(self._get_index("genres").values())
+
+    def get_mixes(self) -> List:
+        return list(self._get_index("mixes").values())
+
+    def get_mood_items(self, mood_id: str) -> List:
+        return self._get_items("moods", mood_id, lambda mood: mood.get())
+
+    def get_genre_items(self, genre_id: str) -> List:
+        from tidalapi.playlist import Playlist
+
+        return self._get_items("genres", genre_id, lambda genre: genre.items(Playlist))
+
+    def get_mix_items(self, mix_id: str) -> List:
+        return self._get_items("mixes", mix_id, lambda mix: mix.items())
+
+    def clear(self):
+        self._cache.clear()
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from requests.exceptions import ConnectionError
+
+logger = logging.getLogger(__name__)
+
+default_failure_threshold = 5
+default_recovery_secs = 30
+
+
+class CircuitOpenError(ConnectionError):
+    """
+    TIDAL is considered unavailable and the request was not sent.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests to TIDAL after `failure_threshold` consecutive
+    failures. While the circuit is open, requests fail immediately with
+    :class:`CircuitOpenError`, and `probe` is called in the background every
+    `recovery_secs` seconds until it succeeds, at which point the circuit is
+    closed again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = default_failure_threshold,
+        recovery_secs: float = default_recovery_secs,
+        probe: Optional[Callable[[], bool]] = None,
+    ):
+        """
+        :param failure_threshold: Number of consecutive failures that open the
+            circuit (default: 5)
+        :param recovery_secs: Seconds between two probes while the circuit is
+            open (default: 30)
+        :param probe: Function that checks whether TIDAL is reachable again.
+            If not set, the circuit is half-opened after `recovery_secs` and
+            the next request works as the probe.
+        """
+        assert failure_threshold > 0, f"Invalid threshold: {failure_threshold}"
+        self._failure_threshold = failure_threshold
+        self._recovery_secs = recovery_secs
+        self._probe = probe
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def set_probe(self, probe: Callable[[], bool]):
+        self._probe = probe
+
+    def before_request(self):
+        """
+        Raise :class:`CircuitOpenError` if requests should not be sent.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+
+            if (
+                not self._probe
+                and time.monotonic() - self._opened_at >= self._recovery_secs
+            ):
+                # Half-open: let this request through as a probe, and hold the
+                # others back for another period
+                self._opened_at = time.monotonic()
+                return
+
+        raise CircuitOpenError("TIDAL is unavailable: request not sent")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._opened_at is not None:
+                logger.info("TIDAL is reachable again")
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None or self._failures < self._failure_threshold:
+                return
+
+            self._opened_at = time.monotonic()
+            logger.warning(
+                "TIDAL API unavailable after %d consecutive failures: "
+                "failing fast for the next %d seconds",
+                self._failures,
+                self._recovery_secs,
+            )
+
+        self._schedule_probe()
+
+    def _schedule_probe(self):
+        if not self._probe:
+            return
+
+        timer = threading.Timer(self._recovery_secs, self._run_probe)
+        timer.name = "mopidy-tidal-circuit-probe"
+        timer.daemon = True
+        self._probe_timer = timer
+        timer.start()
+
+    def _run_probe(self):
+        try:
+            ok = self._probe()
+        except Exception as e:
+            logger.debug("TIDAL probe failed: %s", e)
+            ok = False
+
+        if ok:
+            self.record_success()
+        elif self.is_open:
+            self._schedule_probe()
+
+    def close(self):
+        """
+        Stop probing and reset the circuit.
+        """
+        timer = self._probe_timer
+        if timer:
+            timer.cancel()
+        self.record_success()
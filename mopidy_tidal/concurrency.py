@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+default_initial_limit = 5
+default_max_limit = 10
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit driven by AIMD (additive increase, multiplicative
+    decrease), as used by TCP congestion control.
+
+    Every successful request with a latency in line with the recent average
+    grows the limit by `1/limit`, i.e. by roughly one slot per window of
+    requests. Timeouts, `429` responses and latency spikes halve it. At most
+    one decrease is applied per `cooldown` seconds, so that a burst of
+    failures from the same congested window only counts once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = default_initial_limit,
+        min_limit: int = 1,
+        max_limit: int = default_max_limit,
+        latency_tolerance: float = 2.0,
+        min_latency_spike: float = 0.5,
+        smoothing: float = 0.1,
+        cooldown: float = 1.0,
+    ):
+        """
+        :param initial_limit: Number of concurrent requests allowed at first
+            (default: 5)
+        :param min_limit: Lower bound of the limit (default: 1)
+        :param max_limit: Upper bound of the limit (default: 10)
+        :param latency_tolerance: A request slower than this many times the
+            average latency is considered a latency spike (default: 2)
+        :param min_latency_spike: Requests faster than this (in seconds) are
+            never considered spikes (default: 0.5)
+        :param smoothing: Weight of the last sample in the exponential moving
+            average of the latency (default: 0.1)
+        :param cooldown: Min number of seconds between two decreases
+            (default: 1)
+        """
+        assert 0 < min_limit <= max_limit, f"Invalid limits: {min_limit}-{max_limit}"
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._latency_tolerance = latency_tolerance
+        self._min_latency_spike = min_latency_spike
+        self._smoothing = smoothing
+        self._cooldown = cooldown
+        self._avg_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._waiting: Counter = Counter()
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        # Tolerate the rounding errors of the fractional increases
+        return int(self._limit + 1e-9)
+
+    @property
+    def min_limit(self) -> int:
+        return self._min_limit
+
+    @property
+    def max_limit(self) -> int:
+        return self._max_limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "min_limit": self._min_limit,
+                "max_limit": self._max_limit,
+                "in_flight": self._in_flight,
+                "avg_latency": self._avg_latency,
+            }
+
+    def _set_limit(self, limit: float):
+        old_limit = self.limit
+        self._limit = min(max(limit, self._min_limit), self._max_limit)
+        if self.limit != old_limit:
+            logger.debug(
+                "TIDAL concurrency limit: %d -> %d (avg latency: %.3fs)",
+                old_limit,
+                self.limit,
+                self._avg_latency or 0,
+            )
+            self._cond.notify_all()
+
+    def on_success(self, latency: float):
+        with self._cond:
+            avg = self._avg_latency
+            if (
+                avg is not None
+                and latency > self._min_latency_spike
+                and latency > avg * self._latency_tolerance
+            ):
+                self._decrease()
+            else:
+                self._set_limit(self._limit + 1 / self.limit)
+
+            if avg is None:
+                self._avg_latency = latency
+            else:
+                self._avg_latency = avg + self._smoothing * (latency - avg)
+
+    def on_failure(self):
+        with self._cond:
+            self._decrease()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self._cooldown:
+            return
+
+        self._last_decrease = now
+        self._set_limit(self._limit / 2)
+
+    def _has_precedence(self, priority: int) -> bool:
+        return any(p < priority for p, n in self._waiting.items() if n)
+
+    @contextmanager
+    def slot(self, priority: int = 0):
+        """
+        Hold one of the available concurrency slots, waiting for one to be
+        released if the limit has been reached.
+
+        :param priority: Requests with lower values get the released slots
+            first. A request also waits if a more urgent one is queued, even
+            if a slot is free.
+        """
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while self._in_flight >= self.limit or self._has_precedence(priority):
+                    self._cond.wait()
+            finally:
+                self._waiting[priority] -= 1
+            self._in_flight += 1
+            # Waiters of lower priority may be able to go now
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+
+_limiter = AdaptiveLimit()
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> AdaptiveLimit:
+    """
+    Get the concurrency limit shared by all the requests sent to TIDAL.
+    """
+    return _limiter
+
+
+def configure(max_limit: int, initial_limit: Optional[int] = None) -> AdaptiveLimit:
+    """
+    Replace the shared concurrency limit, e.g. when the configured pool size
+    changes.
+    """
+    global _limiter
+
+    with _limiter_lock:
+        _limiter = AdaptiveLimit(
+            initial_limit=initial_limit or min(default_initial_limit, max_limit),
+            max_limit=max_limit,
+        )
+        return _limiter
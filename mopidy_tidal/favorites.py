@@ -0,0 +1,273 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from requests.exceptions import ConnectionError, Timeout
+
+from mopidy_tidal.lru_cache import LruCache
+from mopidy_tidal.workers import get_items
+
+logger = logging.getLogger(__name__)
+
+default_full_refresh_secs = 3600
+default_page_size = 50
+# How long the favorites index is used before checking for new favorites
+default_index_max_age = 60
+
+
+@dataclass
+class FavoritesSnapshot:
+    # Mapped favorites, most recently added first
+    items: List = field(default_factory=list)
+    # time.time() of the last full reconciliation
+    reconciled_at: float = 0.0
+
+
+class FavoritesCache:
+    """
+    Persistent cache of one of the user's favorites collections (artists,
+    albums or tracks).
+
+    Favorites are listed by date added, newest first, so a refresh only
+    fetches pages until it reaches an item that is already known. Removals
+    can't be detected that way: the whole collection is reconciled every
+    `full_refresh_secs` seconds.
+
+    If TIDAL can't be reached, the last snapshot is returned as it is.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch_page: Callable[[int, int], List],
+        parse: Callable[[List], List],
+        full_refresh_secs: Optional[int] = None,
+        page_size: int = default_page_size,
+        storage: Optional[LruCache] = None,
+        get_user_id: Optional[Callable[[], object]] = None,
+    ):
+        """
+        :param name: Name of the collection (e.g. `tracks`)
+        :param fetch_page: Function that takes `limit` and `offset` and
+            returns a page of favorites, newest first
+        :param parse: Function that maps a page of TIDAL objects to Mopidy
+            models
+        :param full_refresh_secs: Max age of the last full reconciliation.
+            `0` reconciles on every call (default: 3600)
+        :param page_size: Size of the pages fetched on incremental refreshes
+            (default: 50)
+        :param storage: Cache where the snapshot is persisted
+        :param get_user_id: Function that returns the ID of the current user,
+            so that each account gets its own snapshot
+        """
+        self._name = name
+        self._get_user_id = get_user_id
+        self._fetch_page = fetch_page
+        self._parse = parse
+        self._full_refresh_secs = (
+            default_full_refresh_secs
+            if full_refresh_secs is None
+            else full_refresh_secs
+        )
+        self._page_size = page_size
+        self._storage = (
+            storage if storage is not None else LruCache(directory="favorites")
+        )
+        # time.monotonic() of the last check for new favorites
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def _key(self) -> str:
+        user_id = self._get_user_id() if self._get_user_id else None
+        if user_id is None:
+            return f"tidal:favorites:{self._name}"
+        return f"tidal:favorites:{user_id}:{self._name}"
+
+    @property
+    def snapshot(self) -> Optional[FavoritesSnapshot]:
+        return self._storage.get(self._key)
+
+    def get(self, max_age: Optional[float] = None) -> List:
+        """
+        Get the up-to-date favorites, most recently added first.
+
+        :param max_age: Return the snapshot as it is, without any request, if
+            new favorites were checked for less than `max_age` seconds ago
+        """
+        with self._lock:
+            snapshot = self.snapshot
+            checked_at = self._checked_at
+            if (
+                snapshot is not None
+                and max_age is not None
+                and checked_at is not None
+                and time.monotonic() - checked_at < max_age
+            ):
+                return snapshot.items
+
+            try:
+                new_snapshot = self._refresh(snapshot)
+            except (ConnectionError, Timeout) as e:
+                if snapshot is None:
+                    raise
+
+                logger.warning(
+                    "TIDAL unavailable when refreshing the favorite %s (%s): "
+                    "using cached data",
+                    self._name,
+                    e,
+                )
+                return snapshot.items
+
+            self._checked_at = time.monotonic()
+            if new_snapshot is not snapshot:
+                self._storage[self._key] = new_snapshot
+            return new_snapshot.items
+
+    def _refresh(self, snapshot: Optional[FavoritesSnapshot]) -> FavoritesSnapshot:
+        now = time.time()
+        if snapshot is None or now - snapshot.reconciled_at >= (
+            self._full_refresh_secs
+        ):
+            return FavoritesSnapshot(items=self._fetch_all(), reconciled_at=now)
+
+        new_items = self._fetch_new(snapshot.items)
+        if not new_items:
+            return snapshot
+
+        return FavoritesSnapshot(
+            items=new_items + snapshot.items,
+            reconciled_at=snapshot.reconciled_at,
+        )
+
+    def invalidate(self):
+        """
+        Force a full reconciliation on the next call to :meth:`get`.
+        """
+        with self._lock:
+            self._storage.prune(self._key)
+            self._checked_at = None
+
+    def _fetch_all(self) -> List:
+        logger.debug("Fetching all the favorite %s", self._name)
+        return self._parse(get_items(self._fetch_page))
+
+    def _fetch_new(self, known_items: List) -> List:
+        known_uris = {item.uri for item in known_items}
+        new_items = []
+        offset = 0
+
+        while True:
+            raw_page = self._fetch_page(self._page_size, offset)
+            page = self._parse([item for item in raw_page if item])
+            for item in page:
+                if item.uri in known_uris:
+                    return new_items
+                new_items.append(item)
+
+            if len(raw_page) < self._page_size:
+                return new_items
+            offset += self._page_size
+
+
+def _names(items) -> List[str]:
+    return list(dict.fromkeys(item.name for item in items if item.name))
+
+
+def _lower(values: Optional[Iterable[str]]) -> Optional[Set[str]]:
+    return None if values is None else {value.lower() for value in values}
+
+
+class FavoritesIndex:
+    """
+    In-memory index of the names in the user's collection (favorite artists,
+    albums and tracks, and the artists credited on each album), built from
+    the favorites caches.
+
+    The index is rebuilt when the favorites change, and new favorites are
+    checked for at most every `max_age` seconds, so lookups are normally
+    answered without any request.
+    """
+
+    def __init__(
+        self,
+        artists: FavoritesCache,
+        albums: FavoritesCache,
+        tracks: FavoritesCache,
+        max_age: float = default_index_max_age,
+    ):
+        self._caches = (artists, albums, tracks)
+        self._max_age = max_age
+        self._sources: Optional[tuple] = None
+        self._artists: List[str] = []
+        self._albums: List[str] = []
+        self._tracks: List[str] = []
+        # Album name -> lowercase names of the artists credited on it
+        self._album_artists: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        sources = tuple(cache.get(max_age=self._max_age) for cache in self._caches)
+        with self._lock:
+            if self._sources is not None and all(
+                new is old for new, old in zip(sources, self._sources)
+            ):
+                return
+
+            artists, albums, tracks = sources
+            # Albums of the collection, with the artists credited on them
+            credits = [(album, album.artists) for album in albums] + [
+                (track.album, track.artists | track.album.artists)
+                for track in tracks
+                if track.album
+            ]
+            album_artists: Dict[str, Set[str]] = {}
+            for album, artists_credited in credits:
+                if album.name:
+                    album_artists.setdefault(album.name, set()).update(
+                        artist.name.lower()
+                        for artist in artists_credited
+                        if artist.name
+                    )
+
+            self._artists = _names(artists)
+            self._albums = _names(albums)
+            self._tracks = _names(tracks)
+            self._album_artists = album_artists
+            self._sources = sources
+
+    def artists(self) -> List[str]:
+        self._refresh()
+        return self._artists
+
+    def albums(
+        self,
+        artists: Optional[Iterable[str]] = None,
+        values: Optional[Iterable[str]] = None,
+    ) -> List[str]:
+        """
+        Names of the favorite albums or, if filtered, of the albums in the
+        collection (favorite albums, and albums of the favorite tracks).
+
+        :param artists: Only the albums credited to one of these artists
+        :param values: Only the albums named after, or credited to, one of
+            these values (as in the `any` field of a query)
+        """
+        self._refresh()
+        if artists is None and values is None:
+            return self._albums
+
+        artists, values = _lower(artists), _lower(values)
+        return [
+            album
+            for album, credits in self._album_artists.items()
+            if (artists is None or credits & artists)
+            and (values is None or album.lower() in values or credits & values)
+        ]
+
+    def tracks(self) -> List[str]:
+        self._refresh()
+        return self._tracks
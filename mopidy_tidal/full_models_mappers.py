@@ -5,6 +5,12 @@ import logging
 from mopidy.models import Album, Artist, Playlist, Track
 
 from mopidy_tidal.helpers import to_timestamp
+from mopidy_tidal.image_index import (
+    index_album,
+    index_artist,
+    index_playlist,
+    index_track,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +34,7 @@ def create_mopidy_artist(tidal_artist):
     if tidal_artist is None:
         return None
 
+    index_artist(tidal_artist)
     return Artist(uri="tidal:artist:" + str(tidal_artist.id), name=tidal_artist.name)
 
 
@@ -39,6 +46,7 @@ def create_mopidy_album(tidal_album, artist):
     if artist is None:
         artist = create_mopidy_artist(tidal_album.artist)
 
+    index_album(tidal_album)
     return Album(
         uri="tidal:album:" + str(tidal_album.id),
         name=tidal_album.name,
@@ -60,6 +68,7 @@ def create_mopidy_track(artist, album, tidal_track):
     if album is None:
         album = create_mopidy_album(tidal_track.album, artist)
 
+    index_track(tidal_track)
     track_len = tidal_track.duration * 1000
     return Track(
         uri=uri,
@@ -75,6 +84,7 @@ def create_mopidy_track(artist, album, tidal_track):
 
 
 def create_mopidy_playlist(tidal_playlist, tidal_tracks):
+    index_playlist(tidal_playlist)
     return Playlist(
         uri=f"tidal:playlist:{tidal_playlist.id}",
         name=tidal_playlist.name,
@@ -9,3 +9,18 @@ def to_timestamp(dt):
     if isinstance(dt, datetime.datetime):
         dt = dt.timestamp()
     return int(dt)
+
+
+def canonical_uri(uri):
+    """
+    Reduce the equivalent forms of a TIDAL URI to a single one, so that they
+    share the same cache entries: `tidal:track:<artist_id>:<album_id>:<id>`
+    becomes `tidal:track:<id>`. Other keys are returned unchanged.
+    """
+    if not isinstance(uri, str) or not uri.startswith("tidal:"):
+        return uri
+
+    parts = uri.split(":")
+    if len(parts) == 5 and parts[1] == "track":
+        return ":".join((parts[0], parts[1], parts[4]))
+    return uri
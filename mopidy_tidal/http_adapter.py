@@ -0,0 +1,319 @@
+import datetime
+import email.utils
+import logging
+import random
+import threading
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+
+from mopidy_tidal import concurrency, request_context
+from mopidy_tidal.circuit_breaker import (
+    CircuitBreaker,
+    default_failure_threshold,
+    default_recovery_secs,
+)
+from mopidy_tidal.concurrency import AdaptiveLimit
+from mopidy_tidal.http_cache import HttpCache
+from mopidy_tidal.rate_limiter import TokenBucket
+from mopidy_tidal.workers import default_pool_size
+
+logger = logging.getLogger(__name__)
+
+default_rate_limit = 15
+default_max_retries = 3
+default_prewarm_connections = 4
+prewarm_timeout = 10
+
+
+class TidalHTTPAdapter(HTTPAdapter):
+    """
+    Transport adapter mounted on the `requests` session used by tidalapi, so
+    that every API request goes through the same client-side rate limiter,
+    concurrency limit, circuit breaker and HTTP response cache, and gets a
+    timeout bound to the deadline of the current operation.
+    """
+
+    backoff_base = 1.0
+    max_backoff = 60.0
+
+    def __init__(
+        self,
+        *args,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_retries_on_429: int = default_max_retries,
+        cache: Optional[HttpCache] = None,
+        concurrency_limit: Optional[AdaptiveLimit] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        **kwargs,
+    ):
+        """
+        :param rate_limiter: Token bucket shared by all the requests sent
+            through this adapter. Set to None to disable rate limiting.
+        :param max_retries_on_429: How many times a request is retried after a
+            `429 Too Many Requests` response before the response is returned
+            to the caller (default: 3)
+        :param cache: Cache used to revalidate GET requests with `ETag` and
+            `Last-Modified`. Set to None to disable response caching.
+        :param concurrency_limit: Adaptive limit on the number of requests in
+            flight, fed with the latency and outcome of each request. Set to
+            None to disable it.
+        :param circuit_breaker: Circuit breaker that fails requests fast after
+            repeated connection errors, timeouts or server errors. Set to None
+            to disable it.
+        """
+        super().__init__(*args, **kwargs)
+        self._rate_limiter = rate_limiter
+        self._max_retries_on_429 = max_retries_on_429
+        self._cache = cache
+        self._concurrency_limit = concurrency_limit
+        self._circuit_breaker = circuit_breaker
+
+    @property
+    def rate_limiter(self):
+        return self._rate_limiter
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def concurrency_limit(self):
+        return self._concurrency_limit
+
+    @property
+    def circuit_breaker(self):
+        return self._circuit_breaker
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        if not value:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+        if retry_at.tzinfo is None:
+            # `-0000` dates are parsed as naive datetimes, but they are UTC
+            retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+
+        return max(0.0, retry_at.timestamp() - time.time())
+
+    def _get_retry_delay(self, response, attempt: int) -> float:
+        delay = self._parse_retry_after(response.headers.get("Retry-After"))
+        if delay is None:
+            delay = self.backoff_base * 2**attempt
+
+        # Add some jitter so the workers that got throttled together don't
+        # all come back at the same time
+        delay += random.uniform(0, self.backoff_base)
+        return min(delay, self.max_backoff)
+
+    def send(self, request, *args, **kwargs):
+        if self._circuit_breaker:
+            self._circuit_breaker.before_request()
+
+        entry = None
+        if self._cache and request.method == "GET":
+            entry = self._cache.get(request.url)
+            if entry:
+                self._cache.add_validators(request, entry)
+
+        response = self._send_with_retries(request, *args, **kwargs)
+        if not self._cache or request.method != "GET":
+            return response
+
+        if response.status_code == 304 and entry:
+            return self._cache.from_not_modified(request, response, entry)
+
+        self._cache.store(request, response)
+        return response
+
+    def _send_once(self, request, *args, **kwargs):
+        timeout = kwargs.get("timeout")
+        limit = self._concurrency_limit
+        breaker = self._circuit_breaker
+        priority = request_context.current().priority
+
+        with limit.slot(priority) if limit else nullcontext():
+            if self._rate_limiter:
+                self._rate_limiter.acquire(priority)
+
+            # Computed after the waits, so that the request doesn't overrun
+            # the deadline of its operation
+            cut_short = False
+            if not isinstance(timeout, tuple):
+                kwargs["timeout"] = request_context.get_request_timeout(timeout)
+                configured_timeout = request_context.get_configured_timeout(timeout)
+                cut_short = bool(
+                    configured_timeout and kwargs["timeout"] < configured_timeout
+                )
+
+            start = time.monotonic()
+            try:
+                response = super().send(request, *args, **kwargs)
+            except Timeout:
+                if cut_short:
+                    # The timeout was shortened to fit the deadline of the
+                    # operation: it says nothing about the health of TIDAL
+                    raise
+                if limit:
+                    limit.on_failure()
+                if breaker:
+                    breaker.record_failure()
+                raise
+            except ConnectionError:
+                if limit:
+                    limit.on_failure()
+                if breaker:
+                    breaker.record_failure()
+                raise
+
+            if response.status_code >= 500:
+                if limit:
+                    limit.on_failure()
+                if breaker:
+                    breaker.record_failure()
+                return response
+
+            if breaker:
+                breaker.record_success()
+            if limit:
+                if response.status_code == 429:
+                    limit.on_failure()
+                else:
+                    limit.on_success(time.monotonic() - start)
+
+            return response
+
+    def _send_with_retries(self, request, *args, **kwargs):
+        attempt = 0
+
+        while True:
+            response = self._send_once(request, *args, **kwargs)
+            if response.status_code != 429 or attempt >= self._max_retries_on_429:
+                return response
+
+            delay = self._get_retry_delay(response, attempt)
+            logger.warning(
+                "TIDAL rate limit hit on %s: retrying in %.1f seconds",
+                request.path_url.split("?")[0],
+                delay,
+            )
+
+            if self._rate_limiter:
+                self._rate_limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+            response.close()
+            attempt += 1
+
+
+def get_pool_size(tidal_config) -> int:
+    """
+    Number of connections to keep alive for each host: one per thread that can
+    send requests in parallel, so that concurrent requests never have to open
+    (and later discard) connections of their own.
+    """
+    pool_size = tidal_config.get("workers_pool_size") or default_pool_size
+    if tidal_config.get("async_engine"):
+        from mopidy_tidal.async_engine import default_max_concurrency
+
+        pool_size = max(
+            pool_size,
+            tidal_config.get("async_max_concurrency") or default_max_concurrency,
+        )
+
+    return pool_size
+
+
+def create_adapter(config, probe_url: Optional[str] = None) -> TidalHTTPAdapter:
+    """
+    Build the HTTP adapter for the TIDAL session out of the extension config.
+
+    :param config: Mopidy config
+    :param probe_url: URL used to check whether TIDAL is reachable again
+        after the circuit breaker has opened
+    """
+    tidal_config = config["tidal"]
+    rate_limit = tidal_config.get("api_rate_limit")
+    if rate_limit is None:
+        rate_limit = default_rate_limit
+
+    rate_limiter = None
+    if rate_limit:
+        rate_limiter = TokenBucket(rate_limit, tidal_config.get("api_rate_burst"))
+
+    pool_size = get_pool_size(tidal_config)
+    http_cache = tidal_config.get("http_cache")
+    adaptive_concurrency = tidal_config.get("adaptive_concurrency")
+    breaker_threshold = tidal_config.get("circuit_breaker_threshold")
+    if breaker_threshold is None:
+        breaker_threshold = default_failure_threshold
+
+    circuit_breaker = None
+    if breaker_threshold:
+        circuit_breaker = CircuitBreaker(
+            failure_threshold=breaker_threshold,
+            recovery_secs=tidal_config.get("circuit_breaker_recovery_secs")
+            or default_recovery_secs,
+            probe=_create_probe(probe_url) if probe_url else None,
+        )
+
+    return TidalHTTPAdapter(
+        pool_maxsize=pool_size,
+        pool_block=False,
+        rate_limiter=rate_limiter,
+        cache=HttpCache() if http_cache or http_cache is None else None,
+        concurrency_limit=concurrency.configure(pool_size)
+        if adaptive_concurrency or adaptive_concurrency is None
+        else None,
+        circuit_breaker=circuit_breaker,
+    )
+
+
+def _create_probe(url: str):
+    # The probe uses its own connection, so it's not held back by the open
+    # circuit, the rate limiter or the concurrency limit
+    def probe() -> bool:
+        return requests.head(url, timeout=prewarm_timeout).status_code < 500
+
+    return probe
+
+
+def prewarm(request_session, url: str, connections: int) -> threading.Thread:
+    """
+    Open `connections` keep-alive connections to the host of `url` in the
+    background, so that the first requests after startup don't have to pay
+    for the TCP and TLS handshakes.
+    """
+    from mopidy_tidal.workers import parallel_map
+
+    def connect(_):
+        try:
+            request_session.head(url, timeout=prewarm_timeout).close()
+            return True
+        except Exception as e:
+            logger.debug("Could not pre-warm a connection to %s: %s", url, e)
+            return False
+
+    def run():
+        with request_context.priority(request_context.Priority.BACKGROUND):
+            opened = sum(parallel_map(connect, range(connections)))
+        logger.debug("Pre-warmed %d connections to %s", opened, url)
+
+    thread = threading.Thread(target=run, name="mopidy-tidal-prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,109 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import MutableMapping, Optional
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+default_cache_size = 512
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    status_code: int
+    headers: dict
+    content: bytes
+    encoding: Optional[str] = None
+
+
+class CachedResponse(Response):
+    """
+    Response rebuilt from a :class:`CacheEntry` after a `304 Not Modified`.
+    Only the raw body is cached: each response decodes its own copy of the
+    JSON, since tidalapi modifies the decoded payloads in place.
+    """
+
+    from_cache = True
+
+    def __init__(self, entry: CacheEntry, request, raw_response: Response):
+        super().__init__()
+        self._content = entry.content
+        self._content_consumed = True
+        self.status_code = entry.status_code
+        self.headers = CaseInsensitiveDict(entry.headers)
+        self.encoding = entry.encoding
+        self.url = entry.url
+        self.request = request
+        self.connection = raw_response.connection
+        self.elapsed = raw_response.elapsed
+        self.reason = "OK"
+
+
+class HttpCache:
+    """
+    Cache of GET responses that carry validators (`ETag`/`Last-Modified`).
+    Cached URLs are revalidated with conditional requests, and `304`
+    responses are served from the stored copy.
+    """
+
+    def __init__(self, storage: Optional[MutableMapping] = None):
+        """
+        :param storage: Mapping used to store the entries, keyed by URL
+            (default: an in-memory :class:`LruCache`)
+        """
+        if storage is None:
+            from mopidy_tidal.lru_cache import LruCache
+
+            storage = LruCache(max_size=default_cache_size, persist=False)
+
+        self._storage = storage
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        with self._lock:
+            return self._storage.get(url)
+
+    def add_validators(self, request, entry: CacheEntry):
+        """
+        Turn `request` into a conditional request against `entry`.
+        """
+        if entry.etag:
+            request.headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            request.headers["If-Modified-Since"] = entry.last_modified
+
+    def store(self, request, response: Response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+
+        entry = CacheEntry(
+            url=request.url,
+            etag=etag,
+            last_modified=last_modified,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            content=response.content,
+            encoding=response.encoding,
+        )
+
+        with self._lock:
+            self._storage[request.url] = entry
+
+    def from_not_modified(
+        self, request, response: Response, entry: CacheEntry
+    ) -> Response:
+        logger.debug("Serving %s from the HTTP cache", request.path_url)
+        response.close()
+        return CachedResponse(entry, request, response)
+
+    def prune(self, url: str):
+        with self._lock:
+            self._storage.pop(url, None)
@@ -0,0 +1,101 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from tidalapi.session import Config
+
+logger = logging.getLogger(__name__)
+
+default_max_size = 20000
+
+# Size of the images returned for each item type: the largest one that
+# tidalapi supports, as `ImagesGetter` would pick
+image_dimensions = {
+    "album": 640,
+    "artist": 750,
+    "playlist": 750,
+    "track": 640,
+}
+
+
+class ImageIndex:
+    """
+    Map the URIs of the items seen while mapping API responses (browse,
+    lookup, search...) to the ID of their cover or picture, so that their
+    image URL can be built without fetching the item again.
+
+    Only the image IDs are kept, and the least recently used entries are
+    evicted beyond `max_size`.
+    """
+
+    def __init__(self, max_size: int = default_max_size):
+        assert max_size > 0, f"Invalid index size: {max_size}"
+        self._max_size = max_size
+        self._image_ids: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._image_ids)
+
+    def add(self, uri: str, image_id):
+        if not (isinstance(image_id, str) and image_id):
+            return
+
+        with self._lock:
+            self._image_ids[uri] = image_id
+            self._image_ids.move_to_end(uri)
+            while len(self._image_ids) > self._max_size:
+                self._image_ids.popitem(last=False)
+
+    def get_image_url(self, uri: str) -> Optional[str]:
+        item_type = uri.split(":")[1]
+        with self._lock:
+            image_id = self._image_ids.get(uri)
+            if image_id is None or item_type not in image_dimensions:
+                return None
+            self._image_ids.move_to_end(uri)
+
+        dimensions = image_dimensions[item_type]
+        return Config.image_url % (image_id.replace("-", "/"), dimensions, dimensions)
+
+    def clear(self):
+        with self._lock:
+            self._image_ids.clear()
+
+
+_index = ImageIndex()
+
+
+def get_image_index() -> ImageIndex:
+    """
+    Get the image index shared by the mappers and the images getter.
+    """
+    return _index
+
+
+def index_artist(tidal_artist):
+    _index.add(
+        f"tidal:artist:{tidal_artist.id}", getattr(tidal_artist, "picture", None)
+    )
+
+
+def index_album(tidal_album):
+    _index.add(f"tidal:album:{tidal_album.id}", getattr(tidal_album, "cover", None))
+
+
+def index_playlist(tidal_playlist):
+    _index.add(
+        f"tidal:playlist:{tidal_playlist.id}",
+        getattr(tidal_playlist, "square_picture", None),
+    )
+
+
+def index_track(tidal_track):
+    # Tracks use the artwork of their album
+    album = tidal_track.album
+    if album is None:
+        return
+
+    index_album(album)
+    _index.add(f"tidal:track:{tidal_track.id}", getattr(album, "cover", None))
@@ -1,26 +1,58 @@
 from __future__ import unicode_literals
 
+import functools
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Tuple
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from mopidy import backend, models
 from mopidy.models import Image, SearchResult
-from requests.exceptions import HTTPError
-
-from mopidy_tidal import full_models_mappers, ref_models_mappers
+from requests.exceptions import ConnectionError, HTTPError, Timeout
+
+from mopidy_tidal import context, full_models_mappers, ref_models_mappers
+from mopidy_tidal.batching import Batcher, fetch_albums, fetch_tracks
+from mopidy_tidal.catalogue import Catalogue
+from mopidy_tidal.favorites import FavoritesCache, FavoritesIndex
+from mopidy_tidal.helpers import canonical_uri, to_timestamp
+from mopidy_tidal.image_index import get_image_index
 from mopidy_tidal.lru_cache import LruCache
 from mopidy_tidal.playlists import PlaylistMetadataCache
+from mopidy_tidal.request_context import Cancelled, DeadlineExceeded, with_deadline
+from mopidy_tidal.search_index import SearchIndex
+from mopidy_tidal.single_flight import coalesce
 from mopidy_tidal.utils import apply_watermark
-from mopidy_tidal.workers import get_items
+from mopidy_tidal.workers import get_items, parallel_map
 
 logger = logging.getLogger(__name__)
 
+# How long an artist page is served from the cache before being fetched again
+default_artist_cache_max_age = 24 * 3600
+
+
+@dataclass
+class ArtistPage:
+    # Releases: albums, then EPs and singles
+    albums: List[models.Album] = field(default_factory=list)
+    top_tracks: List[models.Track] = field(default_factory=list)
+    # time.time() of the fetch
+    fetched_at: float = 0.0
+
 
 class ImagesGetter:
-    def __init__(self, session):
-        self._session = session
-        self._image_cache = LruCache(directory="image")
+    def __init__(
+        self,
+        session,
+        batchers: Optional[Dict[str, Batcher]] = None,
+        image_cache: Optional[LruCache] = None,
+    ):
+        self.session = session
+        self._batchers = batchers or {}
+        self._image_cache = (
+            image_cache if image_cache is not None else LruCache(directory="image")
+        )
 
     @staticmethod
     def _log_image_not_found(obj):
@@ -56,36 +88,51 @@ class ImagesGetter:
         cls._log_image_not_found(obj)
 
     def _get_api_getter(self, item_type: str):
-        return getattr(self._session, item_type, None)
+        getter = getattr(self.session, item_type, None)
+        if getter and item_type in self._batchers:
+            return self._batchers[item_type].get
+        return getter
+
+    @staticmethod
+    def _get_image_key(uri: str) -> str:
+        parts = uri.split(":")
+        if len(parts) == 5 and parts[1] == "track":
+            # Tracks use the artwork of their album
+            return f"tidal:album:{parts[3]}"
+        return canonical_uri(uri)
 
     def _get_images(self, uri) -> List[Image]:
         assert uri.startswith("tidal:"), f"Invalid TIDAL URI: {uri}"
 
-        parts = uri.split(":")
-        item_type = parts[1]
-        if item_type == "track":
-            # For tracks, retrieve the artwork of the associated album
-            item_type = "album"
-            item_id = parts[3]
-            uri = ":".join([parts[0], "album", parts[3]])
-        else:
-            item_id = parts[2]
-
+        uri = self._get_image_key(uri)
         if uri in self._image_cache:
             # Cache hit
             return self._image_cache[uri]
 
+        img_uri = get_image_index().get_image_url(uri)
+        if img_uri:
+            # Seen while mapping another response: no need to fetch the item
+            logger.debug("Image URL for %r: %r", uri, img_uri)
+            return [Image(uri=img_uri, width=320, height=320)]
+
+        parts = uri.split(":")
+        item_type = parts[1]
+        item_id = parts[2]
         logger.debug("Retrieving %r from the API", uri)
         getter = self._get_api_getter(item_type)
         if not getter:
             logger.warning("The API item type %s has no session getters", item_type)
             return []
 
-        item = getter(item_id)
+        item = coalesce(item_type, item_id, getter, item_id)
         if not item:
             logger.debug("%r is not available on the backend", uri)
             return []
 
+        if item_type == "track":
+            # `tidal:track:<id>`: the track response tells us the album
+            item = item.album
+
         img_uri = self._get_image_uri(item)
         if not img_uri:
             logger.debug("%r has no associated images", uri)
@@ -94,19 +141,62 @@ class ImagesGetter:
         logger.debug("Image URL for %r: %r", uri, img_uri)
         return [Image(uri=img_uri, width=320, height=320)]
 
-    def __call__(self, uri: str) -> Tuple[str, List[Image]]:
+    def __call__(self, uri: str) -> Tuple[str, Optional[List[Image]]]:
         try:
             return uri, self._get_images(uri)
-        except (AssertionError, AttributeError, HTTPError) as err:
+        except (Cancelled, DeadlineExceeded) as err:
+            logger.debug("Skipped the images of %r: %s", uri, err)
+            return uri, None
+        except (
+            AssertionError,
+            AttributeError,
+            HTTPError,
+            ConnectionError,
+            Timeout,
+        ) as err:
             logger.error("%s when processing URI %r: %s", type(err), uri, err)
             return uri, []
 
+    def get_images(self, uris) -> Dict[str, List[Image]]:
+        """
+        Get the images of `uris`, resolving the URIs that share the same
+        artwork (e.g. the tracks of an album) only once.
+        """
+        keys = {uri: self._get_image_key(uri) for uri in uris}
+        images_by_key = dict(parallel_map(self, list(dict.fromkeys(keys.values()))))
+        # Images that were skipped because the request was abandoned are
+        # left out, but the ones already retrieved are still cached
+        images = {
+            uri: images_by_key[key]
+            for uri, key in keys.items()
+            if images_by_key[key] is not None
+        }
+
+        self.cache_update(images)
+        return images
+
     def cache_update(self, images):
-        self._image_cache.update(images)
+        self._image_cache.update(
+            {
+                self._get_image_key(uri): item_images
+                for uri, item_images in images.items()
+            }
+        )
 
 
 class TidalLibraryProvider(backend.LibraryProvider):
     root_directory = models.Ref.directory(uri="tidal:directory", name="Tidal")
+    # Favorites collection listed by each directory
+    favorites_directories = {
+        "tidal:my_artists": "artists",
+        "tidal:my_albums": "albums",
+        "tidal:my_tracks": "tracks",
+    }
+    favorites_parsers = {
+        "artists": full_models_mappers.create_mopidy_artists,
+        "albums": full_models_mappers.create_mopidy_albums,
+        "tracks": full_models_mappers.create_mopidy_tracks,
+    }
 
     def __init__(self, *args, **kwargs):
         super(TidalLibraryProvider, self).__init__(*args, **kwargs)
@@ -114,57 +204,246 @@ class TidalLibraryProvider(backend.LibraryProvider):
         self._album_cache = LruCache()
         self._track_cache = LruCache()
         self._playlist_cache = PlaylistMetadataCache()
+        self._artist_pages_cache = LruCache(directory="artist_pages")
+        self._image_cache = LruCache(directory="image")
+        self._images_getter: Optional[ImagesGetter] = None
+        self._images_getter_lock = threading.Lock()
+        # Stores the tracks seen while browsing, off the response path
+        self._cache_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="mopidy-tidal-cache-"
+        )
+        self._batchers = {
+            "album": Batcher(
+                lambda album_id: self._session.album(album_id),
+                lambda ids: fetch_albums(self._session, ids),
+            ),
+            "track": Batcher(
+                lambda track_id: self._session.track(track_id),
+                lambda ids: fetch_tracks(self._session, ids),
+            ),
+        }
+        full_refresh_secs = context.get_config()["tidal"].get("favorites_refresh_secs")
+        self._favorites = {
+            item_type: FavoritesCache(
+                item_type,
+                functools.partial(self._get_favorites_page, item_type),
+                parse,
+                full_refresh_secs=full_refresh_secs,
+                get_user_id=lambda: self._session.user.id,
+            )
+            for item_type, parse in self.favorites_parsers.items()
+        }
+        self._search_index = SearchIndex()
+        self._catalogue = Catalogue(lambda: self._session)
+        self._favorites_index = FavoritesIndex(
+            self._favorites["artists"],
+            self._favorites["albums"],
+            self._favorites["tracks"],
+        )
 
     @property
     def _session(self):
         return self.backend._session  # type: ignore
 
-    def get_distinct(self, field, query=None):
-        from mopidy_tidal.search import tidal_search
+    def _get_favorites_page(
+        self,
+        item_type: str,
+        limit: int,
+        offset: int,
+        order: str = "DATE",
+        order_direction: str = "DESC",
+    ):
+        favorites = self._session.user.favorites
+        if item_type == "tracks":
+            return favorites.tracks(
+                limit=limit,
+                offset=offset,
+                order=order,
+                order_direction=order_direction,
+            )
 
-        logger.debug("Browsing distinct %s with query %r", field, query)
+        # tidalapi doesn't expose the ordering of the favorite artists and
+        # albums
         session = self._session
+        return session.request.map_request(
+            f"{favorites.base_url}/{item_type}",
+            params={
+                "limit": limit,
+                "offset": offset,
+                "order": order,
+                "orderDirection": order_direction,
+            },
+            parse=session.parse_artist
+            if item_type == "artists"
+            else session.parse_album,
+        )
 
-        if not query:  # library root
-            if field == "artist" or field == "albumartist":
-                return [
-                    apply_watermark(a.name) for a in session.user.favorites.artists()
-                ]
-            elif field == "album":
-                return [
-                    apply_watermark(a.name) for a in session.user.favorites.albums()
-                ]
-            elif field == "track":
-                return [
-                    apply_watermark(t.name) for t in session.user.favorites.tracks()
-                ]
+    def get_distinct(self, field, query=None):
+        logger.debug("Browsing distinct %s with query %r", field, query)
+        index = self._favorites_index
+
+        if field == "artist" or field == "albumartist":
+            names = index.artists()
+        elif field == "album":
+            query = query or {}
+            names = index.albums(
+                self._get_query_values(query, "artist", "albumartist"),
+                self._get_query_values(query, "any"),
+            )
+        elif field == "track":
+            names = index.tracks()
         else:
-            if field == "artist":
-                return [
-                    apply_watermark(a.name) for a in session.user.favorites.artists()
-                ]
-            elif field == "album" or field == "albumartist":
-                artists, _, _ = tidal_search(session, query=query, exact=True)
-                if len(artists) > 0:
-                    artist = artists[0]
-                    artist_id = artist.uri.split(":")[2]
-                    return [
-                        apply_watermark(a.name)
-                        for a in self._get_artist_albums(session, artist_id)
-                    ]
-            elif field == "track":
-                return [
-                    apply_watermark(t.name) for t in session.user.favorites.tracks()
-                ]
-            pass
+            names = []
 
-        return []
+        return [apply_watermark(name) for name in names]
 
+    @staticmethod
+    def _get_query_values(query, *fields) -> Optional[List[str]]:
+        result = []
+        for field in fields:
+            values = query.get(field) or []
+            result.extend([values] if isinstance(values, str) else values)
+        return result or None
+
+    @with_deadline("browse")
     def browse(self, uri):
         logger.info("Browsing uri %s", uri)
         if not uri or not uri.startswith("tidal:"):
             return []
 
+        try:
+            return self._browse(uri)
+        except (ConnectionError, Timeout) as err:
+            logger.warning(
+                "TIDAL unavailable when browsing %r (%s): using cached data", uri, err
+            )
+            return self._browse_from_cache(uri)
+
+    def _browse_from_cache(self, uri):
+        item_type = self.favorites_directories.get(uri)
+        if item_type:
+            # Favorites are served from their last snapshot
+            snapshot = self._favorites[item_type].snapshot
+            items = snapshot.items if snapshot else []
+            if item_type == "artists":
+                return [models.Ref.artist(uri=a.uri, name=a.name) for a in items]
+            if item_type == "albums":
+                return [models.Ref.album(uri=a.uri, name=a.name) for a in items]
+            return self._create_track_refs(sorted(items, key=lambda t: t.name or ""))
+
+        parts = uri.split(":")
+        if len(parts) != 3:
+            return []
+
+        albums = []
+        if parts[1] == "album":
+            tracks = self._album_cache.get(uri) or []
+        elif parts[1] == "artist":
+            # Expired pages are better than nothing
+            page = self._artist_pages_cache.get(uri)
+            albums = page.albums if page else []
+            tracks = page.top_tracks[:10] if page else []
+        elif parts[1] in {"playlist", "mix"}:
+            playlist = self._playlist_cache.get(uri) or (
+                self.backend.playlists._playlists.get(uri)
+            )
+            tracks = playlist.tracks if playlist else []
+        else:
+            tracks = []
+
+        return [
+            models.Ref.album(uri=album.uri, name=album.name) for album in albums
+        ] + self._create_track_refs(tracks)
+
+    def _browse_favorites_page(self, uri: str, page_size: int) -> List[models.Ref]:
+        """
+        Browse a page of a favorites collection, fetched on its own: the
+        directory itself (e.g. `tidal:my_tracks`) is the first page, and
+        each full page ends with the directory of the next one
+        (`tidal:my_tracks:page:<n>`).
+        """
+        directory, _, page = uri.partition(":page:")
+        if page and not (page.isdigit() and int(page) > 0):
+            logger.debug("Unknown uri for browse request: %s", uri)
+            return []
+
+        page_number = int(page or 1)
+        item_type = self.favorites_directories[directory]
+        # Tracks are listed by name, as on the unpaged directory
+        order = ("NAME", "ASC") if item_type == "tracks" else ("DATE", "DESC")
+        offset = (page_number - 1) * page_size
+        raw_items = coalesce(
+            "favorites_page",
+            (item_type, page_size, offset, *order),
+            self._get_favorites_page,
+            item_type,
+            page_size,
+            offset,
+            *order,
+        )
+        items = self.favorites_parsers[item_type]([_ for _ in raw_items if _])
+
+        if item_type == "artists":
+            refs = [models.Ref.artist(uri=a.uri, name=a.name) for a in items]
+        elif item_type == "albums":
+            refs = [models.Ref.album(uri=a.uri, name=a.name) for a in items]
+        else:
+            self._cache_tracks(lambda: items)
+            refs = self._create_track_refs(items)
+
+        if len(raw_items) >= page_size:
+            refs.append(
+                models.Ref.directory(
+                    uri=f"{directory}:page:{page_number + 1}",
+                    name=f"Page {page_number + 1}",
+                )
+            )
+        return refs
+
+    @staticmethod
+    def _create_track_refs(tracks) -> List[models.Ref]:
+        return [models.Ref.track(uri=t.uri, name=t.name) for t in tracks]
+
+    def _cache_tracks(self, get_tracks: Callable[[], List[models.Track]]) -> Future:
+        """
+        Store the tracks returned by `get_tracks` in the track cache on a
+        background thread, so that looking up the items of a browsed
+        directory doesn't fetch them again.
+
+        :param get_tracks: Function that returns the (mapped) tracks. It runs
+            on the background thread, so it can do the mapping too
+        """
+
+        def cache():
+            try:
+                tracks = get_tracks()
+            except Exception as e:
+                logger.debug("Could not cache the browsed tracks: %s", e)
+                return
+
+            self._track_cache.add_missing({track.uri: track for track in tracks})
+
+        return self._cache_executor.submit(cache)
+
+    def shutdown(self):
+        """
+        Stop caching the browsed tracks in the background.
+        """
+        self._cache_executor.shutdown(wait=False)
+
+    @staticmethod
+    def _get_cached(cache: LruCache, uri: str, fetch):
+        """
+        Get the entry of `uri` from `cache`, or fetch and store it.
+        """
+        data = cache.get(uri)
+        if not data:
+            data = fetch()
+            if data:
+                cache[uri] = data
+        return data or []
+
+    def _browse(self, uri):
         session = self._session
 
         # summaries
@@ -172,94 +451,148 @@ class TidalLibraryProvider(backend.LibraryProvider):
         if uri == self.root_directory.uri:
             return ref_models_mappers.create_root()
 
+        page_size = context.get_config()["tidal"].get("browse_page_size")
+        if page_size and uri.split(":page:")[0] in self.favorites_directories:
+            return self._browse_favorites_page(uri, page_size)
+
         elif uri == "tidal:my_artists":
-            return ref_models_mappers.create_artists(
-                get_items(session.user.favorites.artists)
-            )
+            return [
+                models.Ref.artist(uri=a.uri, name=a.name)
+                for a in self._favorites["artists"].get()
+            ]
         elif uri == "tidal:my_albums":
-            return ref_models_mappers.create_albums(
-                get_items(session.user.favorites.albums)
-            )
+            return [
+                models.Ref.album(uri=a.uri, name=a.name)
+                for a in self._favorites["albums"].get()
+            ]
         elif uri == "tidal:my_playlists":
             return self.backend.playlists.as_list()
         elif uri == "tidal:my_tracks":
-            return ref_models_mappers.create_tracks(
-                get_items(session.user.favorites.tracks)
-            )
+            tracks = self._favorites["tracks"].get()
+            self._cache_tracks(lambda: tracks)
+            # Listed by name, as TIDAL does by default
+            return self._create_track_refs(sorted(tracks, key=lambda t: t.name or ""))
         elif uri == "tidal:moods":
-            return ref_models_mappers.create_moods(session.moods())
+            return ref_models_mappers.create_moods(self._catalogue.get_moods())
         elif uri == "tidal:mixes":
-            return ref_models_mappers.create_mixes([m for m in session.mixes()])
+            return ref_models_mappers.create_mixes(self._catalogue.get_mixes())
         elif uri == "tidal:genres":
-            return ref_models_mappers.create_genres(session.genre.get_genres())
+            return ref_models_mappers.create_genres(self._catalogue.get_genres())
 
         # details
 
         parts = uri.split(":")
         nr_of_parts = len(parts)
 
+        # Detail pages are served from the same caches as lookup
         if nr_of_parts == 3 and parts[1] == "album":
-            return ref_models_mappers.create_tracks(
-                self._get_album_tracks(session, parts[2])
-            )
+            return self._create_track_refs(self._get_album_tracks_cached(session, uri))
 
         if nr_of_parts == 3 and parts[1] == "artist":
-            top_10_tracks = ref_models_mappers.create_tracks(
-                self._get_artist_top_tracks(session, parts[2])[:10]
-            )
-
-            albums = ref_models_mappers.create_albums(
-                self._get_artist_albums(session, parts[2])
-            )
-
-            return albums + top_10_tracks
+            albums, top_tracks = self._get_artist_page(session, uri)
+            self._cache_tracks(lambda: top_tracks)
+            return [
+                models.Ref.album(uri=album.uri, name=album.name) for album in albums
+            ] + self._create_track_refs(top_tracks[:10])
 
         if nr_of_parts == 3 and parts[1] == "playlist":
-            return ref_models_mappers.create_tracks(
-                self._get_playlist_tracks(session, parts[2])
-            )
+            playlist = self._get_playlist(session, parts[2])
+            tracks = playlist.tracks if playlist else []
+            self._cache_tracks(lambda: tracks)
+            return self._create_track_refs(tracks)
 
         if nr_of_parts == 3 and parts[1] == "mood":
             return ref_models_mappers.create_playlists(
-                self._get_mood_items(session, parts[2])
+                self._catalogue.get_mood_items(parts[2])
             )
 
         if nr_of_parts == 3 and parts[1] == "genre":
             return ref_models_mappers.create_playlists(
-                self._get_genre_items(session, parts[2])
+                self._catalogue.get_genre_items(parts[2])
             )
 
         if nr_of_parts == 3 and parts[1] == "mix":
-            return ref_models_mappers.create_tracks(
-                self._get_mix_tracks(session, parts[2])
-            )
+            items = self._catalogue.get_mix_items(parts[2])
+            self._cache_tracks(lambda: full_models_mappers.create_mopidy_tracks(items))
+            return ref_models_mappers.create_tracks(items)
 
         logger.debug("Unknown uri for browse request: %s", uri)
         return []
 
+    def update_search_index(self, source: str, items: List):
+        """
+        Make `items` (e.g. the tracks of a playlist) searchable offline, in
+        place of the items previously indexed for `source`.
+        """
+        self._search_index.update(source, items)
+
+    def _search_local(self, query, exact=False) -> SearchResult:
+        # Only the favorites already fetched are indexed: this never sends
+        # any request
+        for item_type, favorites in self._favorites.items():
+            snapshot = favorites.snapshot
+            if snapshot:
+                self._search_index.update(f"favorites:{item_type}", snapshot.items)
+
+        artists, albums, tracks = self._search_index.search(query, exact=exact)
+        return SearchResult(artists=artists, albums=albums, tracks=tracks)
+
+    @staticmethod
+    def _merge_search_results(*results: SearchResult) -> SearchResult:
+        merged = {}
+        for field in ("artists", "albums", "tracks"):
+            items = {}
+            for result in results:
+                for item in getattr(result, field):
+                    items.setdefault(item.uri, item)
+            merged[field] = list(items.values())
+        return SearchResult(**merged)
+
     def search(self, query=None, uris=None, exact=False):
         from mopidy_tidal.search import tidal_search
 
+        local_results = self._search_local(query, exact=exact)
+        if context.get_config()["tidal"].get("local_search_only"):
+            return local_results
+
         try:
             artists, albums, tracks = tidal_search(
                 self._session, query=query, exact=exact
             )
-            return SearchResult(artists=artists, albums=albums, tracks=tracks)
+            # Local hits come first
+            return self._merge_search_results(
+                local_results,
+                SearchResult(artists=artists, albums=albums, tracks=tracks),
+            )
+        except Cancelled:
+            logger.debug("Search for %r cancelled: using local results", query)
+            return local_results
+        except (ConnectionError, Timeout) as err:
+            logger.warning(
+                "TIDAL unavailable when searching %r (%s): using local results",
+                query,
+                err,
+            )
+            return local_results
         except Exception as ex:
             logger.info("EX")
             logger.info("%r", ex)
 
+    def _get_images_getter(self) -> ImagesGetter:
+        # Rebuilt only if the session changes: the memory tier of the image
+        # cache outlives it anyway
+        session = self._session
+        with self._images_getter_lock:
+            getter = self._images_getter
+            if getter is None or getter.session is not session:
+                getter = self._images_getter = ImagesGetter(
+                    session, self._batchers, self._image_cache
+                )
+            return getter
+
     def get_images(self, uris):
         logger.info("Searching Tidal for images for %r" % uris)
-        images_getter = ImagesGetter(self._session)
-
-        with ThreadPoolExecutor(4, thread_name_prefix="mopidy-tidal-images-") as pool:
-            pool_res = pool.map(images_getter, uris)
-
-        images = {uri: item_images for uri, item_images in pool_res}
-
-        images_getter.cache_update(images)
-        return images
+        return self._get_images_getter().get_images(uris)
 
     def lookup(self, uris=None):
         logger.info("Lookup uris %r", uris)
@@ -268,128 +601,185 @@ class TidalLibraryProvider(backend.LibraryProvider):
         if not hasattr(uris, "__iter__"):
             uris = [uris]
 
+        uris = list(uris or [])
+        if len(uris) > 1:
+            # Bulk lookups (e.g. restoring a tracklist) aren't bound to the
+            # deadline, which would silently drop the URIs left when it
+            # expires
+            return self._lookup(uris)
+        return self._lookup_with_deadline(uris)
+
+    @with_deadline("lookup")
+    def _lookup_with_deadline(self, uris: List[str]) -> List[models.Track]:
+        return self._lookup(uris)
+
+    def _lookup(self, uris: List[str]) -> List[models.Track]:
+        failed_uris = self._prefetch_album_tracks(self._session, uris)
+        # Cache misses are resolved concurrently, and the results come back
+        # in the order of the URIs
+        uris = [uri for uri in uris if uri not in failed_uris]
+        results = parallel_map(self._lookup_uri, uris)
+
         tracks = []
         cache_updates = {}
-
-        for uri in uris or []:
-            data = []
-            try:
-                parts = uri.split(":")
-                item_type = parts[1]
-                cache_name = f"_{parts[1]}_cache"
-                cache_miss = True
-
-                try:
-                    data = getattr(self, cache_name)[uri]
-                    cache_miss = not bool(data)
-                except (AttributeError, KeyError):
-                    pass
-
-                if cache_miss:
-                    try:
-                        lookup = getattr(self, f"_lookup_{parts[1]}")
-                    except AttributeError:
-                        continue
-
-                    data = cache_data = lookup(self._session, parts)
-                    cache_updates[cache_name] = cache_updates.get(cache_name, {})
-                    if item_type == "playlist":
-                        # Playlists should be persisted on the cache as objects,
-                        # not as lists of tracks. Therefore, _lookup_playlist
-                        # returns a tuple that we need to unpack
-                        data, cache_data = data
-
-                    cache_updates[cache_name][uri] = cache_data
-
-                if item_type == "playlist" and not cache_miss:
-                    tracks += data.tracks
-                else:
-                    tracks += data if hasattr(data, "__iter__") else [data]
-            except HTTPError as err:
-                logger.error("%s when processing URI %r: %s", type(err), uri, err)
+        for uri, (uri_tracks, cache_update) in zip(uris, results):
+            tracks += uri_tracks
+            if cache_update:
+                cache_name, cache_data = cache_update
+                cache_updates.setdefault(cache_name, {})[uri] = cache_data
 
         for cache_name, new_data in cache_updates.items():
             getattr(self, cache_name).update(new_data)
 
         self._track_cache.update({track.uri: track for track in tracks})
+        self._search_index.add(tracks)
         logger.info("Returning %d tracks", len(tracks))
         return tracks
 
-    @classmethod
-    def _get_playlist_tracks(cls, session, playlist_id):
-        pl = session.playlist(playlist_id)
-        getter_args = tuple()
-        return get_items(pl.tracks, *getter_args)
-
-    @staticmethod
-    def _get_genre_items(session, genre_id):
-        from tidalapi.playlist import Playlist
+    def _lookup_uri(self, uri) -> Tuple[List[models.Track], Optional[Tuple]]:
+        """
+        Resolve a single URI for :meth:`lookup`.
 
-        filtered_genres = [g for g in session.genre.get_genres() if genre_id == g.path]
-        if filtered_genres:
-            return filtered_genres[0].items(Playlist)
-        return []
-
-    @staticmethod
-    def _get_mood_items(session, mood_id):
-        filtered_moods = [
-            m for m in session.moods() if mood_id == m.api_path.split("/")[-1]
-        ]
+        :return: The tracks of the URI and, on a cache miss, the
+            `(cache_name, data)` entry to store for it
+        """
+        try:
+            parts = uri.split(":")
+            item_type = parts[1]
+            cache_name = f"_{parts[1]}_cache"
+            cache_miss = True
+            cache_update = None
+            data = []
 
-        if filtered_moods:
-            mood = filtered_moods[0].get()
-            return [p for p in mood]
-        return []
+            try:
+                data = getattr(self, cache_name)[uri]
+                cache_miss = not bool(data)
+            except (AttributeError, KeyError):
+                pass
 
-    @staticmethod
-    def _get_mix_tracks(session, mix_id):
-        filtered_mixes = [m for m in session.mixes() if mix_id == m.id]
-        if filtered_mixes:
-            return filtered_mixes[0].items()
-        return []
+            if cache_miss:
+                try:
+                    lookup = getattr(self, f"_lookup_{parts[1]}")
+                except AttributeError:
+                    return [], None
+
+                data = cache_data = lookup(self._session, parts)
+                if item_type == "playlist":
+                    # Playlists should be persisted on the cache as objects,
+                    # not as lists of tracks. Therefore, _lookup_playlist
+                    # returns a tuple that we need to unpack
+                    data, cache_data = data
+
+                if cache_data:
+                    cache_update = (cache_name, cache_data)
+
+            if item_type == "playlist" and not cache_miss:
+                return list(data.tracks), None
+            return list(data) if hasattr(data, "__iter__") else [data], cache_update
+        except (HTTPError, ConnectionError, Timeout) as err:
+            logger.error("%s when processing URI %r: %s", type(err), uri, err)
+            return [], None
+
+    def _get_playlist(self, session, playlist_id) -> Optional[models.Playlist]:
+        """
+        Get a playlist with its tracks, from the cache unless it has been
+        updated since it was cached.
+        """
+        tidal_playlist = coalesce(
+            "playlist", playlist_id, session.playlist, playlist_id
+        )
+        if not tidal_playlist:
+            logger.warning("No such playlist: %s", playlist_id)
+            return None
+
+        uri = f"tidal:playlist:{playlist_id}"
+        playlist = self._playlist_cache.get(uri)
+        if playlist and to_timestamp(tidal_playlist.last_updated) <= to_timestamp(
+            playlist.last_modified
+        ):
+            return playlist
+
+        tidal_tracks = coalesce(
+            "playlist_tracks", playlist_id, get_items, tidal_playlist.tracks
+        )
+        pl_tracks = full_models_mappers.create_mopidy_tracks(tidal_tracks)
+        playlist = full_models_mappers.create_mopidy_playlist(tidal_playlist, pl_tracks)
+        self._playlist_cache[uri] = playlist
+        return playlist
 
     def _lookup_playlist(self, session, parts):
-        playlist_id = parts[2]
-        tidal_playlist = session.playlist(playlist_id)
-        tidal_tracks = self._get_playlist_tracks(session, playlist_id)
-        pl_tracks = full_models_mappers.create_mopidy_tracks(tidal_tracks)
-        pl = full_models_mappers.create_mopidy_playlist(tidal_playlist, pl_tracks)
+        playlist = self._get_playlist(session, parts[2])
         # We need both the list of tracks and the mapped playlist object for
         # caching purposes
-        return pl_tracks, pl
+        return (list(playlist.tracks), playlist) if playlist else ([], None)
 
-    @staticmethod
-    def _get_artist_albums(session, artist_id):
-        artist = session.artist(artist_id)
-        if not artist:
-            logger.warning("No such artist: %s", artist_id)
-            return []
-
-        return artist.get_albums()
-
-    @staticmethod
-    def _get_album_tracks(session, album_id):
-        album = session.album(album_id)
+    def _get_album_tracks(self, session, album_id):
+        album = coalesce("album", album_id, self._batchers["album"].get, album_id)
         if not album:
             logger.warning("No such album: %s", album_id)
             return []
 
-        return album.tracks()
+        return coalesce("album_tracks", album_id, album.tracks)
+
+    def _cache_album_tracks(self, album_tracks) -> Dict[str, models.Track]:
+        """
+        Add all the tracks of an album to the track cache, so that looking up
+        the other tracks of the album doesn't hit the API again, and return
+        them indexed by track ID.
+        """
+        tracks = full_models_mappers.create_mopidy_tracks(album_tracks)
+        self._track_cache.update({track.uri: track for track in tracks})
+        return {track.uri.split(":")[-1]: track for track in tracks}
+
+    def _prefetch_album_tracks(self, session, uris) -> Set[str]:
+        """
+        Fetch the tracks of each album referenced by the uncached
+        `tidal:track:<artist_id>:<album_id>:<track_id>` URIs only once, and
+        cache them.
+
+        :return: The URIs that could not be looked up
+        """
+        uris_by_album: Dict[str, List[str]] = {}
+        for uri in uris:
+            parts = uri.split(":") if isinstance(uri, str) else []
+            if len(parts) == 5 and parts[1] == "track" and uri not in self._track_cache:
+                uris_by_album.setdefault(parts[3], []).append(uri)
+
+        def prefetch(album_uris_item) -> Set[str]:
+            album_id, album_uris = album_uris_item
+            try:
+                self._cache_album_tracks(self._get_album_tracks(session, album_id))
+            except (HTTPError, ConnectionError, Timeout) as err:
+                logger.error(
+                    "%s when processing album %r: %s", type(err), album_id, err
+                )
+                return set(album_uris)
+
+            return set()
+
+        # Albums with a single requested track have nothing to share: the
+        # lookup resolves them as usual
+        shared_albums = [item for item in uris_by_album.items() if len(item[1]) > 1]
+        return set().union(*parallel_map(prefetch, shared_albums))
 
     def _lookup_track(self, session, parts):
         if len(parts) == 3:  # Track in format `tidal:track:<track_id>`
+            # The track response carries everything we need: no need to
+            # fetch the whole album
             track_id = parts[2]
-            track = session.track(track_id)
-            album_id = str(track.album.id)
-        else:  # Track in format `tidal:track:<artist_id>:<album_id>:<track_id>`
-            album_id = parts[3]
-            track_id = parts[4]
-        tracks = self._get_album_tracks(session, album_id)
-        # We get a spurious coverage error since the next expression should never raise StopIteration
-        track = next(t for t in tracks if t.id == int(track_id))  # pragma: no cover
-        artist = full_models_mappers.create_mopidy_artist(track.artist)
-        album = full_models_mappers.create_mopidy_album(track.album, artist)
-        return [full_models_mappers.create_mopidy_track(artist, album, track)]
+            track = coalesce("track", track_id, self._batchers["track"].get, track_id)
+            return [full_models_mappers.create_mopidy_track(None, None, track)]
+
+        # Track in format `tidal:track:<artist_id>:<album_id>:<track_id>`
+        album_id = parts[3]
+        track_id = parts[4]
+        tracks = self._cache_album_tracks(self._get_album_tracks(session, album_id))
+        track = tracks.get(str(track_id))
+        if not track:
+            logger.warning("No such track on album %s: %s", album_id, track_id)
+            return []
+
+        return [track]
 
     def _lookup_album(self, session, parts):
         album_id = parts[2]
@@ -397,9 +787,71 @@ class TidalLibraryProvider(backend.LibraryProvider):
 
         return full_models_mappers.create_mopidy_tracks(tracks)
 
+    def _get_album_tracks_cached(self, session, uri) -> List[models.Track]:
+        return self._get_cached(
+            self._album_cache,
+            uri,
+            lambda: list(
+                self._cache_album_tracks(
+                    self._get_album_tracks(session, uri.split(":")[2])
+                ).values()
+            ),
+        )
+
+    def _get_artist_page(
+        self, session, uri
+    ) -> Tuple[List[models.Album], List[models.Track]]:
+        """
+        Get the releases (albums, then EPs and singles) and the top tracks of
+        an artist, from the cache or from concurrent requests that share a
+        single artist request. Cached pages are fetched again after
+        `artist_cache_max_age` seconds, so that new releases show up.
+        """
+        max_age = context.get_config()["tidal"].get("artist_cache_max_age")
+        if max_age is None:
+            max_age = default_artist_cache_max_age
+
+        page = self._artist_pages_cache.get(uri)
+        if page and time.time() - page.fetched_at < max_age:
+            return page.albums, page.top_tracks
+
+        artist_id = uri.split(":")[2]
+        artist = coalesce("artist", artist_id, session.artist, artist_id)
+        if not artist:
+            logger.warning("No such artist: %s", artist_id)
+            return [], []
+
+        # Older versions of tidalapi only have the deprecated name
+        get_ep_singles = getattr(artist, "get_ep_singles", None) or (
+            artist.get_albums_ep_singles
+        )
+        fetches = [
+            lambda: coalesce(
+                "artist_albums", artist_id, get_items, artist.get_albums, probe=True
+            ),
+            lambda: coalesce(
+                "artist_ep_singles", artist_id, get_items, get_ep_singles, probe=True
+            ),
+            lambda: coalesce("artist_top_tracks", artist_id, artist.get_top_tracks),
+        ]
+        albums, ep_singles, top_tracks = parallel_map(lambda fetch: fetch(), fetches)
+        page = ArtistPage(
+            albums=full_models_mappers.create_mopidy_albums(albums + ep_singles),
+            top_tracks=full_models_mappers.create_mopidy_tracks(top_tracks),
+            fetched_at=time.time(),
+        )
+        if page.albums or page.top_tracks:
+            self._artist_pages_cache[uri] = page
+            if page.top_tracks:
+                # Shared with the lookups of the artist
+                self._artist_cache[uri] = page.top_tracks
+
+        return page.albums, page.top_tracks
+
     @staticmethod
     def _get_artist_top_tracks(session, artist_id):
-        return session.artist(artist_id).get_top_tracks()
+        artist = coalesce("artist", artist_id, session.artist, artist_id)
+        return coalesce("artist_top_tracks", artist_id, artist.get_top_tracks)
 
     def _lookup_artist(self, session, parts):
         artist_id = parts[2]
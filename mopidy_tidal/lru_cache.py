@@ -4,13 +4,57 @@ import logging
 import os
 import pathlib
 import pickle
+import threading
 from collections import OrderedDict
-from typing import Optional
+from typing import Dict, Optional
 
 from mopidy_tidal import Extension, context
+from mopidy_tidal.helpers import canonical_uri
 
 logger = logging.getLogger(__name__)
 
+# Created in a cache directory once its entries have been moved to their
+# canonical keys
+_migration_marker = ".canonical_uris"
+_migration_lock = threading.Lock()
+
+
+def _migrate_track_entries(cache_dir: str):
+    """
+    Move the track entries stored under their long key
+    (`tidal:track:<artist_id>:<album_id>:<id>`) to their canonical key
+    (`tidal:track:<id>`), once per cache directory. Entries whose canonical
+    key is already stored are removed.
+    """
+    marker = os.path.join(cache_dir, _migration_marker)
+    with _migration_lock:
+        if os.path.isfile(marker):
+            return
+
+        tracks_dir = os.path.join(cache_dir, "track")
+        migrated = 0
+        for root, _, filenames in os.walk(tracks_dir):
+            for filename in filenames:
+                name, ext = os.path.splitext(filename)
+                parts = name.replace(":", "-").split("-")
+                if ext != ".cache" or len(parts) != 5:
+                    continue
+
+                key = canonical_uri(":".join(parts))
+                key_dir = os.path.join(tracks_dir, parts[4][:2])
+                pathlib.Path(key_dir).mkdir(parents=True, exist_ok=True)
+                target = os.path.join(key_dir, "-".join(key.split(":")) + ".cache")
+                path = os.path.join(root, filename)
+                if os.path.isfile(target):
+                    os.unlink(path)
+                else:
+                    os.replace(path, target)
+                migrated += 1
+
+        if migrated:
+            logger.info("Moved %d cached tracks to their canonical URI", migrated)
+        pathlib.Path(marker).touch()
+
 
 class LruCache(OrderedDict):
     def __init__(self, max_size: Optional[int] = 1024, persist=True, directory=""):
@@ -22,6 +66,8 @@ class LruCache(OrderedDict):
         :param directory: If `persist=True`, store the cached entries in this
             subfolder of the cache directory (default: '')
         """
+        # Reentrant, since a read can store the entry loaded from the disk
+        self._lock = threading.RLock()
         super().__init__(self)
         if max_size:
             assert max_size > 0, f"Invalid cache size: {max_size}"
@@ -33,6 +79,7 @@ class LruCache(OrderedDict):
         self._persist = persist
         if persist:
             pathlib.Path(self._cache_dir).mkdir(parents=True, exist_ok=True)
+            _migrate_track_entries(self._cache_dir)
 
         self._check_limit()
 
@@ -88,28 +135,32 @@ class LruCache(OrderedDict):
         return value
 
     def __getitem__(self, key, *_, **__):
-        try:
-            # Cache hit in memory
-            return super().__getitem__(key)
-        except KeyError as e:
-            if not self.persist:
-                # No persisted storage -> cache miss
-                raise e
+        key = canonical_uri(key)
+        with self._lock:
+            try:
+                # Cache hit in memory
+                return super().__getitem__(key)
+            except KeyError as e:
+                if not self.persist:
+                    # No persisted storage -> cache miss
+                    raise e
 
-        # Check on the persisted cache
-        return self._get_from_storage(key)
+            # Check on the persisted cache
+            return self._get_from_storage(key)
 
     def __setitem__(self, key, value, _sync_to_fs=True, *_, **__):
-        if super().__contains__(key):
-            del self[key]
+        key = canonical_uri(key)
+        with self._lock:
+            if super().__contains__(key):
+                del self[key]
 
-        super().__setitem__(key, value)
-        if self.persist and _sync_to_fs:
-            cache_file = self._cache_filename(key)
-            with open(cache_file, "wb") as f:
-                pickle.dump(value, f)
+            super().__setitem__(key, value)
+            if self.persist and _sync_to_fs:
+                cache_file = self._cache_filename(key)
+                with open(cache_file, "wb") as f:
+                    pickle.dump(value, f)
 
-        self._check_limit()
+            self._check_limit()
 
     def __contains__(self, key):
         return self.get(key) is not None
@@ -129,11 +180,14 @@ class LruCache(OrderedDict):
         """
         Delete the specified keys both from memory and disk.
         """
-        for key in keys:
-            logger.debug("Pruning key %r from cache %s", key, self.__class__.__name__)
+        with self._lock:
+            for key in map(canonical_uri, keys):
+                logger.debug(
+                    "Pruning key %r from cache %s", key, self.__class__.__name__
+                )
 
-            self._reset_stored_entry(key)
-            self.pop(key, None)
+                self._reset_stored_entry(key)
+                self.pop(key, None)
 
     def prune_all(self):
         """
@@ -142,8 +196,42 @@ class LruCache(OrderedDict):
         self.prune(*[*self.keys()])
 
     def update(self, *args, **kwargs):
-        super().update(*args, **kwargs)
-        self._check_limit()
+        with self._lock:
+            super().update(*args, **kwargs)
+            self._check_limit()
+
+    def add_missing(self, entries: Dict):
+        """
+        Store the entries whose keys aren't cached yet, in memory or on disk,
+        and leave the cached ones untouched. The new entries are written to
+        disk outside of the lock, so that a bulk write doesn't block the
+        readers of the cache.
+        """
+        new_entries = {}
+        with self._lock:
+            for key, value in entries.items():
+                key = canonical_uri(key)
+                if super().__contains__(key) or (
+                    self.persist and os.path.isfile(self._cache_filename(key))
+                ):
+                    continue
+
+                super().__setitem__(key, value)
+                new_entries[key] = value
+
+            self._check_limit()
+
+        if not self.persist:
+            return
+
+        for key, value in new_entries.items():
+            cache_file = self._cache_filename(key)
+            # Replace the file at once, in case the entry is written
+            # concurrently
+            tmp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, "wb") as f:
+                pickle.dump(value, f)
+            os.replace(tmp_file, cache_file)
 
     def _check_limit(self):
         if self.max_size:
@@ -3,17 +3,29 @@ from __future__ import unicode_literals
 import logging
 
 from mopidy import backend
+from requests.exceptions import ConnectionError, Timeout
+
+from mopidy_tidal.request_context import Priority, with_deadline, with_priority
+from mopidy_tidal.single_flight import coalesce
 
 logger = logging.getLogger(__name__)
 
 
 class TidalPlaybackProvider(backend.PlaybackProvider):
+    @with_deadline("playback")
+    @with_priority(Priority.PLAYBACK)
     def translate_uri(self, uri):
         logger.info("TIDAL uri: %s", uri)
         parts = uri.split(":")
         track_id = int(parts[4])
         session = self.backend._session
 
-        newurl = session.track(track_id).get_url()
+        try:
+            track = coalesce("track", track_id, session.track, track_id)
+            newurl = coalesce("track_url", track_id, track.get_url)
+        except (ConnectionError, Timeout) as err:
+            logger.error("Could not resolve %s: TIDAL unavailable (%s)", uri, err)
+            return None
+
         logger.info("transformed into %s", newurl)
         return newurl
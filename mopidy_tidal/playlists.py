@@ -5,22 +5,26 @@ import logging
 import operator
 import os
 import pathlib
-from concurrent.futures import ThreadPoolExecutor
-from threading import Event, Timer
-from typing import Collection, List, Optional, Tuple, Union
+from concurrent.futures import Future
+from threading import Event, Lock, Timer
+from typing import Collection, Dict, List, Optional, Tuple, Union
 
 from mopidy import backend
 from mopidy.models import Playlist as MopidyPlaylist
 from mopidy.models import Ref
 from requests import HTTPError
+from requests.exceptions import ConnectionError, Timeout
 from tidalapi.playlist import Playlist as TidalPlaylist
 
 from mopidy_tidal import full_models_mappers
 from mopidy_tidal.full_models_mappers import create_mopidy_playlist
 from mopidy_tidal.helpers import to_timestamp
+from mopidy_tidal.image_index import index_playlist
 from mopidy_tidal.lru_cache import LruCache
+from mopidy_tidal.request_context import Priority, priority
+from mopidy_tidal.single_flight import coalesce
 from mopidy_tidal.utils import mock_track
-from mopidy_tidal.workers import get_items
+from mopidy_tidal.workers import get_items, get_pool, parallel_map
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +69,9 @@ class TidalPlaylistsProvider(backend.PlaylistsProvider):
         self._playlists = PlaylistCache()
         self._current_tidal_playlists = []
         self._playlists_loaded_event = Event()
+        # Full refreshes running in the background, by `include_items`
+        self._full_refreshes: Dict[bool, Future] = {}
+        self._full_refreshes_lock = Lock()
 
     def _calculate_added_and_removed_playlist_ids(
         self,
@@ -73,21 +80,18 @@ class TidalPlaylistsProvider(backend.PlaylistsProvider):
         session = self.backend._session  # type: ignore
         updated_playlists = []
 
-        with ThreadPoolExecutor(
-            2, thread_name_prefix="mopidy-tidal-playlists-refresh-"
-        ) as pool:
-            pool_res = pool.map(
-                lambda func: get_items(func)
-                if func == session.user.favorites.playlists
-                else func(),
-                [
-                    session.user.favorites.playlists,
-                    session.user.playlists,
-                ],
-            )
+        pool_res = parallel_map(
+            lambda func: get_items(func)
+            if func == session.user.favorites.playlists
+            else func(),
+            [
+                session.user.favorites.playlists,
+                session.user.playlists,
+            ],
+        )
 
-            for playlists in pool_res:
-                updated_playlists += playlists
+        for playlists in pool_res:
+            updated_playlists += playlists
 
         self._current_tidal_playlists = updated_playlists
         updated_ids = set(pl.id for pl in updated_playlists)
@@ -97,19 +101,24 @@ class TidalPlaylistsProvider(backend.PlaylistsProvider):
         current_ids = set(uri.split(":")[-1] for uri in self._playlists_metadata.keys())
         added_ids = updated_ids.difference(current_ids)
         removed_ids = current_ids.difference(updated_ids)
-        self._playlists_metadata.prune(
-            *[
-                uri
-                for uri in self._playlists_metadata.keys()
-                if uri.split(":")[-1] in removed_ids
-            ]
-        )
+        removed_uris = [
+            uri
+            for uri in self._playlists_metadata.keys()
+            if uri.split(":")[-1] in removed_ids
+        ]
+        self._playlists_metadata.prune(*removed_uris)
+        for uri in removed_uris:
+            self.backend.library.update_search_index(uri, [])
 
         return added_ids, removed_ids
 
     def _has_changes(self, playlist: MopidyPlaylist):
 
-        upstream_playlist = self.backend._session.playlist(playlist.uri.split(":")[-1])
+        session = self.backend._session
+        playlist_id = playlist.uri.split(":")[-1]
+        upstream_playlist = coalesce(
+            "playlist", playlist_id, session.playlist, playlist_id
+        )
         if not upstream_playlist:
             return True
 
@@ -135,9 +144,19 @@ class TidalPlaylistsProvider(backend.PlaylistsProvider):
 
     def as_list(self):
         if not self._playlists_loaded_event.is_set():
-            added_ids, _ = self._calculate_added_and_removed_playlist_ids()
+            try:
+                added_ids, _ = self._calculate_added_and_removed_playlist_ids()
+            except (ConnectionError, Timeout) as err:
+                logger.warning(
+                    "TIDAL unavailable when listing playlists (%s): "
+                    "using cached data",
+                    err,
+                )
+                added_ids = None
+
             if added_ids:
-                self.refresh(include_items=False)
+                # The client is waiting for the list
+                self._refresh(include_items=False)
 
         logger.debug("Listing TIDAL playlists..")
         refs = [
@@ -150,7 +169,7 @@ class TidalPlaylistsProvider(backend.PlaylistsProvider):
     def _lookup_mix(self, uri):
         mix_id = uri.split(":")[-1]
         session = self.backend._session
-        return session.mix(mix_id)
+        return coalesce("mix", mix_id, session.mix, mix_id)
 
     def _get_or_refresh_playlist(self, uri) -> Optional[MopidyPlaylist]:
         parts = uri.split(":")
@@ -196,11 +215,36 @@ class TidalPlaylistsProvider(backend.PlaylistsProvider):
 
         self._playlists_metadata.prune(uri)
         self._playlists.prune(uri)
+        self.backend.library.update_search_index(uri, [])
 
     def lookup(self, uri):
         return self._get_or_refresh_playlist(uri)
 
-    def refresh(self, *uris, include_items: bool = True):
+    def refresh(self, *uris, include_items: bool = True) -> Optional[Future]:
+        if uris:
+            return self._refresh(*uris, include_items=include_items)
+
+        # A full refresh can take a while: run it on the worker pool, so that
+        # the client requests sent to the backend meanwhile don't wait for
+        # it. The caches are updated when it completes.
+        with self._full_refreshes_lock:
+            running = self._full_refreshes.get(include_items)
+            if running and not running.done():
+                return running
+
+            future = get_pool().submit(self._refresh_in_background, include_items)
+            self._full_refreshes[include_items] = future
+            return future
+
+    def _refresh_in_background(self, include_items: bool):
+        with priority(Priority.BACKGROUND):
+            try:
+                self._refresh(include_items=include_items)
+            except Exception as e:
+                logger.error("Could not refresh the TIDAL playlists: %s", e)
+                raise
+
+    def _refresh(self, *uris, include_items: bool = True):
         if uris:
             logger.info("Looking up playlists: %r", uris)
         else:
@@ -227,6 +271,7 @@ class TidalPlaylistsProvider(backend.PlaylistsProvider):
                 # the actual list.
                 tracks = [mock_track] * pl.num_tracks
 
+            index_playlist(pl)
             mapped_playlists[uri] = MopidyPlaylist(
                 uri=uri,
                 name=pl.name,
@@ -250,6 +295,9 @@ class TidalPlaylistsProvider(backend.PlaylistsProvider):
 
         # Update the right playlist cache and send the playlists_loaded event.
         playlist_cache.update(mapped_playlists)
+        if include_items:
+            for uri, playlist in mapped_playlists.items():
+                self.backend.library.update_search_index(uri, playlist.tracks)
         backend.BackendListener.send("playlists_loaded")
         logger.info("TIDAL playlists refreshed")
 
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Shortest wait between two attempts to take a token, so that float rounding
+# on the refill can't turn the wait into a busy loop
+min_wait = 0.001
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """
+        :param rate: Number of tokens added to the bucket per second
+        :param burst: Max number of tokens the bucket can hold, i.e. how many
+            requests can be sent back-to-back after an idle period
+            (default: same as `rate`)
+        """
+        assert rate > 0, f"Invalid rate: {rate}"
+        self._rate = rate
+        self._capacity = max(1, burst or int(rate))
+        self._tokens = float(self._capacity)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self._last_refill)
+        self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+        self._last_refill = now
+
+    def _reserve(self, priority: int) -> float:
+        """
+        Take a token if one is available, otherwise return how long the caller
+        should wait before trying again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+
+            self._refill(now)
+            if any(p < priority for p, n in self._waiting.items() if n):
+                # Leave the next token to the more urgent callers
+                return max(min_wait, 1 / self._rate)
+
+            if self._tokens >= 1 - 1e-9:
+                self._tokens = max(0.0, self._tokens - 1)
+                return 0.0
+
+            return max(min_wait, (1 - self._tokens) / self._rate)
+
+    def acquire(self, priority: int = 0):
+        """
+        Block until a token is available and consume it.
+
+        :param priority: Callers with lower values are served first while
+            they are waiting for a token
+        """
+        with self._lock:
+            self._waiting[priority] += 1
+
+        try:
+            while True:
+                wait = self._reserve(priority)
+                if not wait:
+                    return
+                time.sleep(wait)
+        finally:
+            with self._lock:
+                self._waiting[priority] -= 1
+
+    def pause(self, seconds: float):
+        """
+        Stop handing out tokens for the next `seconds`, e.g. because the server
+        asked us to back off. The bucket is drained as well, so requests resume
+        at the steady rate rather than with a burst.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._last_refill = self._paused_until
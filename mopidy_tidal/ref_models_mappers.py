@@ -4,6 +4,13 @@ import logging
 
 from mopidy.models import Ref
 
+from mopidy_tidal.image_index import (
+    index_album,
+    index_artist,
+    index_playlist,
+    index_track,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,6 +31,7 @@ def create_artists(tidal_artists):
 
 
 def create_artist(tidal_artist):
+    index_artist(tidal_artist)
     return Ref.artist(
         uri="tidal:artist:" + str(tidal_artist.id), name=tidal_artist.name
     )
@@ -34,6 +42,7 @@ def create_playlists(tidal_playlists):
 
 
 def create_playlist(tidal_playlist):
+    index_playlist(tidal_playlist)
     return Ref.playlist(
         uri="tidal:playlist:" + str(tidal_playlist.id), name=tidal_playlist.name
     )
@@ -73,6 +82,7 @@ def create_albums(tidal_albums):
 
 
 def create_album(tidal_album):
+    index_album(tidal_album)
     return Ref.album(uri="tidal:album:" + str(tidal_album.id), name=tidal_album.name)
 
 
@@ -84,4 +94,5 @@ def create_track(tidal_track):
     uri = "tidal:track:{0}:{1}:{2}".format(
         tidal_track.artist.id, tidal_track.album.id, tidal_track.id
     )
+    index_track(tidal_track)
     return Ref.track(uri=uri, name=tidal_track.name)
@@ -0,0 +1,260 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from enum import IntEnum
+from typing import Callable, Optional
+
+from requests.exceptions import Timeout
+
+from mopidy_tidal import context
+
+logger = logging.getLogger(__name__)
+
+default_api_timeout = 10
+
+
+class DeadlineExceeded(Timeout):
+    """
+    The deadline of the current operation expired before the request could
+    be sent.
+    """
+
+
+class Cancelled(Timeout):
+    """
+    The current operation was cancelled, e.g. because its result is no longer
+    wanted, before the request could be sent.
+    """
+
+
+class CancellationToken:
+    """
+    Flag shared by all the requests of an operation, set when the operation
+    is abandoned. A token created under another one is also cancelled when
+    its parent is.
+    """
+
+    def __init__(self, parent: Optional["CancellationToken"] = None):
+        self._parent = parent
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or bool(self._parent and self._parent.cancelled)
+
+    def cancel(self):
+        self._event.set()
+
+
+class Priority(IntEnum):
+    """
+    Priority classes of the API requests. Lower values are served first when
+    requests are waiting for a concurrency slot or a rate limit token.
+    """
+
+    # Resolving the stream of the track that is about to be played
+    PLAYBACK = 0
+    # Requests issued on behalf of a client (browse, lookup, search...)
+    INTERACTIVE = 1
+    # Playlist refreshes, cache warming and other work nobody is waiting on
+    BACKGROUND = 2
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    """
+    Per-operation state that applies to all the API requests issued on behalf
+    of an operation (e.g. a `browse` or a `lookup`), including those sent by
+    the worker threads it fans out to.
+    """
+
+    # time.monotonic() value after which no more requests should be sent
+    deadline: Optional[float] = None
+    priority: Priority = Priority.INTERACTIVE
+    cancel_token: Optional[CancellationToken] = None
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def check(self):
+        """
+        Raise :class:`Cancelled` or :class:`DeadlineExceeded` if no more
+        requests should be sent on behalf of this operation.
+        """
+        if self.cancel_token and self.cancel_token.cancelled:
+            raise Cancelled("Operation cancelled")
+
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("Operation deadline exceeded")
+
+
+# A context variable rather than a thread local, so that each asyncio task
+# running on the async engine loop gets its own value
+_context: contextvars.ContextVar = contextvars.ContextVar(
+    "mopidy_tidal_request_context", default=None
+)
+
+
+def current() -> RequestContext:
+    return _context.get() or RequestContext()
+
+
+@contextmanager
+def use(ctx: RequestContext):
+    """
+    Make `ctx` the request context of the current thread (or task).
+    """
+    token = _context.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _context.reset(token)
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    Bind `func` to the request context of the calling thread, so that it runs
+    with the same context when it is called from another thread.
+    """
+    ctx = current()
+
+    if asyncio.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with use(ctx):
+                return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with use(ctx):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Set a deadline `seconds` from now on the current operation. A deadline
+    that is already set is only ever shortened.
+    """
+    ctx = current()
+    new_deadline = time.monotonic() + seconds
+    if ctx.deadline is not None:
+        new_deadline = min(ctx.deadline, new_deadline)
+
+    with use(replace(ctx, deadline=new_deadline)) as new_ctx:
+        yield new_ctx
+
+
+@contextmanager
+def cancellable(token: Optional[CancellationToken] = None):
+    """
+    Make the current operation cancellable through `token` (a new one by
+    default, linked to the token of the enclosing operation if any).
+    Cancelling the token stops the operation from sending any new
+    request, including from the worker threads it fanned out to.
+    """
+    ctx = current()
+    token = token or CancellationToken(ctx.cancel_token)
+    with use(replace(ctx, cancel_token=token)) as new_ctx:
+        yield new_ctx
+
+
+def check_cancelled():
+    """
+    Raise :class:`Cancelled` or :class:`DeadlineExceeded` if the current
+    operation should not send any more requests.
+    """
+    current().check()
+
+
+@contextmanager
+def priority(level: Priority):
+    """
+    Run the current operation, and the requests it issues, with the `level`
+    priority.
+    """
+    with use(replace(current(), priority=level)) as new_ctx:
+        yield new_ctx
+
+
+def with_priority(level: Priority):
+    """
+    Decorator that runs a provider method with the `level` priority.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with priority(level):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_configured_timeout(default: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout of a single request: `default`, or the configured `api_timeout`.
+    """
+    return default or _get_config_value("api_timeout", default_api_timeout)
+
+
+def get_request_timeout(default: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout to apply to the next request: the configured `api_timeout`, or
+    less if the deadline of the current operation is closer.
+    """
+    timeout = get_configured_timeout(default)
+    ctx = current()
+    ctx.check()
+    remaining = ctx.remaining()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("Operation deadline exceeded")
+    return min(timeout, remaining) if timeout else remaining
+
+
+def _get_config_value(key: str, default=None):
+    try:
+        cfg = context.get_config()
+    except ValueError:
+        return default
+
+    value = cfg.get("tidal", {}).get(key)
+    return default if value is None else value
+
+
+def with_deadline(operation: str):
+    """
+    Decorator that runs a provider method under the deadline configured for
+    `operation` (`<operation>_timeout` in the extension config), if any.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            seconds = _get_config_value(f"{operation}_timeout")
+            if not seconds:
+                return func(*args, **kwargs)
+
+            with deadline(seconds):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
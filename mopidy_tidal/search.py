@@ -2,7 +2,6 @@ from __future__ import unicode_literals
 
 import logging
 from collections import OrderedDict
-from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import IntEnum
 from typing import (
@@ -28,6 +27,7 @@ from mopidy_tidal.full_models_mappers import (
     create_mopidy_tracks,
 )
 from mopidy_tidal.utils import remove_watermark
+from mopidy_tidal.workers import parallel_map
 
 logger = logging.getLogger(__name__)
 
@@ -158,14 +158,11 @@ def _expand_results_tracks(
     artists = results_[0]
     albums = results_[1]
 
-    with ThreadPoolExecutor(4, thread_name_prefix="mopidy-tidal-search-") as pool:
-        pool_res = pool.map(_expand_artist_top_tracks, artists)
-        for tracks in pool_res:
-            results_[2].extend(tracks)
+    for tracks in parallel_map(_expand_artist_top_tracks, artists):
+        results_[2].extend(tracks)
 
-        pool_res = pool.map(_expand_album_tracks, albums)
-        for tracks in pool_res:
-            results_[2].extend(tracks)
+    for tracks in parallel_map(_expand_album_tracks, albums):
+        results_[2].extend(tracks)
 
     # Remove any duplicate tracks from results
     tracks_by_id = OrderedDict({track.id: track for track in results_[2]})
@@ -0,0 +1,238 @@
+import logging
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from mopidy.models import Album, Artist, Track
+
+from mopidy_tidal.utils import remove_watermark
+
+logger = logging.getLogger(__name__)
+
+# Query fields supported by the index
+search_fields = ("any", "artist", "albumartist", "album", "track_name")
+
+
+def normalize(text: str) -> str:
+    """
+    Casefold `text` and strip its accents, so that e.g. `Beyoncé` and
+    `beyonce` match.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", normalize(text))
+
+
+def _names(items) -> List[str]:
+    return [item.name for item in items if item and item.name]
+
+
+def _get_fields(item) -> Dict[str, List[str]]:
+    if isinstance(item, Artist):
+        fields = {"artist": _names([item]), "albumartist": _names([item])}
+    elif isinstance(item, Album):
+        fields = {
+            "artist": _names(item.artists),
+            "albumartist": _names(item.artists),
+            "album": _names([item]),
+        }
+    else:
+        album = item.album
+        fields = {
+            "artist": _names(item.artists),
+            "albumartist": _names(album.artists) if album else [],
+            "album": _names([album]),
+            "track_name": _names([item]),
+        }
+
+    fields["any"] = [name for names in fields.values() for name in names]
+    return {
+        field: [normalize(name) for name in names] for field, names in fields.items()
+    }
+
+
+def _get_related_items(item) -> List:
+    if isinstance(item, Track):
+        album = item.album
+        return [album, *item.artists, *(album.artists if album else [])]
+    if isinstance(item, Album):
+        return list(item.artists)
+    return []
+
+
+class SearchIndex:
+    """
+    In-memory inverted index of the artists, albums and tracks known locally
+    (the user's collection, cached playlists and looked up items), so that
+    they can be searched without any request.
+
+    Tokens are casefolded and accent-insensitive. An item matches a query if
+    all the tokens of each queried field are found in that field of the
+    item, or, for exact searches, if the whole value of the field matches.
+    """
+
+    def __init__(self):
+        self._items: Dict[str, object] = {}
+        # Position of each item in the order of indexing
+        self._positions: Dict[str, int] = {}
+        # Normalized field values, by URI
+        self._fields: Dict[str, Dict[str, List[str]]] = {}
+        # (field, token) -> URIs
+        self._postings: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        # Last list of items added for each source
+        self._sources: Dict[str, object] = {}
+        # URIs indexed for each source, and number of sources of each URI
+        self._source_uris: Dict[str, Set[str]] = {}
+        self._source_counts: Dict[str, int] = defaultdict(int)
+        # URIs added outside of any source, which are kept
+        self._pinned: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, items: Iterable):
+        """
+        Index `items`, as well as the albums and artists of the tracks and
+        the artists of the albums.
+        """
+        with self._lock:
+            self._pinned.update(self._add_all(items))
+
+    def update(self, source: str, items: List):
+        """
+        Index `items` as the items of `source` (e.g. a playlist), unless they
+        are the same list as the last one indexed for it. The items that
+        `source` no longer has are removed, unless another source has them:
+        an empty list removes all the items of `source`.
+        """
+        if self._sources.get(source) is items:
+            return
+
+        with self._lock:
+            uris = self._add_all(items)
+            previous_uris = self._source_uris.get(source, set())
+            for uri in uris - previous_uris:
+                self._source_counts[uri] += 1
+            for uri in previous_uris - uris:
+                self._source_counts[uri] -= 1
+                if not self._source_counts[uri]:
+                    del self._source_counts[uri]
+                    if uri not in self._pinned:
+                        self._remove(uri)
+
+            if uris:
+                self._source_uris[source] = uris
+                self._sources[source] = items
+            else:
+                self._source_uris.pop(source, None)
+                self._sources.pop(source, None)
+
+    def _add_all(self, items: Iterable) -> Set[str]:
+        uris = set()
+        for item in items:
+            for related_item in [*_get_related_items(item), item]:
+                if self._add(related_item):
+                    uris.add(related_item.uri)
+        return uris
+
+    def _add(self, item) -> bool:
+        if not (item and item.uri and item.name):
+            return False
+
+        previous = self._items.get(item.uri)
+        if previous == item:
+            return True
+        if previous is not None:
+            self._unindex(item.uri)
+
+        fields = _get_fields(item)
+        self._items[item.uri] = item
+        self._positions.setdefault(item.uri, len(self._positions))
+        self._fields[item.uri] = fields
+        for field, values in fields.items():
+            for value in values:
+                for token in tokenize(value):
+                    self._postings[(field, token)].add(item.uri)
+        return True
+
+    def _remove(self, uri: str):
+        self._unindex(uri)
+        self._positions.pop(uri, None)
+
+    def _unindex(self, uri: str):
+        self._items.pop(uri, None)
+        for field, values in self._fields.pop(uri, {}).items():
+            for value in values:
+                for token in tokenize(value):
+                    uris = self._postings.get((field, token))
+                    if uris is not None:
+                        uris.discard(uri)
+                        if not uris:
+                            del self._postings[(field, token)]
+
+    @staticmethod
+    def _get_terms(query: Mapping) -> Dict[str, str]:
+        terms = {}
+        if not isinstance(query, Mapping):
+            return terms
+
+        for field, value in query.items():
+            if hasattr(value, "__iter__") and not isinstance(value, (str, bytes)):
+                value = " ".join(str(v) for v in value)
+            value = remove_watermark(value)
+            if value and field in search_fields:
+                terms[field] = normalize(value)
+        return terms
+
+    def _match(self, field: str, value: str, exact: bool) -> Set[str]:
+        tokens = tokenize(value)
+        if not tokens:
+            return set()
+
+        uris = set.intersection(
+            *(self._postings.get((field, token), set()) for token in tokens)
+        )
+        if exact:
+            uris = {uri for uri in uris if value in self._fields[uri][field]}
+        return uris
+
+    def search(
+        self, query: Mapping, exact: bool = False
+    ) -> Tuple[List[Artist], List[Album], List[Track]]:
+        """
+        Search the index.
+
+        :param query: Mopidy search query. Fields the index doesn't support
+            make the query return no results
+        :return: The matching artists, albums and tracks
+        """
+        results = [], [], []
+        terms = self._get_terms(query)
+        if not terms or set(query) - set(search_fields):
+            return results
+
+        with self._lock:
+            uris: Optional[Set[str]] = None
+            for field, value in terms.items():
+                matches = self._match(field, value, exact)
+                uris = matches if uris is None else uris & matches
+                if not uris:
+                    return results
+
+            # Keep the order in which the items were indexed
+            for uri in sorted(uris, key=self._positions.__getitem__):
+                item = self._items[uri]
+                if isinstance(item, Artist):
+                    results[0].append(item)
+                elif isinstance(item, Album):
+                    results[1].append(item)
+                else:
+                    results[2].append(item)
+
+        return results
@@ -0,0 +1,84 @@
+import logging
+import threading
+from typing import Callable, Dict, Hashable
+
+from mopidy_tidal.request_context import Cancelled, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share the same key: the first caller runs
+    the function, while the others wait for it to complete and get the same
+    result (or exception). Nothing is cached once the call has completed.
+
+    If the first caller's own operation is cancelled or runs out of time, the
+    other callers don't share that error: they retry the call under their own
+    context instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def __call__(self, key: Hashable, func: Callable, *args, **kwargs):
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call:
+                    logger.debug("Waiting on in-flight request for %r", key)
+                    leader = False
+                else:
+                    call = self._calls[key] = _Call()
+                    leader = True
+
+            if leader:
+                break
+
+            try:
+                return call.wait()
+            except (Cancelled, DeadlineExceeded) as e:
+                # The error belongs to the operation of the first caller
+                logger.debug(
+                    "In-flight request for %r abandoned (%s): retrying", key, e
+                )
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.wait()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+single_flight = SingleFlight()
+
+
+def coalesce(endpoint: str, item_id, func: Callable, *args, **kwargs):
+    """
+    Run an API request through the shared :class:`SingleFlight`, keyed by the
+    requested endpoint (e.g. `album`, `album_tracks`) and item ID.
+    """
+    return single_flight((endpoint, str(item_id)), func, *args, **kwargs)
@@ -1,5 +1,160 @@
-from concurrent.futures import ThreadPoolExecutor
-from typing import Callable
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+from mopidy_tidal import concurrency, context, request_context
+
+logger = logging.getLogger(__name__)
+
+default_pool_size = 10
+
+
+class _Task:
+    """
+    A unit of work submitted to the :class:`WorkerPool`.
+
+    A task can be run either by a pool thread or by the thread waiting for its
+    result, whichever claims it first. This is what makes nested submissions
+    safe: a worker that fans out and waits on its own sub-tasks will run the
+    ones that no other worker has picked up yet instead of blocking on them.
+    """
+
+    def __init__(self, func: Callable, arg):
+        self._func = func
+        self._arg = arg
+        self._claim = threading.Lock()
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+
+    def run(self):
+        if not self._claim.acquire(blocking=False):
+            # Already running (or done) on another thread
+            return
+
+        try:
+            self._result = self._func(self._arg)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def result(self):
+        self.run()
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class WorkerPool:
+    def __init__(self, max_workers: int = default_pool_size):
+        """
+        :param max_workers: Max number of threads shared by all the parallel
+            API requests of the extension (default: 10)
+        """
+        assert max_workers > 0, f"Invalid pool size: {max_workers}"
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="mopidy-tidal-worker-"
+        )
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    def map(self, func: Callable, items: Iterable) -> List:
+        """
+        Run `func` over `items` on the pool and return the results in order.
+        """
+        tasks = [_Task(func, item) for item in items]
+        if len(tasks) > 1:
+            for task in tasks:
+                self._executor.submit(task.run)
+
+        return [task.result() for task in tasks]
+
+    def submit(self, func: Callable, *args) -> Future:
+        """
+        Run `func` on the pool in the background.
+        """
+        return self._executor.submit(func, *args)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def _get_configured_pool_size() -> int:
+    try:
+        cfg = context.get_config()
+    except ValueError:
+        return default_pool_size
+
+    return cfg.get("tidal", {}).get("workers_pool_size") or default_pool_size
+
+
+def get_pool() -> WorkerPool:
+    """
+    Get the process-wide worker pool, creating it on first use.
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(_get_configured_pool_size())
+            logger.debug("Started TIDAL worker pool (%d threads)", _pool.max_workers)
+        return _pool
+
+
+def shutdown_pool():
+    """
+    Stop the process-wide worker pool. A new one will be created on the next
+    call to :func:`get_pool`.
+    """
+    global _pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+
+    if pool:
+        pool.shutdown(wait=False)
+
+
+def _get_async_engine():
+    try:
+        cfg = context.get_config()
+    except ValueError:
+        return None
+
+    tidal_config = cfg.get("tidal", {})
+    if not tidal_config.get("async_engine"):
+        return None
+
+    from mopidy_tidal.async_engine import default_max_concurrency, get_engine
+
+    return get_engine(
+        tidal_config.get("async_max_concurrency") or default_max_concurrency
+    )
+
+
+def parallel_map(func: Callable, items: Iterable) -> List:
+    """
+    Run `func` over `items` on the shared worker pool, or on the async engine
+    if `async_engine` is enabled.
+    """
+    func = request_context.propagate(func)
+    engine = _get_async_engine()
+    if engine and not engine.is_engine_thread():
+        return engine.map(func, items)
+
+    # Nested fan-outs started from the async engine go through the worker
+    # pool, which can run them on the calling thread if needed
+    return get_pool().map(func, items)
 
 
 def func_wrapper(args):
@@ -13,43 +168,56 @@ def get_items(
     *args,
     parse: Callable = lambda _: _,
     chunk_size: int = 100,
-    processes: int = 5,
+    processes: Optional[int] = None,
+    probe: bool = False,
 ):
     """
     This function performs pagination on a function that supports
     `limit`/`offset` parameters and it runs API requests in parallel to speed
     things up.
+
+    If `processes` is not set, the number of pages requested in parallel
+    follows the shared adaptive concurrency limit, and it is re-evaluated
+    after each round of requests.
+
+    If `probe` is set, the first page is fetched on its own and the following
+    pages are only requested if it came back full, which saves the requests
+    for results that usually fit in a single page.
     """
     items = []
-    offsets = [-chunk_size]
-    remaining = chunk_size * processes
-
-    with ThreadPoolExecutor(
-        processes, thread_name_prefix=f"mopidy-tidal-{func.__name__}-"
-    ) as pool:
-        while remaining == chunk_size * processes:
-            offsets = [offsets[-1] + chunk_size * (i + 1) for i in range(processes)]
-
-            pool_results = pool.map(
-                func_wrapper,
-                [
-                    (
-                        func,
-                        offset,
-                        *args,
-                        chunk_size,  # limit
-                        offset,  # offset
-                    )
-                    for offset in offsets
-                ],
-            )
-
-            new_items = []
-            for results in pool_results:
-                new_items.extend(results)
-
-            remaining = len(new_items)
-            items.extend(new_items)
+    next_offset = 0
+    last_page_full = True
+
+    while last_page_full:
+        # Don't request any more pages if the result is no longer wanted
+        request_context.check_cancelled()
+        if probe and not next_offset:
+            n_pages = 1
+        else:
+            n_pages = processes or concurrency.get_limiter().limit
+        offsets = [next_offset + chunk_size * i for i in range(n_pages)]
+        next_offset += chunk_size * n_pages
+
+        pool_results = parallel_map(
+            func_wrapper,
+            [
+                (
+                    func,
+                    offset,
+                    *args,
+                    chunk_size,  # limit
+                    offset,  # offset
+                )
+                for offset in offsets
+            ],
+        )
+
+        new_items = []
+        for results in pool_results:
+            new_items.extend(results)
+
+        last_page_full = len(new_items) == chunk_size * n_pages
+        items.extend(new_items)
 
     items = [_ for _ in items if _]
     sorted_items = list(
@@ -7,7 +7,7 @@ from tidalapi.artist import Artist
 from tidalapi.media import Track
 from tidalapi.playlist import UserPlaylist
 
-from mopidy_tidal import context
+from mopidy_tidal import concurrency, context, image_index
 
 
 @pytest.fixture
@@ -35,6 +35,20 @@ def config(tmp_path):
     context.set_config(None)
 
 
+@pytest.fixture(autouse=True)
+def reset_concurrency_limit():
+    """Reset the shared adaptive concurrency limit after each test."""
+    yield
+    concurrency.configure(concurrency.default_max_limit)
+
+
+@pytest.fixture(autouse=True)
+def reset_image_index():
+    """Forget the image IDs captured by the mappers after each test."""
+    yield
+    image_index.get_image_index().clear()
+
+
 @pytest.fixture
 def tidal_search(config, mocker):
     """Provide an uncached tidal_search.
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from mopidy_tidal import workers
+from mopidy_tidal.async_engine import AsyncEngine, get_engine, shutdown_engine
+
+
+class _Handler(BaseHTTPRequestHandler):
+    delay = 0.2
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+@pytest.fixture
+def server():
+    """A local stand-in for the TIDAL API: it echoes the requested path."""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def engine():
+    engine = AsyncEngine(max_concurrency=20)
+    yield engine
+    engine.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_engine():
+    yield
+    shutdown_engine()
+
+
+def test_map_blocking_requests(engine, server):
+    def fetch(i):
+        return requests.get(f"{server}/page/{i}").text
+
+    start = time.monotonic()
+    res = engine.map(fetch, range(20))
+    elapsed = time.monotonic() - start
+
+    assert res == [f"/page/{i}" for i in range(20)]
+    # All the requests are in flight at the same time
+    assert elapsed < 20 * _Handler.delay / 2
+
+
+def test_map_coroutines(engine, server):
+    host, port = server.split("//")[1].split(":")
+
+    async def fetch(i):
+        reader, writer = await asyncio.open_connection(host, int(port))
+        writer.write(f"GET /album/{i} HTTP/1.0\r\n\r\n".encode())
+        await writer.drain()
+        data = await reader.read()
+        writer.close()
+        return data.split(b"\r\n\r\n", 1)[1].decode()
+
+    assert engine.map(fetch, range(30)) == [f"/album/{i}" for i in range(30)]
+
+
+def test_map_is_bounded():
+    engine = AsyncEngine(max_concurrency=3)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def f(x):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return x
+
+    try:
+        assert engine.map(f, range(12)) == list(range(12))
+    finally:
+        engine.shutdown()
+    assert peak <= 3
+
+
+def test_map_raises(engine):
+    def f(x):
+        raise ValueError(x)
+
+    with pytest.raises(ValueError):
+        engine.map(f, range(3))
+
+
+def test_shared_engine():
+    engine = get_engine(7)
+    assert engine is get_engine()
+    assert engine.max_concurrency == 7
+    shutdown_engine()
+    assert get_engine() is not engine
+
+
+def test_parallel_map_uses_engine(config, mocker):
+    config["tidal"]["async_engine"] = True
+    config["tidal"]["async_max_concurrency"] = 5
+    threads = workers.parallel_map(lambda _: threading.current_thread().name, range(3))
+    assert all(t.startswith("mopidy-tidal-async-") for t in threads)
+    assert get_engine().max_concurrency == 5
+
+
+def test_parallel_map_nested_in_engine(config):
+    config["tidal"]["async_engine"] = True
+
+    def outer(x):
+        return sum(workers.parallel_map(lambda y: x * y, range(4)))
+
+    assert workers.parallel_map(outer, range(3)) == [0, 6, 12]
+
+
+def test_parallel_map_engine_disabled(config, mocker):
+    get_engine = mocker.patch("mopidy_tidal.async_engine.get_engine")
+    assert workers.parallel_map(lambda x: x, range(3)) == [0, 1, 2]
+    get_engine.assert_not_called()
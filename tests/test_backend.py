@@ -11,8 +11,9 @@ from mopidy_tidal.playlists import TidalPlaylistsProvider
 
 
 @pytest.fixture
-def get_backend(mocker):
-    def _get_backend(config=mocker.MagicMock(), audio=mocker.Mock()):
+def get_backend(mocker, config):
+    # The caches are stored under the temporary directory of the config
+    def _get_backend(config=config, audio=mocker.Mock()):
         backend = TidalBackend(config, audio)
         session_factory = mocker.Mock()
         session = mocker.Mock()
@@ -144,3 +145,31 @@ def test_loads_session(get_backend, mocker, config):
     backend.oauth_login_new_session.assert_not_called()
     session.load_oauth_session.assert_called_once_with(**args)
     session_factory.assert_called_once()
+
+
+def test_prewarms_connections(get_backend, mocker, config):
+    config["tidal"]["prewarm_connections"] = 3
+    backend, _, _, _, session = get_backend(config=config)
+    backend.oauth_login_new_session = mocker.Mock()
+    prewarm = mocker.patch("mopidy_tidal.backend.http_adapter.prewarm")
+    backend.on_start()
+    session.request_session.mount.assert_called_once()
+    prewarm.assert_called_once_with(
+        session.request_session, session.config.api_v1_location, 3
+    )
+
+
+def test_stop_shuts_down_track_caching(get_backend, mocker):
+    backend, *_ = get_backend()
+    backend.on_stop()
+    with pytest.raises(RuntimeError):
+        backend.library._cache_executor.submit(lambda: None)
+
+
+def test_prewarm_disabled(get_backend, mocker, config):
+    config["tidal"]["prewarm_connections"] = 0
+    backend, *_ = get_backend(config=config)
+    backend.oauth_login_new_session = mocker.Mock()
+    prewarm = mocker.patch("mopidy_tidal.backend.http_adapter.prewarm")
+    backend.on_start()
+    prewarm.assert_not_called()
@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+from requests import ConnectionError, HTTPError, Response
+from tidalapi.exceptions import ObjectNotFound
+
+from mopidy_tidal.batching import Batcher, fetch_albums, fetch_tracks
+from mopidy_tidal.request_context import DeadlineExceeded
+
+
+class Item:
+    def __init__(self, id):
+        self.id = id
+
+
+def get_concurrently(batcher, ids):
+    results = {}
+    barrier = threading.Barrier(len(ids))
+
+    def get(item_id):
+        barrier.wait()
+        try:
+            results[item_id] = batcher.get(item_id)
+        except Exception as e:
+            results[item_id] = e
+
+    threads = [threading.Thread(target=get, args=(i,)) for i in ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_single_id(mocker):
+    fetch_one = mocker.Mock(return_value="item")
+    fetch_many = mocker.Mock()
+    batcher = Batcher(fetch_one, fetch_many, window=0)
+    assert batcher.get(1) == "item"
+    fetch_one.assert_called_once_with("1")
+    fetch_many.assert_not_called()
+
+
+def test_concurrent_ids_are_batched(mocker):
+    fetch_one = mocker.Mock()
+    fetch_many = mocker.Mock(side_effect=lambda ids: {i: f"item-{i}" for i in ids})
+    batcher = Batcher(fetch_one, fetch_many, window=1, max_batch_size=4)
+
+    results = get_concurrently(batcher, ["1", "2", "3", "4"])
+    assert results == {i: f"item-{i}" for i in ("1", "2", "3", "4")}
+    fetch_many.assert_called_once()
+    assert sorted(fetch_many.call_args.args[0]) == ["1", "2", "3", "4"]
+    fetch_one.assert_not_called()
+
+
+def test_duplicate_ids(mocker):
+    fetch_many = mocker.Mock(side_effect=lambda ids: {i: i for i in ids})
+    fetch_one = mocker.Mock(side_effect=lambda i: i)
+    batcher = Batcher(fetch_one, fetch_many, window=0.5, max_batch_size=2)
+    assert get_concurrently(batcher, ["1", "1", "2"]) == {"1": "1", "2": "2"}
+
+
+def test_missing_ids_are_fetched_one_by_one(mocker):
+    def fetch_one(item_id):
+        raise ObjectNotFound(item_id)
+
+    fetch_many = mocker.Mock(return_value={"1": "item-1"})
+    batcher = Batcher(fetch_one, fetch_many, window=1, max_batch_size=2)
+    results = get_concurrently(batcher, ["1", "2"])
+    assert results["1"] == "item-1"
+    assert isinstance(results["2"], ObjectNotFound)
+
+
+def test_unsupported_multi_id_endpoint(mocker):
+    response = Response()
+    response.status_code = 400
+    fetch_many = mocker.Mock(side_effect=HTTPError(response=response))
+    fetch_one = mocker.Mock(side_effect=lambda i: f"item-{i}")
+    batcher = Batcher(fetch_one, fetch_many, window=1, max_batch_size=2)
+
+    assert get_concurrently(batcher, ["1", "2"]) == {"1": "item-1", "2": "item-2"}
+    assert get_concurrently(batcher, ["3", "4"]) == {"3": "item-3", "4": "item-4"}
+    fetch_many.assert_called_once()
+
+
+def test_batch_error(mocker):
+    fetch_many = mocker.Mock(side_effect=ConnectionError)
+    fetch_one = mocker.Mock()
+    batcher = Batcher(fetch_one, fetch_many, window=1, max_batch_size=2)
+    results = get_concurrently(batcher, ["1", "2"])
+    assert all(isinstance(r, ConnectionError) for r in results.values())
+    fetch_one.assert_not_called()
+
+
+def test_batch_deadline_is_not_shared(mocker):
+    fetch_many = mocker.Mock(side_effect=DeadlineExceeded)
+    fetch_one = mocker.Mock(side_effect=lambda i: f"item-{i}")
+    batcher = Batcher(fetch_one, fetch_many, window=1, max_batch_size=2)
+    results = get_concurrently(batcher, ["1", "2"])
+
+    # The leader's deadline expired, the other caller fetched its own item
+    errors = [i for i, r in results.items() if isinstance(r, DeadlineExceeded)]
+    assert len(errors) == 1
+    other = "2" if errors == ["1"] else "1"
+    assert results[other] == f"item-{other}"
+    fetch_one.assert_called_once_with(other)
+
+
+def test_invalid_batch_size():
+    with pytest.raises(AssertionError):
+        Batcher(lambda _: None, max_batch_size=0)
+
+
+@pytest.mark.parametrize(
+    "fetch, endpoint, parser",
+    [(fetch_albums, "albums", "parse_album"), (fetch_tracks, "tracks", "parse_track")],
+)
+def test_fetch_many(mocker, fetch, endpoint, parser):
+    session = mocker.Mock()
+    session.request.map_request.return_value = [Item(1), Item(2)]
+    results = fetch(session, ["1", "2"])
+    assert {k: v.id for k, v in results.items()} == {"1": 1, "2": 2}
+    session.request.map_request.assert_called_once_with(
+        endpoint, params={"ids": "1,2"}, parse=getattr(session, parser)
+    )
@@ -0,0 +1,18 @@
+import pytest
+
+from mopidy_tidal.helpers import canonical_uri
+
+
+@pytest.mark.parametrize(
+    "uri, res",
+    [
+        ("tidal:track:1:2:3", "tidal:track:3"),
+        ("tidal:track:3", "tidal:track:3"),
+        ("tidal:album:2", "tidal:album:2"),
+        ("tidal:playlist:abc-def", "tidal:playlist:abc-def"),
+        ("https://api.tidal.com/v1/tracks/3", "https://api.tidal.com/v1/tracks/3"),
+        (None, None),
+    ],
+)
+def test_canonical_uri(uri, res):
+    assert canonical_uri(uri) == res
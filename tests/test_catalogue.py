@@ -0,0 +1,95 @@
+import pytest
+
+from mopidy_tidal import catalogue
+from mopidy_tidal.catalogue import Catalogue
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [1000.0]
+    mocker.patch.object(catalogue.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def session(mocker):
+    session = mocker.Mock()
+    mood = mocker.Mock(api_path="pages/moods/1")
+    mood.get.return_value = iter(["playlist-1", "playlist-2"])
+    genre = mocker.Mock(path="pop")
+    genre.items.return_value = ["playlist-3"]
+    mix = mocker.Mock(id="abc")
+    mix.items.return_value = ["track-1"]
+    session.moods.return_value = [mood]
+    session.genre.get_genres.return_value = [genre]
+    session.mixes.return_value = [mix]
+    return session
+
+
+@pytest.fixture
+def cat(session, clock):
+    return Catalogue(lambda: session, ttl=60, mixes_ttl=3600)
+
+
+def test_catalogues_cached(cat, session, clock):
+    for _ in range(2):
+        assert len(cat.get_moods()) == 1
+        assert len(cat.get_genres()) == 1
+        assert len(cat.get_mixes()) == 1
+    session.moods.assert_called_once_with()
+    session.genre.get_genres.assert_called_once_with()
+    session.mixes.assert_called_once_with()
+
+    clock[0] += 60
+    cat.get_moods()
+    assert len(session.moods.mock_calls) == 2
+
+
+def test_items(cat, session):
+    for _ in range(2):
+        assert cat.get_mood_items("1") == ["playlist-1", "playlist-2"]
+        assert cat.get_genre_items("pop") == ["playlist-3"]
+        assert cat.get_mix_items("abc") == ["track-1"]
+
+    session.moods.assert_called_once_with()
+    session.moods.return_value[0].get.assert_called_once_with()
+    session.genre.get_genres.return_value[0].items.assert_called_once()
+    session.mixes.return_value[0].items.assert_called_once_with()
+
+
+def test_items_one_request(cat, session):
+    cat.get_moods()
+    session.reset_mock()
+    cat.get_mood_items("1")
+    assert not session.moods.called
+    session.moods.return_value[0].get.assert_called_once_with()
+
+
+def test_items_not_found(cat, session):
+    assert cat.get_mood_items("nonsuch") == []
+    assert cat.get_genre_items("nonsuch") == []
+    assert cat.get_mix_items("nonsuch") == []
+
+
+def test_items_not_found_not_cached(cat, session):
+    cat.get_mood_items("nonsuch")
+    cat.get_mood_items("nonsuch")
+    assert len(session.moods.return_value[0].get.mock_calls) == 0
+    # The catalogue itself is cached
+    session.moods.assert_called_once_with()
+
+    session.mixes.return_value[0].items.return_value = []
+    cat.get_mix_items("abc")
+    cat.get_mix_items("abc")
+    assert len(session.mixes.return_value[0].items.mock_calls) == 2
+
+
+def test_mixes_ttl(cat, session, clock):
+    cat.get_mix_items("abc")
+    clock[0] += 3599
+    cat.get_mix_items("abc")
+    session.mixes.assert_called_once_with()
+
+    clock[0] += 1
+    cat.get_mix_items("abc")
+    assert len(session.mixes.mock_calls) == 2
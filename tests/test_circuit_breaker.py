@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+from mopidy_tidal import circuit_breaker
+from mopidy_tidal.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [100.0]
+    mocker.patch.object(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def timer(mocker):
+    return mocker.patch.object(circuit_breaker.threading, "Timer")
+
+
+def test_opens_after_threshold(timer):
+    breaker = CircuitBreaker(failure_threshold=3)
+    for _ in range(2):
+        breaker.record_failure()
+        breaker.before_request()
+    breaker.record_failure()
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_success_resets_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert not breaker.is_open
+
+
+def test_background_probe(timer):
+    probe = iter([False, True])
+    breaker = CircuitBreaker(
+        failure_threshold=1, recovery_secs=7, probe=lambda: next(probe)
+    )
+    breaker.record_failure()
+    timer.assert_called_once_with(7, breaker._run_probe)
+    timer.return_value.start.assert_called_once_with()
+
+    breaker._run_probe()
+    assert breaker.is_open
+    assert len(timer.mock_calls) == 4  # Rescheduled
+
+    breaker._run_probe()
+    assert not breaker.is_open
+    breaker.before_request()
+
+
+def test_probe_error(timer):
+    def probe():
+        raise ConnectionError()
+
+    breaker = CircuitBreaker(failure_threshold=1, probe=probe)
+    breaker.record_failure()
+    breaker._run_probe()
+    assert breaker.is_open
+
+
+def test_probe_runs_in_background():
+    probed = threading.Event()
+
+    def probe():
+        probed.set()
+        return True
+
+    breaker = CircuitBreaker(failure_threshold=1, recovery_secs=0.01, probe=probe)
+    breaker.record_failure()
+    assert probed.wait(5)
+    breaker.close()
+
+
+def test_half_open_without_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_secs=30)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    clock[0] += 30
+    breaker.before_request()  # Probe request
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_success()
+    breaker.before_request()
+
+
+def test_close(timer):
+    breaker = CircuitBreaker(failure_threshold=1, probe=lambda: False)
+    breaker.record_failure()
+    breaker.close()
+    timer.return_value.cancel.assert_called_once_with()
+    assert not breaker.is_open
+
+
+def test_set_probe(timer):
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.set_probe(lambda: True)
+    breaker.record_failure()
+    timer.assert_called_once()
@@ -0,0 +1,150 @@
+import threading
+
+import pytest
+
+from mopidy_tidal import concurrency
+from mopidy_tidal.concurrency import AdaptiveLimit, configure, get_limiter
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [100.0]
+    mocker.patch.object(concurrency.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_props():
+    limit = AdaptiveLimit(initial_limit=3, min_limit=2, max_limit=8)
+    assert limit.limit == 3
+    assert limit.min_limit == 2
+    assert limit.max_limit == 8
+    assert limit.in_flight == 0
+
+
+def test_initial_limit_is_bounded():
+    assert AdaptiveLimit(initial_limit=20, max_limit=8).limit == 8
+    assert AdaptiveLimit(initial_limit=0, min_limit=2).limit == 2
+
+
+def test_invalid_limits():
+    with pytest.raises(AssertionError):
+        AdaptiveLimit(min_limit=5, max_limit=4)
+
+
+def test_additive_increase():
+    limit = AdaptiveLimit(initial_limit=2, max_limit=10)
+    for _ in range(2):
+        limit.on_success(0.1)
+    assert limit.limit == 3
+    for _ in range(3):
+        limit.on_success(0.1)
+    assert limit.limit == 4
+
+
+def test_increase_is_capped():
+    limit = AdaptiveLimit(initial_limit=2, max_limit=3)
+    for _ in range(100):
+        limit.on_success(0.1)
+    assert limit.limit == 3
+
+
+def test_failure_halves_the_limit(clock):
+    limit = AdaptiveLimit(initial_limit=8, max_limit=10)
+    limit.on_failure()
+    assert limit.limit == 4
+    # Within the cooldown period
+    limit.on_failure()
+    assert limit.limit == 4
+    clock[0] += 2
+    limit.on_failure()
+    assert limit.limit == 2
+    clock[0] += 2
+    limit.on_failure()
+    clock[0] += 2
+    limit.on_failure()
+    assert limit.limit == 1
+
+
+def test_latency_spike(clock):
+    limit = AdaptiveLimit(initial_limit=8, max_limit=10)
+    limit.on_success(0.4)
+    limit.on_success(0.4)
+    assert limit.limit == 8
+    limit.on_success(2.0)
+    assert limit.limit == 4
+
+
+def test_fast_requests_are_not_spikes():
+    limit = AdaptiveLimit(initial_limit=8, max_limit=10)
+    limit.on_success(0.01)
+    limit.on_success(0.1)
+    assert limit.limit == 8
+
+
+def test_stats():
+    limit = AdaptiveLimit(initial_limit=4, max_limit=6)
+    limit.on_success(0.2)
+    assert limit.stats() == {
+        "limit": 4,
+        "min_limit": 1,
+        "max_limit": 6,
+        "in_flight": 0,
+        "avg_latency": 0.2,
+    }
+
+
+def test_slots_are_bounded():
+    limit = AdaptiveLimit(initial_limit=2, max_limit=2)
+    peak = 0
+    lock = threading.Lock()
+
+    def run():
+        nonlocal peak
+        with limit.slot():
+            with lock:
+                peak = max(peak, limit.in_flight)
+            threading.Event().wait(0.01)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert peak == 2
+    assert limit.in_flight == 0
+
+
+def test_configure():
+    limiter = configure(3)
+    assert get_limiter() is limiter
+    assert limiter.max_limit == 3
+    assert limiter.limit == 3
+
+
+def test_slots_are_given_by_priority():
+    limit = AdaptiveLimit(initial_limit=1, max_limit=1)
+    order = []
+    queued = threading.Semaphore(0)
+
+    def run(name, priority):
+        queued.release()
+        with limit.slot(priority):
+            order.append(name)
+
+    with limit.slot():
+        threads = [
+            threading.Thread(target=run, args=("background", 2)),
+            threading.Thread(target=run, args=("interactive", 1)),
+            threading.Thread(target=run, args=("playback", 0)),
+        ]
+        for t in threads:
+            t.start()
+            queued.acquire()
+            threading.Event().wait(0.05)
+
+    for t in threads:
+        t.join()
+
+    assert order == ["playback", "interactive", "background"]
+    assert limit.in_flight == 0
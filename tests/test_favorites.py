@@ -0,0 +1,169 @@
+import pytest
+from requests.exceptions import ConnectionError, Timeout
+
+from mopidy_tidal import favorites
+from mopidy_tidal.favorites import FavoritesCache
+from mopidy_tidal.lru_cache import LruCache
+
+
+class Item:
+    def __init__(self, id):
+        self.uri = f"tidal:track:{id}"
+
+    def __eq__(self, other):
+        return self.uri == other.uri
+
+    def __repr__(self):
+        return self.uri
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [1000.0]
+    mocker.patch.object(favorites.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def collection():
+    # Newest first
+    return [Item(i) for i in range(250, 0, -1)]
+
+
+@pytest.fixture
+def fetch_page(mocker, collection):
+    return mocker.Mock(
+        side_effect=lambda limit, offset: collection[offset : offset + limit]
+    )
+
+
+@pytest.fixture
+def storage(config):
+    return LruCache(directory="favorites")
+
+
+@pytest.fixture
+def cache(fetch_page, storage, clock):
+    return FavoritesCache(
+        "tracks", fetch_page, list, full_refresh_secs=60, page_size=10, storage=storage
+    )
+
+
+def test_first_fetch_is_full(cache, fetch_page, collection):
+    assert cache.get() == collection
+    assert fetch_page.call_args_list[0] == ((100, 0),)
+    assert cache.snapshot.reconciled_at == 1000.0
+
+
+def test_no_changes(cache, fetch_page, collection):
+    cache.get()
+    fetch_page.reset_mock()
+    assert cache.get() == collection
+    fetch_page.assert_called_once_with(10, 0)
+
+
+def test_new_items(cache, fetch_page, collection):
+    cache.get()
+    fetch_page.reset_mock()
+    collection[:0] = [Item(i) for i in range(265, 250, -1)]
+    assert cache.get() == collection
+    assert fetch_page.mock_calls == [((10, 0),), ((10, 10),)]
+
+
+def test_all_new_items(cache, fetch_page, collection):
+    cache.get()
+    collection.clear()
+    collection.append(Item(1000))
+    assert cache.get()[0] == Item(1000)
+
+
+def test_full_reconciliation(cache, fetch_page, collection, clock):
+    cache.get()
+    del collection[5]
+    assert len(cache.get()) == 250
+
+    clock[0] += 60
+    assert cache.get() == collection
+    assert len(cache.get()) == 249
+    assert cache.snapshot.reconciled_at == 1060.0
+
+
+def test_always_full(fetch_page, storage, collection, clock):
+    cache = FavoritesCache(
+        "tracks", fetch_page, list, full_refresh_secs=0, storage=storage
+    )
+    cache.get()
+    full_fetch_calls = len(fetch_page.mock_calls)
+    cache.get()
+    assert len(fetch_page.mock_calls) == 2 * full_fetch_calls
+
+
+def test_persisted(cache, fetch_page, collection, config, clock):
+    cache.get()
+    fetch_page.reset_mock()
+    new_cache = FavoritesCache(
+        "tracks", fetch_page, list, full_refresh_secs=60, page_size=10
+    )
+    assert new_cache.get() == collection
+    fetch_page.assert_called_once_with(10, 0)
+
+
+@pytest.mark.parametrize("error", (ConnectionError, Timeout))
+def test_unavailable(cache, fetch_page, collection, clock, error):
+    cache.get()
+    fetch_page.side_effect = error
+    assert cache.get() == collection
+
+    # Including when a full reconciliation is due
+    clock[0] += 60
+    assert cache.get() == collection
+
+
+def test_unavailable_no_snapshot(cache, fetch_page):
+    fetch_page.side_effect = ConnectionError
+    with pytest.raises(ConnectionError):
+        cache.get()
+
+
+def test_snapshot_per_user(fetch_page, storage, collection, clock):
+    user_id = [1]
+    cache = FavoritesCache(
+        "tracks", fetch_page, list, storage=storage, get_user_id=lambda: user_id[0]
+    )
+    assert cache.get() == collection
+
+    user_id[0] = 2
+    assert cache.snapshot is None
+    fetch_page.side_effect = lambda limit, offset: collection[:1][offset:]
+    assert cache.get() == collection[:1]
+
+    user_id[0] = 1
+    assert cache.snapshot.items == collection
+
+
+def test_invalidate(cache, fetch_page):
+    cache.get()
+    full_fetch_calls = len(fetch_page.mock_calls)
+    cache.invalidate()
+    assert cache.snapshot is None
+    cache.get()
+    assert len(fetch_page.mock_calls) == 2 * full_fetch_calls
+
+
+def test_max_age(cache, fetch_page, mocker):
+    now = [0.0]
+    mocker.patch.object(favorites.time, "monotonic", lambda: now[0])
+    cache.get(max_age=60)
+    fetch_page.reset_mock()
+
+    now[0] += 59
+    cache.get(max_age=60)
+    assert not fetch_page.called
+
+    now[0] += 1
+    cache.get(max_age=60)
+    fetch_page.assert_called_once_with(10, 0)
+
+
+def test_max_age_no_snapshot(cache, fetch_page, collection):
+    assert cache.get(max_age=60) == collection
@@ -0,0 +1,327 @@
+import io
+
+import pytest
+from requests import Response
+from requests.exceptions import ConnectionError, Timeout
+
+from mopidy_tidal import concurrency, http_adapter
+from mopidy_tidal.circuit_breaker import CircuitBreaker, CircuitOpenError
+from mopidy_tidal.concurrency import AdaptiveLimit
+from mopidy_tidal.http_adapter import TidalHTTPAdapter, create_adapter
+from mopidy_tidal.request_context import DeadlineExceeded, Priority, deadline, priority
+
+
+def make_response(status_code, headers=None):
+    response = Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(b"")
+    response.headers.update(headers or {})
+    return response
+
+
+@pytest.fixture
+def send(mocker):
+    return mocker.patch("requests.adapters.HTTPAdapter.send")
+
+
+@pytest.fixture
+def sleep(mocker):
+    mocker.patch.object(http_adapter.random, "uniform", lambda a, b: 0)
+    return mocker.patch.object(http_adapter.time, "sleep")
+
+
+@pytest.fixture
+def request_(mocker):
+    return mocker.Mock(path_url="/v1/albums/1?countryCode=US")
+
+
+def test_rate_limiter_acquired(send, mocker, request_):
+    limiter = mocker.Mock()
+    send.return_value = make_response(200)
+    adapter = TidalHTTPAdapter(rate_limiter=limiter)
+    assert adapter.send(request_).status_code == 200
+    limiter.acquire.assert_called_once_with(Priority.INTERACTIVE)
+    assert adapter.rate_limiter is limiter
+
+
+def test_retry_after_seconds(send, sleep, mocker, request_):
+    limiter = mocker.Mock()
+    send.side_effect = [
+        make_response(429, {"Retry-After": "7"}),
+        make_response(200),
+    ]
+    adapter = TidalHTTPAdapter(rate_limiter=limiter)
+    assert adapter.send(request_).status_code == 200
+    limiter.pause.assert_called_once_with(7.0)
+    assert len(limiter.acquire.mock_calls) == 2
+
+
+def test_exponential_backoff_without_limiter(send, sleep, request_):
+    send.side_effect = [make_response(429)] * 3 + [make_response(200)]
+    adapter = TidalHTTPAdapter()
+    assert adapter.send(request_).status_code == 200
+    assert [c.args[0] for c in sleep.mock_calls] == [1.0, 2.0, 4.0]
+
+
+def test_gives_up_after_max_retries(send, sleep, request_):
+    send.return_value = make_response(429, {"Retry-After": "1"})
+    adapter = TidalHTTPAdapter(max_retries_on_429=2)
+    assert adapter.send(request_).status_code == 429
+    assert len(send.mock_calls) == 3
+
+
+def test_backoff_is_capped(send, sleep, request_):
+    send.side_effect = [make_response(429, {"Retry-After": "3600"}), make_response(200)]
+    adapter = TidalHTTPAdapter()
+    adapter.send(request_)
+    sleep.assert_called_once_with(TidalHTTPAdapter.max_backoff)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, None),
+        ("", None),
+        ("12", 12.0),
+        ("-1", 0.0),
+        ("not a date", None),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+        ("Wed, 21 Oct 2015 07:28:00 -0000", 0.0),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    assert TidalHTTPAdapter._parse_retry_after(value) == expected
+
+
+def test_create_adapter_defaults(config):
+    adapter = create_adapter(config)
+    assert adapter.rate_limiter.rate == http_adapter.default_rate_limit
+
+
+def test_create_adapter_disabled(config):
+    config["tidal"]["api_rate_limit"] = 0
+    assert create_adapter(config).rate_limiter is None
+
+
+def test_create_adapter_burst(config):
+    config["tidal"]["api_rate_limit"] = 4
+    config["tidal"]["api_rate_burst"] = 9
+    limiter = create_adapter(config).rate_limiter
+    assert limiter.rate == 4
+    assert limiter.capacity == 9
+
+
+def test_parse_retry_after_naive_date_is_utc(mocker):
+    # 2015-10-21 07:28:00 UTC, ten seconds before the date in the header
+    mocker.patch.object(http_adapter.time, "time", lambda: 1445412470.0)
+    assert TidalHTTPAdapter._parse_retry_after(
+        "Wed, 21 Oct 2015 07:28:00 -0000"
+    ) == pytest.approx(10.0)
+
+
+def test_create_adapter_pool_size(config):
+    config["tidal"]["workers_pool_size"] = 25
+    assert create_adapter(config)._pool_maxsize == 25
+    config["tidal"]["workers_pool_size"] = None
+    assert create_adapter(config)._pool_maxsize == http_adapter.default_pool_size
+
+
+@pytest.mark.parametrize(
+    "tidal_config, pool_size",
+    [
+        ({}, http_adapter.default_pool_size),
+        ({"workers_pool_size": 4}, 4),
+        ({"workers_pool_size": 4, "async_max_concurrency": 30}, 4),
+        ({"workers_pool_size": 4, "async_engine": True}, 50),
+        ({"async_engine": True, "async_max_concurrency": 2}, 10),
+    ],
+)
+def test_get_pool_size(tidal_config, pool_size):
+    assert http_adapter.get_pool_size(tidal_config) == pool_size
+
+
+def test_prewarm(mocker):
+    session = mocker.Mock()
+    thread = http_adapter.prewarm(session, "https://api.tidal.com/v1/", 3)
+    thread.join()
+    assert (
+        session.head.mock_calls.count(
+            mocker.call(
+                "https://api.tidal.com/v1/", timeout=http_adapter.prewarm_timeout
+            )
+        )
+        == 3
+    )
+
+
+def test_prewarm_errors(mocker):
+    session = mocker.Mock()
+    session.head.side_effect = ConnectionError
+    thread = http_adapter.prewarm(session, "https://api.tidal.com/v1/", 2)
+    thread.join()
+    assert len(session.head.mock_calls) == 2
+
+
+def test_concurrency_limit_success(send, request_, mocker):
+    limit = AdaptiveLimit(initial_limit=2, max_limit=4)
+    send.return_value = make_response(200)
+    adapter = TidalHTTPAdapter(concurrency_limit=limit)
+    adapter.send(request_)
+    adapter.send(request_)
+    assert limit.limit == 3
+    assert limit.in_flight == 0
+    assert adapter.concurrency_limit is limit
+
+
+@pytest.mark.parametrize("status_code", (429, 503))
+def test_concurrency_limit_error_response(send, sleep, request_, status_code):
+    limit = AdaptiveLimit(initial_limit=4, max_limit=4)
+    send.return_value = make_response(status_code)
+    adapter = TidalHTTPAdapter(concurrency_limit=limit, max_retries_on_429=0)
+    adapter.send(request_)
+    assert limit.limit == 2
+
+
+@pytest.mark.parametrize("error", (Timeout, ConnectionError))
+def test_concurrency_limit_timeout(send, request_, error):
+    limit = AdaptiveLimit(initial_limit=4, max_limit=4)
+    send.side_effect = error
+    adapter = TidalHTTPAdapter(concurrency_limit=limit)
+    with pytest.raises(error):
+        adapter.send(request_)
+    assert limit.limit == 2
+    assert limit.in_flight == 0
+
+
+def test_create_adapter_concurrency_limit(config):
+    config["tidal"]["workers_pool_size"] = 7
+    limit = create_adapter(config).concurrency_limit
+    assert limit is concurrency.get_limiter()
+    assert limit.max_limit == 7
+
+
+def test_create_adapter_no_concurrency_limit(config):
+    config["tidal"]["adaptive_concurrency"] = False
+    assert create_adapter(config).concurrency_limit is None
+
+
+def test_timeout_from_deadline(send, request_, config, mocker):
+    send.return_value = make_response(200)
+    config["tidal"]["api_timeout"] = 10
+    adapter = TidalHTTPAdapter()
+    adapter.send(request_)
+    assert send.mock_calls[-1].kwargs["timeout"] == 10
+    with deadline(2):
+        adapter.send(request_)
+    assert 0 < send.mock_calls[-1].kwargs["timeout"] <= 2
+
+
+def test_timeout_after_waits(send, request_, config, mocker):
+    send.return_value = make_response(200)
+    config["tidal"]["api_timeout"] = 10
+    clock = mocker.patch("mopidy_tidal.request_context.time.monotonic")
+    clock.return_value = 100
+    limiter = mocker.Mock()
+    # Waiting for a rate limit token takes most of the deadline
+    limiter.acquire.side_effect = lambda *_: setattr(clock, "return_value", 104)
+    adapter = TidalHTTPAdapter(rate_limiter=limiter)
+    with deadline(5):
+        adapter.send(request_)
+    assert send.mock_calls[-1].kwargs["timeout"] == 1
+
+
+def test_deadline_timeout_not_a_failure(send, request_, config):
+    config["tidal"]["api_timeout"] = 10
+    limit = AdaptiveLimit(initial_limit=4, max_limit=4)
+    breaker = CircuitBreaker(failure_threshold=1)
+    send.side_effect = Timeout
+    adapter = TidalHTTPAdapter(concurrency_limit=limit, circuit_breaker=breaker)
+    with deadline(2):
+        with pytest.raises(Timeout):
+            adapter.send(request_)
+    assert limit.limit == 4
+    assert not breaker.is_open
+
+    # Timeouts of the whole configured duration are failures
+    with pytest.raises(Timeout):
+        adapter.send(request_)
+    assert limit.limit == 2
+    assert breaker.is_open
+    breaker.close()
+
+
+def test_deadline_exceeded(send, request_):
+    adapter = TidalHTTPAdapter()
+    with deadline(-1):
+        with pytest.raises(DeadlineExceeded):
+            adapter.send(request_)
+    send.assert_not_called()
+
+
+def test_circuit_breaker_open(send, request_):
+    breaker = CircuitBreaker(failure_threshold=2)
+    send.side_effect = ConnectionError
+    adapter = TidalHTTPAdapter(circuit_breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            adapter.send(request_)
+    with pytest.raises(CircuitOpenError):
+        adapter.send(request_)
+    assert len(send.mock_calls) == 2
+    assert adapter.circuit_breaker is breaker
+    breaker.close()
+
+
+def test_circuit_breaker_server_errors(send, request_):
+    breaker = CircuitBreaker(failure_threshold=2)
+    send.return_value = make_response(502)
+    adapter = TidalHTTPAdapter(circuit_breaker=breaker)
+    adapter.send(request_)
+    adapter.send(request_)
+    assert breaker.is_open
+    breaker.close()
+
+
+def test_circuit_breaker_success(send, request_):
+    breaker = CircuitBreaker(failure_threshold=2)
+    adapter = TidalHTTPAdapter(circuit_breaker=breaker)
+    send.return_value = make_response(502)
+    adapter.send(request_)
+    send.return_value = make_response(404)
+    adapter.send(request_)
+    send.return_value = make_response(502)
+    adapter.send(request_)
+    assert not breaker.is_open
+
+
+def test_create_adapter_circuit_breaker(config, mocker):
+    head = mocker.patch.object(http_adapter.requests, "head")
+    head.return_value.status_code = 200
+    config["tidal"]["circuit_breaker_threshold"] = 3
+    adapter = create_adapter(config, probe_url="https://api.tidal.com/v1/")
+    breaker = adapter.circuit_breaker
+    assert breaker._failure_threshold == 3
+    assert breaker._probe()
+    head.assert_called_once_with(
+        "https://api.tidal.com/v1/", timeout=http_adapter.prewarm_timeout
+    )
+
+
+def test_create_adapter_no_circuit_breaker(config):
+    config["tidal"]["circuit_breaker_threshold"] = 0
+    assert create_adapter(config).circuit_breaker is None
+
+
+def test_priority(send, request_, mocker):
+    send.return_value = make_response(200)
+    limit = mocker.MagicMock()
+    bucket = mocker.Mock()
+    adapter = TidalHTTPAdapter(rate_limiter=bucket, concurrency_limit=limit)
+    adapter.send(request_)
+    limit.slot.assert_called_once_with(Priority.INTERACTIVE)
+    bucket.acquire.assert_called_once_with(Priority.INTERACTIVE)
+
+    with priority(Priority.BACKGROUND):
+        adapter.send(request_)
+    limit.slot.assert_called_with(Priority.BACKGROUND)
+    bucket.acquire.assert_called_with(Priority.BACKGROUND)
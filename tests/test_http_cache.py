@@ -0,0 +1,143 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from mopidy_tidal.http_adapter import TidalHTTPAdapter
+from mopidy_tidal.http_cache import CachedResponse, HttpCache
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Fake API: serves a JSON document per path, with an ETag."""
+
+    documents = {}
+    hits = []
+
+    def do_GET(self):
+        self.hits.append((self.path, self.headers.get("If-None-Match")))
+        doc = self.documents.get(self.path)
+        if doc is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        etag = f'"{hash(json.dumps(doc))}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        body = json.dumps(doc).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.documents = {"/favorites": {"items": [1, 2, 3]}}
+    _Handler.hits = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def session():
+    session = requests.Session()
+    cache = HttpCache(storage={})
+    session.mount("http://", TidalHTTPAdapter(cache=cache))
+    return session
+
+
+def test_revalidated_response_served_from_cache(server, session):
+    first = session.get(f"{server}/favorites")
+    assert first.json() == {"items": [1, 2, 3]}
+    assert not getattr(first, "from_cache", False)
+
+    second = session.get(f"{server}/favorites")
+    assert isinstance(second, CachedResponse)
+    assert second.ok
+    assert second.status_code == 200
+    assert second.json() == {"items": [1, 2, 3]}
+    assert _Handler.hits[1][1] == first.headers["ETag"]
+
+
+def test_cached_json_is_not_shared(server, session):
+    session.get(f"{server}/favorites")
+    second = session.get(f"{server}/favorites")
+    # tidalapi modifies the payloads in place
+    second.json()["items"][0] = {"item": 1}
+    third = session.get(f"{server}/favorites")
+    assert isinstance(third, CachedResponse)
+    assert third.json() == {"items": [1, 2, 3]}
+
+
+def test_changed_resource_is_refetched(server, session):
+    session.get(f"{server}/favorites")
+    _Handler.documents["/favorites"] = {"items": [1, 2, 3, 4]}
+    res = session.get(f"{server}/favorites")
+    assert not isinstance(res, CachedResponse)
+    assert res.json() == {"items": [1, 2, 3, 4]}
+    res = session.get(f"{server}/favorites")
+    assert isinstance(res, CachedResponse)
+    assert res.json() == {"items": [1, 2, 3, 4]}
+
+
+def test_errors_not_cached(server, session):
+    assert session.get(f"{server}/nonsuch").status_code == 404
+    assert session.get(f"{server}/nonsuch").status_code == 404
+    assert [h[1] for h in _Handler.hits] == [None, None]
+
+
+def test_other_methods_not_cached(mocker):
+    cache = mocker.Mock()
+    send = mocker.patch("requests.adapters.HTTPAdapter.send")
+    send.return_value = mocker.Mock(status_code=200)
+    adapter = TidalHTTPAdapter(cache=cache)
+    request = mocker.Mock(method="DELETE")
+    assert adapter.send(request) is send.return_value
+    cache.get.assert_not_called()
+    cache.store.assert_not_called()
+
+
+def test_responses_without_validators_not_cached(mocker):
+    cache = HttpCache(storage={})
+    request = mocker.Mock(url="https://api.tidal.com/v1/albums/1")
+    cache.store(request, mocker.Mock(status_code=200, headers={}))
+    assert cache.get(request.url) is None
+
+
+def test_last_modified_validator(mocker):
+    cache = HttpCache(storage={})
+    request = mocker.Mock(url="https://api.tidal.com/v1/albums/1", headers={})
+    response = mocker.Mock(
+        status_code=200,
+        headers={"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"},
+        content=b"{}",
+        encoding="utf-8",
+    )
+    cache.store(request, response)
+    entry = cache.get(request.url)
+    cache.add_validators(request, entry)
+    assert request.headers == {"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    cache.prune(request.url)
+    assert cache.get(request.url) is None
+
+
+def test_default_storage(config):
+    cache = HttpCache()
+    assert cache.get("https://api.tidal.com/v1/albums/1") is None
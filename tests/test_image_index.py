@@ -0,0 +1,63 @@
+import pytest
+
+from mopidy_tidal import image_index
+from mopidy_tidal.image_index import ImageIndex
+
+
+@pytest.mark.parametrize(
+    "uri, url",
+    (
+        (
+            "tidal:album:1",
+            "https://resources.tidal.com/images/ab/cd/ef/640x640.jpg",
+        ),
+        (
+            "tidal:artist:1",
+            "https://resources.tidal.com/images/ab/cd/ef/750x750.jpg",
+        ),
+        (
+            "tidal:playlist:1",
+            "https://resources.tidal.com/images/ab/cd/ef/750x750.jpg",
+        ),
+    ),
+)
+def test_get_image_url(uri, url):
+    index = ImageIndex()
+    index.add(uri, "ab-cd-ef")
+    assert index.get_image_url(uri) == url
+
+
+def test_unknown():
+    index = ImageIndex()
+    index.add("tidal:mix:1", "ab-cd-ef")
+    assert index.get_image_url("tidal:album:1") is None
+    assert index.get_image_url("tidal:mix:1") is None
+
+
+@pytest.mark.parametrize("image_id", (None, "", object()))
+def test_invalid_image_id(image_id):
+    index = ImageIndex()
+    index.add("tidal:album:1", image_id)
+    assert not len(index)
+
+
+def test_lru_eviction():
+    index = ImageIndex(max_size=2)
+    index.add("tidal:album:1", "1")
+    index.add("tidal:album:2", "2")
+    assert index.get_image_url("tidal:album:1")
+    index.add("tidal:album:3", "3")
+    assert len(index) == 2
+    assert index.get_image_url("tidal:album:1")
+    assert index.get_image_url("tidal:album:2") is None
+
+
+def test_index_track(mocker):
+    track = mocker.Mock()
+    track.id = 10
+    track.album.id = 1
+    track.album.cover = "ab-cd"
+    image_index.index_track(track)
+    index = image_index.get_image_index()
+    assert index.get_image_url("tidal:track:10") == index.get_image_url("tidal:album:1")
+    assert index.get_image_url("tidal:album:1")
@@ -1,15 +1,29 @@
+import threading
+import time
+
 import pytest
 from mopidy.models import Album, Artist, Image, Ref, SearchResult, Track
+from requests.exceptions import ConnectionError
 from tidalapi.playlist import Playlist
 
-from mopidy_tidal.library import HTTPError, TidalLibraryProvider
+from mopidy_tidal.circuit_breaker import CircuitOpenError
+from mopidy_tidal.library import HTTPError, ImagesGetter, TidalLibraryProvider
+from mopidy_tidal.request_context import Cancelled, check_cancelled
+from tests.conftest import make_track
 
 
 @pytest.fixture
 def tlp(mocker, config):
     backend = mocker.Mock()
     lp = TidalLibraryProvider(backend)
-    for cache_type in {"artist", "album", "track", "playlist"}:
+    for cache_type in {
+        "artist",
+        "artist_pages",
+        "album",
+        "track",
+        "playlist",
+        "image",
+    }:
         getattr(lp, f"_{cache_type}_cache")._persist = False
 
     return lp, backend
@@ -47,9 +61,7 @@ def test_get_track_images(tlp, mocker):
     backend._session.album.assert_called_once_with("1-1-1")
 
 
-@pytest.mark.xfail
 def test_track_cache(tlp, mocker):
-    # I think the caching logic is broken here
     tlp, backend = tlp
     uris = ["tidal:track:0-0-0:1-1-1:2-2-2"]
     get_album = mocker.Mock()
@@ -68,16 +80,30 @@ def test_get_noimages(tlp, mocker):
     assert tlp.get_images(uris) == {uris[0]: []}
 
 
-@pytest.mark.parametrize("field", ("artist", "album", "track"))
-def test_get_distinct_root(tlp, mocker, field):
+@pytest.fixture
+def favorites(tlp, tidal_artists, tidal_albums, tidal_tracks):
     tlp, backend = tlp
     session = backend._session
-    thing = mocker.Mock()
-    thing.name = "Thing"
-    session.configure_mock(**{f"user.favorites.{field}s.return_value": [thing]})
-    res = tlp.get_distinct(field)
-    assert res[0] == "Thing [TIDAL]"
-    assert len(res) == 1
+    session.parse_artist = "artist"
+    session.request.map_request.side_effect = lambda *args, parse, **kwargs: (
+        paginate(tidal_artists if parse == "artist" else tidal_albums)(**kwargs)
+    )
+    session.user.favorites.tracks.side_effect = paginate(tidal_tracks)
+    return session
+
+
+@pytest.mark.parametrize(
+    "field, names",
+    (
+        ("artist", ["Artist-0", "Artist-1"]),
+        ("albumartist", ["Artist-0", "Artist-1"]),
+        ("album", ["Album-0", "Album-1"]),
+        ("track", ["Track-0", "Track-1"]),
+    ),
+)
+def test_get_distinct_root(tlp, favorites, field, names):
+    tlp, backend = tlp
+    assert tlp.get_distinct(field) == [f"{name} [TIDAL]" for name in names]
 
 
 def test_get_distinct_root_nonsuch(tlp, mocker):
@@ -91,68 +117,52 @@ def test_get_distinct_query_nonsuch(tlp, mocker):
 
 
 @pytest.mark.parametrize("field", ("artist", "track"))
-def test_get_distinct_ignore_query(tlp, mocker, field):
+def test_get_distinct_ignore_query(tlp, favorites, field):
     tlp, backend = tlp
-    session = backend._session
-    thing = mocker.Mock()
-    thing.name = "Thing"
-    session.configure_mock(**{f"user.favorites.{field}s.return_value": [thing]})
     res = tlp.get_distinct(field, query={"any": "any"})
-    assert res[0] == "Thing [TIDAL]"
-    assert len(res) == 1
+    assert res == [f"{field.title()}-{i} [TIDAL]" for i in range(2)]
 
 
-@pytest.mark.parametrize("field", ("album", "albumartist"))
-def test_get_distinct_album_no_results(tlp, mocker, field):
+def test_get_distinct_album_no_results(tlp, favorites):
     tlp, backend = tlp
-    session = backend._session
-    tidal_search = mocker.Mock()
-    tidal_search.return_value = ([], [], [])
-    mocker.patch("mopidy_tidal.search.tidal_search", tidal_search)
-    assert not tlp.get_distinct(field, query={"any": "any"})
-    tidal_search.assert_called_once_with(session, query={"any": "any"}, exact=True)
-
-
-@pytest.mark.parametrize("field", ("album", "albumartist"))
-def test_get_distinct_album_new_api(tlp, mocker, field):
+    assert not tlp.get_distinct("album", query={"any": "any"})
+
+
+@pytest.mark.parametrize(
+    "query, names",
+    (
+        # Favorite albums
+        ({"albumartist": ["Album Artist"]}, ["Album-0", "Album-1"]),
+        # Albums of the favorite tracks
+        ({"artist": ["artist-1"]}, ["Album-1"]),
+        ({"any": "Artist-0"}, ["Album-0"]),
+        # `any` also matches the album names
+        ({"any": "album-1"}, ["Album-1"]),
+        ({"artist": ["Artist-0"], "any": ["Album-1"]}, []),
+        ({"albumartist": ["Album Artist"], "any": ["Album-1"]}, ["Album-1"]),
+        ({"artist": ["Artist-0", "Artist-1"]}, ["Album-0", "Album-1"]),
+        # No artist in the query
+        ({"date": ["2020"]}, ["Album-0", "Album-1"]),
+    ),
+)
+def test_get_distinct_album(tlp, favorites, query, names):
     tlp, backend = tlp
-    session = backend._session
-    session.mock_add_spec(("tidal_search", "artist", "artist.get_albums"))
-
-    artist = mocker.Mock()
-    artist.uri = "tidal:artist:1"
-    thing = mocker.Mock()
-    thing.name = "Thing"
-    artist.get_albums.return_value = [thing]
-
-    tidal_search = mocker.Mock()
-    tidal_search.return_value = ([artist], [], [])
-    session.artist.return_value = artist
-    mocker.patch("mopidy_tidal.search.tidal_search", tidal_search)
-    res = tlp.get_distinct(field, query={"any": "any"})
-    tidal_search.assert_called_once_with(session, query={"any": "any"}, exact=True)
-    session.artist.assert_called_once_with("1")
-    artist.get_albums.assert_called_once_with()
-    assert len(res) == 1
-    assert res[0] == "Thing [TIDAL]"
+    res = tlp.get_distinct("album", query=query)
+    assert res == [f"{name} [TIDAL]" for name in names]
 
 
-@pytest.mark.parametrize("field", ("album", "albumartist"))
-def test_get_distinct_album_new_api_no_artist(tlp, mocker, field):
+def test_get_distinct_no_requests(tlp, favorites, mocker):
     tlp, backend = tlp
-    session = backend._session
-    session.mock_add_spec(("tidal_search", "artist", "artist.get_albums"))
+    tidal_search = mocker.patch("mopidy_tidal.search.tidal_search")
+    tlp.get_distinct("artist")
+    favorites.reset_mock()
 
-    artist = mocker.Mock()
-    artist.uri = "tidal:artist:1"
-
-    tidal_search = mocker.Mock()
-    tidal_search.return_value = ([artist], [], [])
-    session.artist.return_value = None
-    mocker.patch("mopidy_tidal.search.tidal_search", tidal_search)
-    assert not tlp.get_distinct(field, query={"any": "any"})
-    tidal_search.assert_called_once_with(session, query={"any": "any"}, exact=True)
-    session.artist.assert_called_once_with("1")
+    for field in ("artist", "album", "track"):
+        assert tlp.get_distinct(field)
+    assert tlp.get_distinct("album", query={"artist": ["Artist-0"]})
+    assert not favorites.request.map_request.called
+    assert not favorites.user.favorites.tracks.called
+    assert not tidal_search.called
 
 
 def test_browse_wrong_uri(tlp):
@@ -175,11 +185,18 @@ def test_browse_root(tlp):
     ]
 
 
+def paginate(items):
+    def get_page(*_, params=None, **kwargs):
+        params = params or kwargs
+        return items[params["offset"] : params["offset"] + params["limit"]]
+
+    return get_page
+
+
 def test_browse_artists(tlp, mocker, tidal_artists):
     tlp, backend = tlp
     session = backend._session
-    session.user.favorites.artists = tidal_artists
-    mocker.patch("mopidy_tidal.library.get_items", lambda x: x)
+    session.request.map_request.side_effect = paginate(tidal_artists)
     assert tlp.browse("tidal:my_artists") == [
         Ref(name="Artist-0", type="artist", uri="tidal:artist:0"),
         Ref(name="Artist-1", type="artist", uri="tidal:artist:1"),
@@ -189,8 +206,7 @@ def test_browse_artists(tlp, mocker, tidal_artists):
 def test_browse_albums(tlp, mocker, tidal_albums):
     tlp, backend = tlp
     session = backend._session
-    session.user.favorites.albums = tidal_albums
-    mocker.patch("mopidy_tidal.library.get_items", lambda x: x)
+    session.request.map_request.side_effect = paginate(tidal_albums)
     assert tlp.browse("tidal:my_albums") == [
         Ref(name="Album-0", type="album", uri="tidal:album:0"),
         Ref(name="Album-1", type="album", uri="tidal:album:1"),
@@ -200,14 +216,99 @@ def test_browse_albums(tlp, mocker, tidal_albums):
 def test_browse_tracks(tlp, mocker, tidal_tracks):
     tlp, backend = tlp
     session = backend._session
-    session.user.favorites.tracks = tidal_tracks
-    mocker.patch("mopidy_tidal.library.get_items", lambda x: x)
+    session.user.favorites.tracks.side_effect = paginate(tidal_tracks)
     assert tlp.browse("tidal:my_tracks") == [
         Ref(name="Track-0", type="track", uri="tidal:track:0:0:0"),
         Ref(name="Track-1", type="track", uri="tidal:track:1:1:1"),
     ]
 
 
+def test_browse_tracks_paged(tlp, config, mocker, tidal_tracks, compare):
+    tlp, backend = tlp
+    session = backend._session
+    config["tidal"]["browse_page_size"] = 1
+    favorites = session.user.favorites
+    favorites.tracks.side_effect = paginate(tidal_tracks)
+
+    assert tlp.browse("tidal:my_tracks") == [
+        Ref(name="Track-0", type="track", uri="tidal:track:0:0:0"),
+        Ref(name="Page 2", type="directory", uri="tidal:my_tracks:page:2"),
+    ]
+    # Each page is a single request
+    favorites.tracks.assert_called_once_with(
+        limit=1, offset=0, order="NAME", order_direction="ASC"
+    )
+
+    assert tlp.browse("tidal:my_tracks:page:2") == [
+        Ref(name="Track-1", type="track", uri="tidal:track:1:1:1"),
+        Ref(name="Page 3", type="directory", uri="tidal:my_tracks:page:3"),
+    ]
+    assert tlp.browse("tidal:my_tracks:page:3") == []
+    assert len(favorites.tracks.mock_calls) == 3
+
+    # The tracks of the pages are cached for the next lookup
+    wait_for_track_cache(tlp)
+    compare(tidal_tracks[1:], tlp.lookup("tidal:track:1:1:1"), "track")
+    session.album.assert_not_called()
+
+
+def test_browse_albums_paged(tlp, config, favorites):
+    tlp, backend = tlp
+    config["tidal"]["browse_page_size"] = 2
+    assert tlp.browse("tidal:my_albums") == [
+        Ref(name="Album-0", type="album", uri="tidal:album:0"),
+        Ref(name="Album-1", type="album", uri="tidal:album:1"),
+        Ref(name="Page 2", type="directory", uri="tidal:my_albums:page:2"),
+    ]
+    assert tlp.browse("tidal:my_albums:page:2") == []
+    assert [
+        call.kwargs["params"]["offset"]
+        for call in favorites.request.map_request.mock_calls
+    ] == [0, 2]
+
+
+@pytest.mark.parametrize(
+    "uri", ("tidal:my_tracks:page:0", "tidal:my_tracks:page:x", "tidal:my_tracks:")
+)
+def test_browse_paged_invalid(tlp, config, uri):
+    tlp, backend = tlp
+    config["tidal"]["browse_page_size"] = 10
+    assert tlp.browse(uri) == []
+    backend._session.user.favorites.tracks.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "uri, refs",
+    (
+        (
+            "tidal:my_artists",
+            [
+                Ref(name="Artist-0", type="artist", uri="tidal:artist:0"),
+                Ref(name="Artist-1", type="artist", uri="tidal:artist:1"),
+            ],
+        ),
+        (
+            "tidal:my_tracks",
+            [
+                Ref(name="Track-0", type="track", uri="tidal:track:0:0:0"),
+                Ref(name="Track-1", type="track", uri="tidal:track:1:1:1"),
+            ],
+        ),
+    ),
+)
+def test_browse_favorites_unavailable(tlp, favorites, uri, refs):
+    tlp, backend = tlp
+    # Only the saved snapshot of the favorites is available
+    assert tlp.browse(uri) == refs
+    for cache in tlp._favorites.values():
+        cache._checked_at = None
+    tlp._favorites["artists"]._full_refresh_secs = 0
+    favorites.request.map_request.side_effect = ConnectionError
+    favorites.user.favorites.tracks.side_effect = ConnectionError
+    assert tlp.browse(uri) == refs
+    assert tlp._browse_from_cache(uri) == refs
+
+
 def test_browse_playlists(tlp, mocker):
     tlp, backend = tlp
     as_list = mocker.Mock()
@@ -293,6 +394,8 @@ def test_specific_playlist_new_api(tlp, mocker, tidal_tracks):
     session = backend._session
     session.mock_add_spec(("playlist",))
     playlist = mocker.Mock(name="Playlist")
+    playlist.name = "Playlist-1"
+    playlist.last_updated = 10
     playlist.tracks.return_value = tidal_tracks
     playlist.tracks.__name__ = "playlist"
     session.playlist.return_value = playlist
@@ -307,6 +410,105 @@ def test_specific_playlist_new_api(tlp, mocker, tidal_tracks):
     playlist.tracks.assert_has_calls([mocker.call(100, 0)])
 
 
+def test_browse_album_cached(tlp, mocker, tidal_tracks):
+    tlp, backend = tlp
+    session = backend._session
+    album = mocker.Mock()
+    album.tracks.return_value = tidal_tracks
+    session.album.return_value = album
+
+    refs = [
+        Ref(name="Track-0", type="track", uri="tidal:track:0:0:0"),
+        Ref(name="Track-1", type="track", uri="tidal:track:1:1:1"),
+    ]
+    assert tlp.browse("tidal:album:1") == refs
+    assert tlp.browse("tidal:album:1") == refs
+    assert [t.uri for t in tlp.lookup("tidal:album:1")] == [r.uri for r in refs]
+    session.album.assert_called_once_with("1")
+    album.tracks.assert_called_once_with()
+
+
+def test_browse_album_from_lookup_cache(tlp, mocker, tidal_tracks):
+    tlp, backend = tlp
+    session = backend._session
+    album = mocker.Mock()
+    album.tracks.return_value = tidal_tracks
+    session.album.return_value = album
+    tlp.lookup("tidal:album:1")
+    session.reset_mock()
+
+    assert len(tlp.browse("tidal:album:1")) == 2
+    assert not session.album.called
+
+
+def paginate_positional(items):
+    return lambda limit, offset: items[offset : offset + limit]
+
+
+def test_browse_artist_cached(tlp, mocker, tidal_albums, tidal_artists):
+    tlp, backend = tlp
+    session = backend._session
+    artist = tidal_artists[0]
+    artist.get_albums.side_effect = paginate_positional(tidal_albums)
+    artist.get_ep_singles.side_effect = paginate_positional([])
+    session.artist.return_value = artist
+
+    refs = tlp.browse("tidal:artist:1")
+    assert len(refs) == 3
+    assert tlp.browse("tidal:artist:1") == refs
+    artist.get_top_tracks.assert_called_once_with()
+    session.artist.assert_called_once_with("1")
+
+
+def test_browse_artist_expired(tlp, config, mocker, tidal_albums, tidal_artists):
+    tlp, backend = tlp
+    session = backend._session
+    config["tidal"]["artist_cache_max_age"] = 60
+    now = mocker.patch("mopidy_tidal.library.time.time", return_value=1000)
+    artist = tidal_artists[0]
+    artist.get_albums.side_effect = paginate_positional(tidal_albums[:1])
+    artist.get_ep_singles.side_effect = paginate_positional([])
+    session.artist.return_value = artist
+    refs = tlp.browse("tidal:artist:1")
+
+    now.return_value += 59
+    assert tlp.browse("tidal:artist:1") == refs
+    session.artist.assert_called_once_with("1")
+
+    # New releases show up once the page has expired
+    now.return_value += 1
+    artist.get_albums.side_effect = paginate_positional(tidal_albums)
+    assert len(tlp.browse("tidal:artist:1")) == len(refs) + 1
+    assert len(session.artist.mock_calls) == 2
+
+    # Expired pages are served while TIDAL is unavailable
+    now.return_value += 60
+    session.artist.side_effect = ConnectionError
+    assert len(tlp.browse("tidal:artist:1")) == len(refs) + 1
+
+
+def test_browse_playlist_cached(tlp, mocker, tidal_tracks):
+    tlp, backend = tlp
+    session = backend._session
+    playlist = mocker.Mock()
+    playlist.name = "Playlist-1"
+    playlist.last_updated = 10
+    playlist.tracks.return_value = tidal_tracks
+    playlist.tracks.__name__ = "get_playlist_tracks"
+    session.playlist.return_value = playlist
+
+    refs = tlp.browse("tidal:playlist:1")
+    fetches = len(playlist.tracks.mock_calls)
+    assert tlp.browse("tidal:playlist:1") == refs
+    assert tlp.lookup("tidal:playlist:1")
+    assert len(playlist.tracks.mock_calls) == fetches
+
+    # Updated playlists are fetched again
+    playlist.last_updated = 20
+    assert tlp.browse("tidal:playlist:1") == refs
+    assert len(playlist.tracks.mock_calls) == 2 * fetches
+
+
 def test_specific_mood_new_api(tlp, mocker):
     tlp, backend = tlp
     session = backend._session
@@ -330,6 +532,27 @@ def test_specific_mood_new_api(tlp, mocker):
     mood.get.assert_called_once_with()
 
 
+def test_moods_cached(tlp, mocker):
+    tlp, backend = tlp
+    session = backend._session
+    mood = mocker.Mock()
+    mood.title = "Mood-1"
+    mood.api_path = "pages/moods/1"
+    playlist = mocker.Mock()
+    playlist.id = 0
+    playlist.name = "Playlist-0"
+    mood.get.return_value = [playlist]
+    session.moods.return_value = [mood]
+
+    tlp.browse("tidal:moods")
+    for _ in range(2):
+        assert tlp.browse("tidal:mood:1") == [
+            Ref(name="Playlist-0", type="playlist", uri="tidal:playlist:0"),
+        ]
+    session.moods.assert_called_once_with()
+    mood.get.assert_called_once_with()
+
+
 def test_specific_mood_new_api_none(tlp, mocker, tidal_tracks):
     tlp, backend = tlp
     session = backend._session
@@ -399,12 +622,51 @@ def test_specific_mix_none(tlp, mocker):
     session.mixes.assert_called_once_with()
 
 
+def wait_for_track_cache(tlp):
+    # The browsed tracks are cached in order by a single background thread
+    tlp._cache_executor.submit(lambda: None).result()
+
+
+def test_browse_mix_caches_tracks(tlp, mocker, tidal_tracks, compare):
+    tlp, backend = tlp
+    session = backend._session
+    mix = mocker.Mock()
+    mix.id = "1"
+    mix.items.return_value = tidal_tracks
+    session.mixes.return_value = [mix]
+    refs = tlp.browse("tidal:mix:1")
+    wait_for_track_cache(tlp)
+
+    res = tlp.lookup([ref.uri for ref in refs])
+    compare(tidal_tracks, res, "track")
+    session.album.assert_not_called()
+    session.track.assert_not_called()
+
+
+def test_browse_playlist_caches_tracks(tlp, mocker, tidal_tracks, compare):
+    tlp, backend = tlp
+    session = backend._session
+    playlist = mocker.Mock()
+    playlist.name = "Playlist-1"
+    playlist.last_updated = 10
+    playlist.tracks.return_value = tidal_tracks
+    playlist.tracks.__name__ = "get_playlist_tracks"
+    session.playlist.return_value = playlist
+    refs = tlp.browse("tidal:playlist:1")
+    wait_for_track_cache(tlp)
+
+    res = tlp.lookup(refs[1].uri)
+    compare(tidal_tracks[1:], res, "track")
+    session.album.assert_not_called()
+
+
 def test_specific_artist_new_api(tlp, mocker, tidal_albums, tidal_artists):
     tlp, backend = tlp
     session = backend._session
     session.mock_add_spec(("artist",))
     artist = tidal_artists[0]
-    artist.get_albums.return_value = tidal_albums
+    artist.get_albums.side_effect = paginate_positional(tidal_albums[:1])
+    artist.get_ep_singles.side_effect = paginate_positional(tidal_albums[1:])
     session.artist.return_value = artist
     assert tlp.browse("tidal:artist:1") == [
         Ref(name="Album-0", type="album", uri="tidal:album:0"),
@@ -412,8 +674,67 @@ def test_specific_artist_new_api(tlp, mocker, tidal_albums, tidal_artists):
         Ref(name="Track-100", type="track", uri="tidal:track:0:7:100"),
     ]
     artist.get_top_tracks.assert_called_once_with()
-    artist.get_albums.assert_called_once_with()
-    session.artist.assert_has_calls([mocker.call("1"), mocker.call("1")])
+    session.artist.assert_called_once_with("1")
+
+
+def test_artist_releases_paginated(tlp, mocker, tidal_artists):
+    tlp, backend = tlp
+    session = backend._session
+    artist = tidal_artists[0]
+    releases = []
+    for i in range(200):
+        album = mocker.Mock(spec=Album)
+        album.id = i
+        album.name = f"Album-{i}"
+        album.artist = artist
+        releases.append(album)
+    artist.get_albums.side_effect = paginate_positional(releases[:150])
+    artist.get_ep_singles.side_effect = paginate_positional(releases[150:])
+    session.artist.return_value = artist
+
+    refs = tlp.browse("tidal:artist:1")
+    assert [ref.name for ref in refs[:200]] == [f"Album-{i}" for i in range(200)]
+    # No page is requested twice
+    offsets = [call.args[1] for call in artist.get_albums.mock_calls]
+    assert len(offsets) == len(set(offsets))
+    session.artist.assert_called_once_with("1")
+
+
+def test_artist_single_page_probed(tlp, tidal_artists, tidal_albums):
+    tlp, backend = tlp
+    session = backend._session
+    artist = tidal_artists[0]
+    artist.get_albums.side_effect = paginate_positional(tidal_albums)
+    artist.get_ep_singles.side_effect = paginate_positional([])
+    session.artist.return_value = artist
+
+    tlp.browse("tidal:artist:1")
+    # A short first page is the whole discography
+    artist.get_albums.assert_called_once_with(100, 0)
+    artist.get_ep_singles.assert_called_once_with(100, 0)
+
+
+def test_artist_page_concurrent(tlp, mocker, tidal_albums, tidal_artists):
+    tlp, backend = tlp
+    session = backend._session
+    artist = tidal_artists[0]
+    barrier = threading.Barrier(3, timeout=5)
+
+    def wait_for_others(result):
+        def fetch(*args, **kwargs):
+            if not kwargs and not args or args[1] == 0:
+                barrier.wait()
+            return result(*args) if callable(result) else result
+
+        return fetch
+
+    artist.get_albums.side_effect = wait_for_others(paginate_positional(tidal_albums))
+    artist.get_ep_singles.side_effect = wait_for_others(paginate_positional([]))
+    artist.get_top_tracks.side_effect = wait_for_others(
+        artist.get_top_tracks.return_value
+    )
+    session.artist.return_value = artist
+    assert len(tlp.browse("tidal:artist:1")) == 3
 
 
 def test_lookup_no_uris(tlp, mocker):
@@ -450,15 +771,45 @@ def test_lookup_track(tlp, mocker, tidal_tracks, compare):
 def test_lookup_track_newstyle(tlp, mocker, tidal_tracks, compare):
     tlp, backend = tlp
     session = backend._session
-    album = mocker.Mock()
-    album.tracks.return_value = tidal_tracks
-    session.album.return_value = album
-    track = mocker.Mock(**{"album.id": 1, "name": "track"})
-    session.track.return_value = track
+    session.track.return_value = tidal_tracks[0]
     res = tlp.lookup("tidal:track:0")
     compare(tidal_tracks[:1], res, "track")
-    session.album.assert_called_once_with("1")
     session.track.assert_called_once_with("0")
+    session.album.assert_not_called()
+
+
+def test_lookup_track_forms_share_cache(tlp, mocker, tidal_tracks, compare):
+    tlp, backend = tlp
+    session = backend._session
+    album = mocker.Mock()
+    album.tracks.return_value = tidal_tracks[:1]
+    session.album.return_value = album
+    res = tlp.lookup(tidal_tracks[0].uri)
+    assert tlp.lookup(f"tidal:track:{tidal_tracks[0].id}") == res
+    session.track.assert_not_called()
+
+    session.track.return_value = tidal_tracks[1]
+    res = tlp.lookup(f"tidal:track:{tidal_tracks[1].id}")
+    compare(tidal_tracks[1:2], res, "track")
+    assert tlp.lookup(tidal_tracks[1].uri) == res
+    session.track.assert_called_once_with(str(tidal_tracks[1].id))
+    session.album.assert_called_once_with(str(tidal_tracks[0].album.id))
+
+
+def test_lookup_bulk_without_deadline(tlp, config, tidal_tracks):
+    tlp, backend = tlp
+    session = backend._session
+    config["tidal"]["lookup_timeout"] = 0.000001
+
+    def get_track(track_id):
+        # Sending a request checks the deadline
+        check_cancelled()
+        return tidal_tracks[int(track_id)]
+
+    session.track.side_effect = get_track
+    assert not tlp.lookup("tidal:track:0")
+    tracks = tlp.lookup(["tidal:track:0", "tidal:track:1"])
+    assert [t.uri for t in tracks] == [t.uri for t in tidal_tracks]
 
 
 def test_lookup_track_cached(tlp, mocker, tidal_tracks, compare):
@@ -572,3 +923,330 @@ def test_lookup_playlist_cached(tlp, mocker, tidal_tracks, compare):
 
     session.playlist.assert_called_with("99")
     assert len(playlist.tracks.mock_calls) == 5, "Didn't run five fetches in parallel."
+
+
+def test_lookup_circuit_open(tlp, mocker):
+    tlp, backend = tlp
+    session = backend._session
+    session.album.side_effect = CircuitOpenError
+    assert not tlp.lookup("tidal:album:1")
+
+
+def test_browse_album_circuit_open_cached(tlp, mocker, tidal_tracks):
+    tlp, backend = tlp
+    session = backend._session
+    album = mocker.Mock()
+    album.tracks.return_value = tidal_tracks
+    session.album.return_value = album
+    tlp.lookup("tidal:album:1")
+
+    session.album.side_effect = CircuitOpenError
+    assert tlp.browse("tidal:album:1") == [
+        Ref(name="Track-0", type="track", uri="tidal:track:0:0:0"),
+        Ref(name="Track-1", type="track", uri="tidal:track:1:1:1"),
+    ]
+
+
+def test_browse_playlist_circuit_open_cached(tlp, mocker):
+    tlp, backend = tlp
+    session = backend._session
+    session.playlist.side_effect = CircuitOpenError
+    playlist = mocker.Mock()
+    playlist.tracks = [Track(uri="tidal:track:0:0:0", name="Track-0")]
+    backend.playlists._playlists.get.return_value = playlist
+    assert tlp.browse("tidal:playlist:1") == [
+        Ref(name="Track-0", type="track", uri="tidal:track:0:0:0"),
+    ]
+    backend.playlists._playlists.get.assert_called_once_with("tidal:playlist:1")
+
+
+@pytest.mark.parametrize("uri", ("tidal:my_tracks", "tidal:genre:1"))
+def test_browse_circuit_open_not_cached(tlp, mocker, uri):
+    tlp, backend = tlp
+    mocker.patch("mopidy_tidal.favorites.get_items", side_effect=CircuitOpenError)
+    backend._session.genre.get_genres.side_effect = CircuitOpenError
+    assert tlp.browse(uri) == []
+
+
+def test_get_images_cancelled(tlp, mocker):
+    tlp, backend = tlp
+    uris = ["tidal:album:1-1-1", "tidal:album:2-2-2"]
+    album = mocker.Mock()
+    album.image.return_value = "tidal:album:1-1-1"
+
+    def get_album(album_id):
+        if album_id == "2-2-2":
+            raise Cancelled()
+        return album
+
+    backend._session.album.side_effect = get_album
+    cache_update = mocker.spy(ImagesGetter, "cache_update")
+
+    expected = {uris[0]: [Image(height=320, uri="tidal:album:1-1-1", width=320)]}
+    assert tlp.get_images(uris) == expected
+    cache_update.assert_called_once_with(mocker.ANY, expected)
+
+
+def test_get_images_deduplicated(tlp, mocker):
+    tlp, backend = tlp
+    uris = [f"tidal:track:1:1-1-1:{i}" for i in range(20)] + ["tidal:album:1-1-1"]
+    album = mocker.Mock()
+    album.image.return_value = "tidal:album:1-1-1"
+    backend._session.album.return_value = album
+    get_images = mocker.spy(ImagesGetter, "__call__")
+
+    images = tlp.get_images(uris)
+    assert images == {
+        uri: [Image(height=320, uri="tidal:album:1-1-1", width=320)] for uri in uris
+    }
+    get_images.assert_called_once_with(mocker.ANY, "tidal:album:1-1-1")
+    backend._session.album.assert_called_once_with("1-1-1")
+
+
+def test_images_getter_reused(tlp, mocker):
+    tlp, backend = tlp
+    album = mocker.Mock()
+    album.image.return_value = "tidal:album:1-1-1"
+    backend._session.album.return_value = album
+    getter = tlp._get_images_getter()
+    tlp.get_images(["tidal:album:1-1-1"])
+    get_from_storage = mocker.spy(tlp._image_cache, "_get_from_storage")
+
+    assert tlp._get_images_getter() is getter
+    assert tlp.get_images(["tidal:album:1-1-1"])
+    backend._session.album.assert_called_once_with("1-1-1")
+    assert not get_from_storage.called
+
+    # A new session gets a new getter, sharing the same cache
+    backend._session = mocker.Mock()
+    assert tlp._get_images_getter() is not getter
+    assert tlp.get_images(["tidal:album:1-1-1"])
+    assert not backend._session.album.called
+
+
+def test_get_images_from_mapped_items(tlp, mocker, tidal_albums, tidal_tracks):
+    tlp, backend = tlp
+    session = backend._session
+    for i, album in enumerate(tidal_albums):
+        album.cover = f"cover-{i}"
+    session.request.map_request.side_effect = paginate(tidal_albums)
+    tlp.browse("tidal:my_albums")
+    session.track.return_value = tidal_tracks[1]
+    tlp.lookup("tidal:track:1")
+
+    assert tlp.get_images(["tidal:album:0", "tidal:track:1", "tidal:track:1:1:1"]) == {
+        "tidal:album:0": [
+            Image(
+                height=320,
+                uri="https://resources.tidal.com/images/cover/0/640x640.jpg",
+                width=320,
+            )
+        ],
+        "tidal:track:1": [
+            Image(
+                height=320,
+                uri="https://resources.tidal.com/images/cover/1/640x640.jpg",
+                width=320,
+            )
+        ],
+        "tidal:track:1:1:1": [
+            Image(
+                height=320,
+                uri="https://resources.tidal.com/images/cover/1/640x640.jpg",
+                width=320,
+            )
+        ],
+    }
+    assert not session.album.called
+
+
+@pytest.fixture
+def local_track():
+    artist = Artist(uri="tidal:artist:1", name="Sigur Rós")
+    album = Album(uri="tidal:album:1", name="Ágætis byrjun", artists=[artist])
+    return Track(
+        uri="tidal:track:1", name="Svefn-g-englar", artists=[artist], album=album
+    )
+
+
+def test_search_local_results_first(tlp, mocker, local_track):
+    tlp, backend = tlp
+    tlp.update_search_index("tidal:playlist:1", [local_track])
+    remote_track = Track(uri="tidal:track:2", name="Sigur Rós")
+    tidal_search = mocker.patch(
+        "mopidy_tidal.search.tidal_search",
+        return_value=([], [], [remote_track, local_track]),
+    )
+    res = tlp.search({"any": ["sigur ros"]})
+    assert res.tracks == (local_track, remote_track)
+    assert res.artists == tuple(local_track.artists)
+    assert res.albums == (local_track.album,)
+    tidal_search.assert_called_once()
+
+
+def test_search_local_favorites(tlp, favorites, mocker):
+    tlp, backend = tlp
+    tlp.browse("tidal:my_albums")
+    mocker.patch("mopidy_tidal.search.tidal_search", return_value=([], [], []))
+    res = tlp.search({"album": ["album-1"]})
+    assert [album.name for album in res.albums] == ["Album-1"]
+
+
+def test_search_lookup_results(tlp, mocker, tidal_tracks):
+    tlp, backend = tlp
+    backend._session.track.return_value = tidal_tracks[0]
+    tlp.lookup("tidal:track:0")
+    mocker.patch("mopidy_tidal.search.tidal_search", side_effect=CircuitOpenError)
+    res = tlp.search({"track_name": ["TRACK-0"]})
+    assert [track.uri for track in res.tracks] == ["tidal:track:0:0:0"]
+
+
+def test_search_unavailable(tlp, mocker, local_track):
+    tlp, backend = tlp
+    tlp.update_search_index("tidal:playlist:1", [local_track])
+    mocker.patch("mopidy_tidal.search.tidal_search", side_effect=CircuitOpenError)
+    assert tlp.search({"track_name": ["svefn"]}) == SearchResult(tracks=[local_track])
+
+
+def test_search_cancelled(tlp, mocker, local_track):
+    tlp, backend = tlp
+    tlp.update_search_index("tidal:playlist:1", [local_track])
+    mocker.patch("mopidy_tidal.search.tidal_search", side_effect=Cancelled)
+    assert tlp.search({"track_name": ["svefn"]}) == SearchResult(tracks=[local_track])
+
+
+def test_search_local_only(tlp, mocker, config, local_track):
+    tlp, backend = tlp
+    config["tidal"]["local_search_only"] = True
+    tlp.update_search_index("tidal:playlist:1", [local_track])
+    tidal_search = mocker.patch("mopidy_tidal.search.tidal_search")
+    assert tlp.search({"album": ["ÁGÆTIS"]}) == SearchResult(
+        albums=[local_track.album], tracks=[local_track]
+    )
+    assert not tidal_search.called
+
+
+def test_get_images_batched(tlp, mocker):
+    tlp, backend = tlp
+    session = backend._session
+    uris = [f"tidal:album:{i}" for i in range(3)]
+    albums = []
+    for i in range(3):
+        album = mocker.Mock(id=i)
+        album.image.return_value = f"https://images/{i}.jpg"
+        albums.append(album)
+    session.request.map_request.return_value = albums
+    for batcher in tlp._batchers.values():
+        batcher._window = 1
+        batcher._max_batch_size = 3
+
+    images = tlp.get_images(uris)
+    assert images == {
+        uri: [Image(height=320, uri=f"https://images/{i}.jpg", width=320)]
+        for i, uri in enumerate(uris)
+    }
+    session.request.map_request.assert_called_once_with(
+        "albums", params={"ids": mocker.ANY}, parse=session.parse_album
+    )
+    session.album.assert_not_called()
+
+
+def test_lookup_tracks_grouped_by_album(tlp, mocker, tidal_artists, tidal_albums):
+    tlp, backend = tlp
+    session = backend._session
+    artist, album = tidal_artists[0], tidal_albums[0]
+    album_tracks = [make_track(i, artist, album) for i in range(12)]
+    tidal_album = mocker.Mock()
+    tidal_album.tracks.return_value = album_tracks
+    session.album.return_value = tidal_album
+
+    res = tlp.lookup([t.uri for t in album_tracks[:10]])
+    assert [t.uri for t in res] == [t.uri for t in album_tracks[:10]]
+    session.album.assert_called_once_with("0")
+    tidal_album.tracks.assert_called_once_with()
+
+    # The rest of the album is already cached
+    res = tlp.lookup([t.uri for t in album_tracks[10:]])
+    assert [t.uri for t in res] == [t.uri for t in album_tracks[10:]]
+    tidal_album.tracks.assert_called_once_with()
+
+
+def test_lookup_tracks_grouped_by_album_error(tlp, mocker, tidal_tracks):
+    tlp, backend = tlp
+    session = backend._session
+    album = mocker.Mock()
+    album.tracks.side_effect = HTTPError
+    session.album.return_value = album
+    assert not tlp.lookup(["tidal:track:0:1:0", "tidal:track:0:1:1"])
+    album.tracks.assert_called_once_with()
+
+
+def test_lookup_track_not_on_album(tlp, mocker, tidal_tracks):
+    tlp, backend = tlp
+    album = mocker.Mock()
+    album.tracks.return_value = tidal_tracks
+    backend._session.album.return_value = album
+    assert tlp.lookup("tidal:track:0:1:42") == []
+
+
+def test_lookup_is_concurrent_and_ordered(tlp, mocker):
+    tlp, backend = tlp
+    session = backend._session
+    n_albums = 6
+    running = set()
+    peak = 0
+    lock = threading.Lock()
+
+    def get_album(album_id):
+        nonlocal peak
+        with lock:
+            running.add(album_id)
+            peak = max(peak, len(running))
+        # Later albums come back first
+        time.sleep(0.01 * (n_albums - int(album_id)))
+        with lock:
+            running.discard(album_id)
+
+        artist = mocker.Mock(id=1)
+        artist.name = "Artist"
+        album = mocker.Mock(id=int(album_id))
+        album.name = f"Album-{album_id}"
+        album.tracks.return_value = [make_track(int(album_id), artist, album)]
+        return album
+
+    session.album.side_effect = get_album
+    session.request.map_request.side_effect = TypeError  # No multi-ID support
+    uris = [f"tidal:album:{i}" for i in range(n_albums)]
+
+    res = tlp.lookup(uris)
+    assert [t.uri for t in res] == [f"tidal:track:1:{i}:{i}" for i in range(n_albums)]
+    assert peak > 1
+    assert all(uri in tlp._album_cache for uri in uris)
+
+
+def test_lookup_errors_are_isolated(tlp, mocker, tidal_tracks):
+    tlp, backend = tlp
+    session = backend._session
+    album = mocker.Mock()
+    album.tracks.return_value = tidal_tracks
+    session.album.return_value = album
+    session.artist.side_effect = HTTPError
+
+    res = tlp.lookup(["tidal:artist:1", "tidal:album:1"])
+    assert [t.uri for t in res] == [t.uri for t in tidal_tracks]
+    assert "tidal:album:1" in tlp._album_cache
+    assert "tidal:artist:1" not in tlp._artist_cache
+
+
+def test_track_images_short_uri(tlp, mocker):
+    tlp, backend = tlp
+    session = backend._session
+    track = mocker.Mock()
+    track.album.image.return_value = "https://images/1.jpg"
+    session.track.return_value = track
+    uri = "tidal:track:3"
+    images = {uri: [Image(height=320, uri="https://images/1.jpg", width=320)]}
+    assert tlp.get_images([uri]) == images
+    assert tlp.get_images([uri]) == images
+    session.track.assert_called_once_with("3")
+    session.album.assert_not_called()
@@ -1,5 +1,7 @@
 import os
+import pickle
 import shutil
+import threading
 from pathlib import Path
 
 import pytest
@@ -175,9 +177,81 @@ def test_old_cache_filename(lru_cache):
     assert filename.split(os.sep)[-1] == f"{uri}.cache"
 
 
+def test_add_missing(lru_cache):
+    lru_cache["tidal:uri:val"] = "hi"
+    lru_cache.add_missing({"tidal:uri:val": "replaced", "tidal:uri:otherval": 17})
+    assert lru_cache["tidal:uri:val"] == "hi"
+    assert lru_cache["tidal:uri:otherval"] == 17
+
+    # The new entries are persisted, and the entries on disk aren't replaced
+    lru_cache.clear()
+    lru_cache.add_missing({"tidal:uri:otherval": 18})
+    assert lru_cache["tidal:uri:otherval"] == 17
+    lru_cache.clear()
+    assert lru_cache["tidal:uri:otherval"] == 17
+
+
 @pytest.mark.xfail
 def test_lru(lru_cache):
     lru_cache.update({f"tidal:uri:{val}": val for val in range(8)})
     lru_cache["tidal:uri:0"]
     lru_cache["tidal:uri:8"] = 8
     assert lru_cache == {f"tidal:uri:{val}": val for val in (0, *range(2, 9))}
+
+
+def test_concurrent_access(config):
+    cache = LruCache(max_size=8, persist=False)
+
+    def worker(i):
+        for j in range(200):
+            cache[f"tidal:uri:{i}-{j}"] = j
+            cache.get(f"tidal:uri:{i}-{j - 1}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(cache) == 8
+
+
+def test_equivalent_uris_share_entries(lru_cache):
+    lru_cache["tidal:track:1:2:3"] = "track"
+    assert lru_cache["tidal:track:3"] == "track"
+    assert "tidal:track:4:5:3" in lru_cache
+    assert len(lru_cache) == 1
+
+    lru_cache.prune("tidal:track:3")
+    assert "tidal:track:1:2:3" not in lru_cache
+
+
+def test_long_track_entries_migrated(config):
+    cache_dir = Path(config["core"]["cache_dir"], "tidal", "cache", "track")
+    old_entries = {
+        "1/tidal-track-1-2-3.cache": "track-3",
+        "4/tidal:track:4:5:6.cache": "track-6",
+        # Already stored under its canonical key
+        "7/tidal-track-7-8-9.cache": "stale",
+        "9/tidal-track-9.cache": "track-9",
+    }
+    for path, value in old_entries.items():
+        cache_file = cache_dir / path
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache_file.write_bytes(pickle.dumps(value))
+
+    cache = LruCache(directory="cache")
+    assert cache["tidal:track:3"] == "track-3"
+    assert cache["tidal:track:1:2:3"] == "track-3"
+    assert cache["tidal:track:6"] == "track-6"
+    assert cache["tidal:track:9"] == "track-9"
+    assert sorted(p.name for p in cache_dir.rglob("*.cache")) == [
+        "tidal-track-3.cache",
+        "tidal-track-6.cache",
+        "tidal-track-9.cache",
+    ]
+
+    # The directory is only scanned once
+    (cache_dir / "1" / "tidal-track-1-2-4.cache").write_bytes(pickle.dumps("x"))
+    LruCache(directory="cache")
+    assert (cache_dir / "1" / "tidal-track-1-2-4.cache").is_file()
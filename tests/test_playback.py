@@ -1,4 +1,6 @@
+from mopidy_tidal.circuit_breaker import CircuitOpenError
 from mopidy_tidal.playback import TidalPlaybackProvider
+from mopidy_tidal.request_context import Priority, current
 
 
 def test_playback_new_api(mocker):
@@ -14,3 +16,21 @@ def test_playback_new_api(mocker):
     assert tpp.translate_uri("tidal:track:1:2:3") is uniq
     session.track.assert_called_once_with(3)
     track.get_url.assert_called_once()
+
+
+def test_playback_unavailable(mocker):
+    session = mocker.Mock(spec=["track"])
+    session.track.side_effect = CircuitOpenError
+    backend = mocker.Mock(_session=session)
+    tpp = TidalPlaybackProvider(mocker.Mock(), backend)
+    assert tpp.translate_uri("tidal:track:1:2:3") is None
+
+
+def test_playback_priority(mocker):
+    session = mocker.Mock(spec=["track"])
+    session.track.side_effect = lambda _: mocker.Mock(
+        get_url=lambda: current().priority
+    )
+    backend = mocker.Mock(_session=session)
+    tpp = TidalPlaybackProvider(mocker.Mock(), backend)
+    assert tpp.translate_uri("tidal:track:1:2:3") == Priority.PLAYBACK
@@ -1,9 +1,11 @@
+import threading
 from copy import deepcopy
 from time import sleep
 
 import pytest
 from mopidy.models import Track
 from requests import HTTPError
+from requests.exceptions import Timeout
 
 from mopidy_tidal.playlists import (
     MopidyPlaylist,
@@ -12,6 +14,7 @@ from mopidy_tidal.playlists import (
     TidalPlaylist,
     TidalPlaylistsProvider,
 )
+from mopidy_tidal.request_context import Priority, current
 
 
 @pytest.fixture
@@ -41,6 +44,8 @@ def test_delete(tpp):
     tpp, backend = tpp
     tpp.delete("tidal:playlist:19")
     backend._session.request.request.assert_called_once_with("DELETE", "playlists/19")
+    # The tracks of the playlist are no longer searchable
+    backend.library.update_search_index.assert_called_once_with("tidal:playlist:19", [])
 
 
 def test_delete_http_404(tpp, mocker):
@@ -202,7 +207,7 @@ def test_refresh_metadata(tpp, mocker, tidal_playlists):
     tpp, backend = tpp
     tpp._current_tidal_playlists = tidal_playlists
     assert not len(tpp._playlists_metadata)
-    tpp.refresh(include_items=False)
+    tpp.refresh(include_items=False).result()
 
     listener.send.assert_called_once_with("playlists_loaded")
 
@@ -242,7 +247,7 @@ def api_test(tpp, mocker, api_method, tp):
     api_method.return_value = tracks
     api_method.__name__ = "get_playlist_tracks"
 
-    tpp.refresh(include_items=True)
+    tpp.refresh(include_items=True).result()
     listener.send.assert_called_once_with("playlists_loaded")
     assert len(tpp._playlists) == 1
     playlist = tpp._playlists["tidal:playlist:1-1-1"]
@@ -250,6 +255,9 @@ def api_test(tpp, mocker, api_method, tp):
     assert playlist.last_modified == 10
     assert playlist.name == "Playlist-1"
     assert playlist.uri == "tidal:playlist:1-1-1"
+    tpp.backend.library.update_search_index.assert_called_once_with(
+        "tidal:playlist:1-1-1", playlist.tracks
+    )
     assert len(playlist.tracks) == 2 * len(api_method.mock_calls)
     attr_map = {"disc_num": "disc_no"}
     assert all(
@@ -455,3 +463,76 @@ def test_get_items_mix(tpp, mocker):
         Ref(name="Track-0", type="track", uri="tidal:track:0:0:0"),
         Ref(name="Track-1", type="track", uri="tidal:track:1:1:1"),
     ]
+
+
+def test_as_list_unavailable(tpp, mocker):
+    tpp, backend = tpp
+    tpp._playlists_metadata.update(
+        {
+            "tidal:playlist:101": MopidyPlaylist(
+                last_modified=10, name="Playlist-101", uri="tidal:playlist:101"
+            ),
+        }
+    )
+    mocker.patch("mopidy_tidal.playlists.get_items", side_effect=Timeout)
+    backend._session.user.playlists.side_effect = Timeout
+    assert tpp.as_list() == [
+        Ref(name="Playlist-101", type="playlist", uri="tidal:playlist:101"),
+    ]
+
+
+def test_full_refresh_runs_in_background(tpp, mocker, tidal_playlists):
+    mocker.patch("mopidy_tidal.playlists.backend.BackendListener")
+    tpp, backend = tpp
+    priorities = []
+    threads = []
+
+    def get_items(_):
+        priorities.append(current().priority)
+        threads.append(threading.current_thread())
+        return []
+
+    mocker.patch("mopidy_tidal.playlists.get_items", get_items)
+    tpp._current_tidal_playlists = tidal_playlists
+
+    tpp.refresh().result()
+    assert set(priorities) == {Priority.BACKGROUND}
+    # The full refresh doesn't hold the backend actor
+    assert threading.current_thread() not in threads
+
+    priorities.clear()
+    threads.clear()
+    tpp._playlists.clear()
+    tpp.refresh("tidal:playlist:101")
+    assert set(priorities) == {Priority.INTERACTIVE}
+    assert threads == [threading.current_thread()]
+
+
+def test_full_refresh_not_duplicated(tpp, mocker, tidal_playlists):
+    mocker.patch("mopidy_tidal.playlists.backend.BackendListener")
+    tpp, backend = tpp
+    release = threading.Event()
+    mocker.patch("mopidy_tidal.playlists.get_items", lambda _: release.wait(5) and [])
+    tpp._current_tidal_playlists = tidal_playlists
+
+    running = tpp.refresh()
+    assert tpp.refresh() is running
+    assert tpp.refresh(include_items=False) is not running
+    release.set()
+    running.result()
+    assert tpp.refresh() is not running
+
+
+def test_as_list_refresh_is_interactive(tpp, mocker, tidal_playlists):
+    tpp, backend = tpp
+    mocker.patch("mopidy_tidal.playlists.get_items", lambda x: x)
+    backend._session.configure_mock(**{"user.favorites.playlists": tidal_playlists[:1]})
+    backend._session.user.playlists.return_value = tidal_playlists[1:]
+    refresh = mocker.spy(tpp, "_refresh")
+    priorities = []
+    send = mocker.patch("mopidy_tidal.playlists.backend.BackendListener.send")
+    send.side_effect = lambda *_: priorities.append(current().priority)
+
+    assert len(tpp.as_list()) == 2
+    refresh.assert_called_once_with(include_items=False)
+    assert priorities == [Priority.INTERACTIVE]
@@ -0,0 +1,71 @@
+import pytest
+
+from mopidy_tidal import rate_limiter
+from mopidy_tidal.rate_limiter import TokenBucket
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [100.0]
+
+    def sleep(secs):
+        now[0] += secs
+
+    mocker.patch.object(rate_limiter.time, "monotonic", lambda: now[0])
+    mocker.patch.object(rate_limiter.time, "sleep", sleep)
+    return now
+
+
+def test_props():
+    bucket = TokenBucket(5, 12)
+    assert bucket.rate == 5
+    assert bucket.capacity == 12
+    assert TokenBucket(5).capacity == 5
+
+
+def test_invalid_rate():
+    with pytest.raises(AssertionError):
+        TokenBucket(0)
+
+
+def test_burst_then_steady_rate(clock):
+    bucket = TokenBucket(2, 4)
+    for _ in range(4):
+        bucket.acquire()
+    assert clock[0] == 100.0
+
+    bucket.acquire()
+    assert clock[0] == pytest.approx(100.5)
+    bucket.acquire()
+    assert clock[0] == pytest.approx(101.0)
+
+
+def test_refill_is_capped(clock):
+    bucket = TokenBucket(2, 2)
+    clock[0] += 60
+    for _ in range(2):
+        bucket.acquire()
+    start = clock[0]
+    bucket.acquire()
+    assert clock[0] == pytest.approx(start + 0.5)
+
+
+def test_pause(clock):
+    bucket = TokenBucket(10, 10)
+    bucket.pause(3)
+    bucket.acquire()
+    assert clock[0] == pytest.approx(103.1)
+
+
+def test_priority(clock, mocker):
+    bucket = TokenBucket(10, 1)
+    bucket._waiting[0] += 1  # A more urgent caller is queued
+
+    def sleep(secs):
+        clock[0] += secs
+        bucket._waiting[0] -= 1  # ...and it gets its token
+
+    mocker.patch.object(rate_limiter.time, "sleep", sleep)
+    bucket.acquire(1)
+    assert clock[0] == pytest.approx(100.1)
+    assert not any(bucket._waiting.values())
@@ -0,0 +1,170 @@
+import pytest
+
+from mopidy_tidal import request_context
+from mopidy_tidal.request_context import (
+    CancellationToken,
+    Cancelled,
+    DeadlineExceeded,
+    Priority,
+    RequestContext,
+    cancellable,
+    check_cancelled,
+    current,
+    deadline,
+    get_request_timeout,
+    priority,
+    propagate,
+    use,
+    with_deadline,
+    with_priority,
+)
+from mopidy_tidal.workers import parallel_map
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [100.0]
+    mocker.patch.object(request_context.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_default_context():
+    assert current() == RequestContext()
+    assert current().remaining() is None
+
+
+def test_use():
+    ctx = RequestContext(deadline=5)
+    with use(ctx):
+        assert current() is ctx
+    assert current() == RequestContext()
+
+
+def test_deadline(clock):
+    with deadline(5) as ctx:
+        assert ctx.deadline == 105
+        assert current().remaining() == 5
+        clock[0] += 2
+        assert current().remaining() == 3
+
+
+def test_nested_deadline_is_only_shortened(clock):
+    with deadline(5):
+        with deadline(10) as ctx:
+            assert ctx.deadline == 105
+        with deadline(1) as ctx:
+            assert ctx.deadline == 101
+
+
+def test_request_timeout(clock, config):
+    assert get_request_timeout() == request_context.default_api_timeout
+    config["tidal"]["api_timeout"] = 3
+    assert get_request_timeout() == 3
+    assert get_request_timeout(7) == 7
+    with deadline(2):
+        assert get_request_timeout() == 2
+        clock[0] += 2
+        with pytest.raises(DeadlineExceeded):
+            get_request_timeout()
+
+
+def test_request_timeout_no_config():
+    assert get_request_timeout() == request_context.default_api_timeout
+
+
+def test_propagate(clock):
+    with deadline(5):
+        func = propagate(lambda: current().deadline)
+    assert current().deadline is None
+    assert func() == 105
+
+
+def test_parallel_map_propagates_context(clock):
+    with deadline(5):
+        assert parallel_map(lambda _: current().deadline, range(4)) == [105] * 4
+
+
+def test_with_deadline(clock, config):
+    config["tidal"]["browse_timeout"] = 20
+
+    @with_deadline("browse")
+    def browse():
+        return current().deadline
+
+    @with_deadline("lookup")
+    def lookup():
+        return current().deadline
+
+    assert browse() == 120
+    assert lookup() is None
+
+
+def test_priority():
+    assert current().priority == Priority.INTERACTIVE
+    with priority(Priority.BACKGROUND) as ctx:
+        assert ctx.priority == Priority.BACKGROUND
+        assert (
+            parallel_map(lambda _: current().priority, range(2))
+            == [Priority.BACKGROUND] * 2
+        )
+    assert current().priority == Priority.INTERACTIVE
+
+
+def test_with_priority():
+    @with_priority(Priority.PLAYBACK)
+    def play():
+        return current().priority
+
+    assert play() == Priority.PLAYBACK
+
+
+def test_cancellation_token():
+    parent = CancellationToken()
+    token = CancellationToken(parent)
+    assert not token.cancelled
+    parent.cancel()
+    assert token.cancelled
+    assert not CancellationToken().cancelled
+
+
+def test_cancellable():
+    with cancellable() as ctx:
+        check_cancelled()
+        with cancellable() as inner:
+            ctx.cancel_token.cancel()
+            with pytest.raises(Cancelled):
+                check_cancelled()
+            with pytest.raises(Cancelled):
+                get_request_timeout()
+            assert inner.cancel_token.cancelled
+    check_cancelled()
+
+
+def test_check_deadline(clock):
+    with deadline(1):
+        check_cancelled()
+        clock[0] += 1
+        with pytest.raises(DeadlineExceeded):
+            check_cancelled()
+
+
+def test_propagate_cancelled():
+    with cancellable() as ctx:
+        wrapped = propagate(get_request_timeout)
+        ctx.cancel_token.cancel()
+    with pytest.raises(Cancelled):
+        wrapped()
+
+
+def test_parallel_map_cancelled():
+    def func(x):
+        try:
+            get_request_timeout()
+            return x
+        except Cancelled:
+            return None
+
+    with cancellable() as ctx:
+        assert parallel_map(func, range(4)) == [0, 1, 2, 3]
+        ctx.cancel_token.cancel()
+        assert parallel_map(func, range(4)) == [None] * 4
@@ -0,0 +1,124 @@
+import pytest
+from mopidy.models import Album, Artist, Track
+
+from mopidy_tidal.search_index import SearchIndex, normalize, tokenize
+
+artist = Artist(uri="tidal:artist:1", name="Beyoncé")
+other_artist = Artist(uri="tidal:artist:2", name="Jay-Z")
+album = Album(uri="tidal:album:10", name="Lemonade", artists=[artist])
+track = Track(
+    uri="tidal:track:100",
+    name="Formation",
+    artists=[artist, other_artist],
+    album=album,
+)
+other_track = Track(
+    uri="tidal:track:101",
+    name="Hold Up",
+    artists=[artist],
+    album=album,
+)
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.add([track, other_track])
+    return index
+
+
+def test_normalize():
+    assert normalize("Beyoncé") == "beyonce"
+    assert normalize("STRASSE") == normalize("straße")
+
+
+def test_tokenize():
+    assert tokenize("Sigur Rós - Ágætis byrjun") == ["sigur", "ros", "agætis", "byrjun"]
+
+
+def test_related_items_indexed(index):
+    assert len(index) == 5
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    (
+        ({"any": ["beyonce"]}, ([artist], [album], [track, other_track])),
+        ({"artist": ["JAY Z"]}, ([other_artist], [], [track])),
+        ({"albumartist": ["beyoncé"]}, ([artist], [album], [track, other_track])),
+        ({"album": "lemonade"}, ([], [album], [track, other_track])),
+        ({"track_name": ["hold"]}, ([], [], [other_track])),
+        ({"artist": ["beyonce"], "track_name": ["formation"]}, ([], [], [track])),
+        ({"any": ["Formation [TIDAL]"]}, ([], [], [track])),
+        ({"any": ["nonsuch"]}, ([], [], [])),
+        ({"date": ["2016"]}, ([], [], [])),
+        ({"any": ["beyonce"], "genre": ["pop"]}, ([], [], [])),
+        ({}, ([], [], [])),
+        ("beyonce", ([], [], [])),
+    ),
+)
+def test_search(index, query, expected):
+    assert index.search(query) == expected
+
+
+def test_search_exact(index):
+    assert index.search({"track_name": ["hold"]}, exact=True) == ([], [], [])
+    assert index.search({"track_name": ["HOLD UP"]}, exact=True) == (
+        [],
+        [],
+        [other_track],
+    )
+    assert index.search({"any": ["beyonce"]}, exact=True) == (
+        [artist],
+        [album],
+        [track, other_track],
+    )
+
+
+def test_item_replaced(index):
+    renamed = other_track.replace(name="Sorry")
+    index.add([renamed])
+    assert index.search({"track_name": ["hold"]}) == ([], [], [])
+    assert index.search({"track_name": ["sorry"]}) == ([], [], [renamed])
+    assert len(index) == 5
+
+
+def test_update(mocker):
+    index = SearchIndex()
+    add_all = mocker.spy(index, "_add_all")
+    items = [track]
+    index.update("favorites", items)
+    index.update("favorites", items)
+    index.update("favorites", [track])
+    assert len(add_all.mock_calls) == 2
+
+
+def test_update_removes_items():
+    index = SearchIndex()
+    index.update("tidal:playlist:1", [track, other_track])
+    index.update("tidal:playlist:1", [other_track])
+    assert index.search({"track_name": ["formation"]}) == ([], [], [])
+    # Jay-Z was only credited on the removed track
+    assert index.search({"artist": ["jay"]}) == ([], [], [])
+    assert index.search({"track_name": ["hold"]}) == ([], [], [other_track])
+    assert len(index) == 3
+
+    index.update("tidal:playlist:1", [])
+    assert len(index) == 0
+
+
+def test_update_shared_items():
+    index = SearchIndex()
+    index.update("tidal:playlist:1", [track])
+    index.update("tidal:playlist:2", [track, other_track])
+    index.add([other_track])
+
+    # Still in the other playlist
+    index.update("tidal:playlist:2", [])
+    assert index.search({"track_name": ["formation"]}) == ([], [], [track])
+    # Added outside of any source
+    assert index.search({"track_name": ["hold"]}) == ([], [], [other_track])
+
+    index.update("tidal:playlist:1", [])
+    assert index.search({"track_name": ["formation"]}) == ([], [], [])
+    assert len(index) == 3
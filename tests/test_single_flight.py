@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from mopidy_tidal.request_context import Cancelled
+from mopidy_tidal.single_flight import SingleFlight, coalesce, single_flight
+
+
+def run_concurrently(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def test_single_call():
+    flight = SingleFlight()
+    assert flight("key", lambda x: x + 1, 1) == 2
+    assert not flight.in_flight()
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    threads = run_concurrently(5, lambda: results.append(flight("key", slow)))
+    # Give the other threads time to join the in-flight call
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5
+    assert all(r is results[0] for r in results)
+    assert not flight.in_flight()
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight("a", lambda: 1) == 1
+    assert flight("b", lambda: 2) == 2
+
+
+def test_error_is_shared():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fail():
+        release.wait(5)
+        raise ValueError()
+
+    def call():
+        try:
+            flight("key", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = run_concurrently(3, call)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 3
+    assert not flight.in_flight()
+
+
+def test_leader_cancellation_is_not_shared():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            raise Cancelled()
+        # Give the other follower time to join the retry
+        time.sleep(0.1)
+        return "result"
+
+    def call():
+        try:
+            results.append(flight("key", fetch))
+        except Cancelled as e:
+            results.append(e)
+
+    threads = run_concurrently(3, call)
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    # Only the leader gets its own cancellation, the others retry once
+    assert len(calls) == 2
+    assert sum(isinstance(r, Cancelled) for r in results) == 1
+    assert results.count("result") == 2
+    assert not flight.in_flight()
+
+
+def test_completed_calls_are_not_cached():
+    flight = SingleFlight()
+    counter = iter(range(10))
+    assert flight("key", lambda: next(counter)) == 0
+    assert flight("key", lambda: next(counter)) == 1
+
+
+def test_coalesce(mocker):
+    getter = mocker.Mock(return_value="album")
+    assert coalesce("album", 1, getter, 1) == "album"
+    getter.assert_called_once_with(1)
+    assert not single_flight.in_flight()
+
+
+def test_coalesce_raises(mocker):
+    getter = mocker.Mock(side_effect=KeyError)
+    with pytest.raises(KeyError):
+        coalesce("album", 1, getter, 1)
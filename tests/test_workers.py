@@ -0,0 +1,146 @@
+import threading
+
+import pytest
+
+from mopidy_tidal import concurrency, workers
+from mopidy_tidal.request_context import CancellationToken, Cancelled, cancellable
+from mopidy_tidal.workers import WorkerPool, get_items, get_pool, shutdown_pool
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(2)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_pool():
+    shutdown_pool()
+    yield
+    shutdown_pool()
+
+
+def test_map_preserves_order(pool):
+    assert pool.map(lambda x: x * 2, range(10)) == [x * 2 for x in range(10)]
+
+
+def test_map_empty(pool):
+    assert pool.map(lambda x: x, []) == []
+
+
+def test_submit(pool):
+    future = pool.submit(lambda x: threading.current_thread(), 1)
+    assert future.result() is not threading.current_thread()
+
+
+def test_map_raises(pool):
+    def f(x):
+        if x == 3:
+            raise ValueError(x)
+        return x
+
+    with pytest.raises(ValueError):
+        pool.map(f, range(5))
+
+
+def test_map_nested_does_not_deadlock(pool):
+    # Every pool thread waits on sub-tasks submitted to the same pool
+    def outer(x):
+        return sum(pool.map(lambda y: x * y, range(4)))
+
+    assert pool.map(outer, range(6)) == [x * 6 for x in range(6)]
+
+
+def test_map_is_bounded(pool):
+    running = set()
+    peak = 0
+    lock = threading.Lock()
+    barrier = threading.Event()
+
+    def f(x):
+        nonlocal peak
+        with lock:
+            running.add(threading.current_thread().name)
+            peak = max(peak, len(running))
+        barrier.wait(0.05)
+        with lock:
+            running.discard(threading.current_thread().name)
+        return x
+
+    pool.map(f, range(20))
+    # Two pool threads plus the calling thread
+    assert peak <= 3
+
+
+def test_shared_pool_default_size():
+    assert get_pool().max_workers == workers.default_pool_size
+    assert get_pool() is get_pool()
+
+
+def test_shared_pool_size_from_config(config):
+    config["tidal"]["workers_pool_size"] = 3
+    assert get_pool().max_workers == 3
+
+
+def test_shutdown_pool():
+    pool = get_pool()
+    shutdown_pool()
+    assert get_pool() is not pool
+
+
+def test_get_items_paginates(mocker):
+    data = list(range(730))
+    func = mocker.Mock(side_effect=lambda limit, offset: data[offset : offset + limit])
+    func.__name__ = "func"
+    assert get_items(func, chunk_size=100, processes=5) == data
+    assert len(func.mock_calls) == 10
+
+
+def test_get_items_parse(mocker):
+    func = mocker.Mock(side_effect=lambda limit, offset: list(range(3))[offset:])
+    func.__name__ = "func"
+    assert get_items(func, parse=str) == ["0", "1", "2"]
+
+
+def test_get_items_follows_concurrency_limit(mocker):
+    limit = concurrency.configure(8, initial_limit=3)
+    data = list(range(250))
+    func = mocker.Mock(side_effect=lambda limit, offset: data[offset : offset + limit])
+    func.__name__ = "func"
+    assert get_items(func) == data
+    assert len(func.mock_calls) == 3
+    assert limit.limit == 3
+
+
+def test_get_items_probe(mocker):
+    data = list(range(30))
+    func = mocker.Mock(side_effect=lambda limit, offset: data[offset : offset + limit])
+    func.__name__ = "func"
+    assert get_items(func, chunk_size=100, processes=5, probe=True) == data
+    func.assert_called_once_with(100, 0)
+
+
+def test_get_items_probe_full_page(mocker):
+    data = list(range(730))
+    func = mocker.Mock(side_effect=lambda limit, offset: data[offset : offset + limit])
+    func.__name__ = "func"
+    assert get_items(func, chunk_size=100, processes=5, probe=True) == data
+    # The first page on its own, then two rounds of 5 pages
+    offsets = [call.args[1] for call in func.mock_calls]
+    assert offsets[0] == 0
+    assert sorted(offsets[1:6]) == [100, 200, 300, 400, 500]
+    assert len(offsets) == 11
+
+
+def test_get_items_stops_when_cancelled(mocker):
+    token = CancellationToken()
+    data = list(range(1000))
+
+    def func(limit, offset):
+        token.cancel()
+        return data[offset : offset + limit]
+
+    with cancellable(token):
+        with pytest.raises(Cancelled):
+            get_items(func, chunk_size=100, processes=1)